@@ -0,0 +1,122 @@
+# Compares the per-object pydantic chunk path with the bulk chunk codec.
+# Encode/decode are measured in memory; --mongo also times the inserts against MONGODB_URL
+# (into a scratch collection that is dropped afterwards).
+# Run from src/ with a configured .env:  python -m benchmarks.chunk_codec_benchmark --chunks 200000
+import argparse
+import asyncio
+import random
+import time
+from bson import ObjectId
+from pymongo import InsertOne
+from motor.motor_asyncio import AsyncIOMotorClient
+from helpers.config import get_settings
+from models.ChunkModel import ChunkModel
+from models.db_schemas import DataChunk
+
+
+def generate_chunks(count: int, seed: int = 0):
+    random.seed(seed)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+    texts = [" ".join(random.choices(words, k=random.randint(20, 80))) for _ in range(count)]
+    metadata = [{"page": i // 10} for i in range(count)]
+    return texts, metadata
+
+
+def best_of(func, repeat: int):
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def encode_pydantic(chunk_model, texts, metadata, project_id, asset_id):
+    return [
+        chunk_model.encode_chunk(DataChunk(
+            chunk_text=text,
+            chunk_metadata=chunk_metadata,
+            chunk_order=i + 1,
+            chunk_project_id=project_id,
+            chunk_asset_id=asset_id
+        ))
+        for i, (text, chunk_metadata) in enumerate(zip(texts, metadata))
+    ]
+
+
+def print_row(name: str, pydantic_time: float, codec_time: float, count: int):
+    print(f"{name:>7}: pydantic {pydantic_time:.3f}s ({count / pydantic_time:,.0f}/s), "
+          f"codec {codec_time:.3f}s ({count / codec_time:,.0f}/s), {pydantic_time / codec_time:.1f}x")
+
+
+async def time_inserts(chunk_model, pydantic_records, codec_records, batch_size: int):
+    collection = chunk_model.collection
+
+    await collection.drop()
+    started_at = time.perf_counter()
+    for i in range(0, len(pydantic_records), 100):
+        # the previous write path: ordered bulk writes of 100
+        await collection.bulk_write(
+            [InsertOne(dict(record)) for record in pydantic_records[i:i + 100]]
+        )
+    pydantic_time = time.perf_counter() - started_at
+
+    await collection.drop()
+    started_at = time.perf_counter()
+    await chunk_model.insert_chunk_records([dict(record) for record in codec_records], batch_size=batch_size)
+    codec_time = time.perf_counter() - started_at
+
+    await collection.drop()
+    return pydantic_time, codec_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--mongo", action="store_true", help="also time the inserts against mongo")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.CHUNK_BULK_CODEC = True
+    mongo_client = AsyncIOMotorClient(settings.MONGODB_URL)
+    chunk_model = ChunkModel(db_client=mongo_client[settings.MONGODB_DATABASE])
+    chunk_model.collection = chunk_model.db_client["chunks_codec_benchmark"]
+
+    texts, metadata = generate_chunks(args.chunks)
+    project_id, asset_id = ObjectId(), ObjectId()
+    print(f"{args.chunks:,} chunks, compression={settings.CHUNK_TEXT_COMPRESSION}")
+
+    pydantic_time, pydantic_records = best_of(
+        lambda: encode_pydantic(chunk_model, texts, metadata, project_id, asset_id), args.repeat
+    )
+    codec_time, codec_records = best_of(
+        lambda: chunk_model.encode_chunk_batch(texts, metadata, project_id, asset_id), args.repeat
+    )
+    assert pydantic_records == codec_records
+    print_row("encode", pydantic_time, codec_time, args.chunks)
+
+    # records as they come back from mongo
+    records = [{"_id": ObjectId(), **record} for record in codec_records]
+    assets_metadata = {asset_id: {"source": "benchmark.pdf"}}
+
+    pydantic_time, pydantic_chunks = best_of(
+        lambda: [chunk_model.decode_chunk(dict(record), assets_metadata) for record in records], args.repeat
+    )
+    codec_time, codec_chunks = best_of(
+        lambda: chunk_model.decode_chunk_batch(records, assets_metadata), args.repeat
+    )
+    assert [chunk.model_dump() for chunk in pydantic_chunks[:100]] == [chunk.model_dump() for chunk in codec_chunks[:100]]
+    print_row("decode", pydantic_time, codec_time, args.chunks)
+
+    if args.mongo:
+        pydantic_time, codec_time = asyncio.run(
+            time_inserts(chunk_model, pydantic_records, codec_records, args.batch_size)
+        )
+        print_row("insert", pydantic_time, codec_time, args.chunks)
+
+
+if __name__ == "__main__":
+    main()
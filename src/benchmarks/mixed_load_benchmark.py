@@ -0,0 +1,79 @@
+# Search latency of a running server, alone and while bulk work runs next to it.
+# The bulk phase keeps re-processing and re-pushing --bulk-project-id, so use a scratch project.
+# Run from src/:  python -m benchmarks.mixed_load_benchmark --search-project-id p1 --bulk-project-id p2 --query "..."
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+async def search_worker(client, args, latencies: list, statuses: dict, stop: asyncio.Event):
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        response = await client.post(
+            f"/api/v1/nlp/index/search/{args.search_project_id}",
+            json={"text": args.query, "limit": args.limit}
+        )
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started_at)
+
+
+async def bulk_worker(client, args, statuses: dict, stop: asyncio.Event):
+    while not stop.is_set():
+        for path, body in (
+            (f"/api/v1/data/process/{args.bulk_project_id}", {"chunk_size": 200, "overlap_size": 20, "do_reset": 1}),
+            (f"/api/v1/nlp/index/push/{args.bulk_project_id}", {"do_reset": 1}),
+        ):
+            response = await client.post(path, json=body)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 429:
+                await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+
+async def run_phase(args, with_bulk: bool):
+    latencies, search_statuses, bulk_statuses = [], {}, {}
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        tasks = [
+            asyncio.create_task(search_worker(client, args, latencies, search_statuses, stop))
+            for _ in range(args.search_concurrency)
+        ]
+        if with_bulk:
+            tasks += [
+                asyncio.create_task(bulk_worker(client, args, bulk_statuses, stop))
+                for _ in range(args.bulk_concurrency)
+            ]
+
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan")
+    name = "mixed" if with_bulk else "search only"
+    print(f"{name:>11}: {len(latencies)} searches, p50 {p50:.1f}ms, p99 {p99:.1f}ms, "
+          f"search statuses {search_statuses}, bulk statuses {bulk_statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--search-project-id", required=True)
+    parser.add_argument("--bulk-project-id", required=True)
+    parser.add_argument("--query", required=True)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--search-concurrency", type=int, default=8)
+    parser.add_argument("--bulk-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.run(run_phase(args, with_bulk=False))
+    asyncio.run(run_phase(args, with_bulk=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Measures cold import time and resident memory of the API process.
+# "eager" also imports every provider and document loader, as main.py used to do;
+# "lazy" only imports what the configured backends need.
+# Run from src/ with a configured .env:  python -m benchmarks.startup_benchmark --runs 5
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+EAGER_MODULES = [
+    "stores.llm.providers.OpenAIProvider",
+    "stores.llm.providers.CoHereProvider",
+    "stores.vectordb.providers.QdrantDBProvider",
+    "langchain_community.document_loaders",
+    "langchain_text_splitters",
+]
+
+CHILD_CODE = """
+import importlib, json, resource, sys, time
+started_at = time.perf_counter()
+for module_name in {eager_modules!r}:
+    importlib.import_module(module_name)
+import main
+from helpers.config import get_settings
+from stores.llm.providers import load_provider as load_llm_provider
+from stores.vectordb.providers import load_provider as load_vectordb_provider
+settings = get_settings()
+load_llm_provider(settings.GENERATION_BACKEND)
+load_llm_provider(settings.EMBEDDING_BACKEND)
+load_vectordb_provider(settings.VECTOR_DB_BACKEND)
+elapsed = time.perf_counter() - started_at
+max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "max_rss_mb": max_rss_kb / 1024}}))
+"""
+
+
+def run_child(eager: bool):
+    code = CHILD_CODE.format(eager_modules=EAGER_MODULES if eager else [])
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for mode, eager in (("eager", True), ("lazy", False)):
+        results = [run_child(eager) for _ in range(args.runs)]
+        seconds = statistics.median(result["seconds"] for result in results)
+        max_rss_mb = statistics.median(result["max_rss_mb"] for result in results)
+        print(f"{mode:>5}: startup {seconds:.3f}s, resident memory {max_rss_mb:.1f} MB (median of {args.runs})")
+
+
+if __name__ == "__main__":
+    main()
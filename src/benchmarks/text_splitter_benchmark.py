@@ -0,0 +1,110 @@
+# Compares the LangChain RecursiveCharacterTextSplitter with the native splitter.
+# Run from src/:  python -m benchmarks.text_splitter_benchmark [file.txt] --chunk-size 100
+import argparse
+import random
+import time
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from helpers.text_splitter import NativeTextSplitter, count_tokens
+
+
+def generate_text(size: int, seed: int = 0):
+    random.seed(seed)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit"]
+    parts = []
+    length = 0
+    while length < size:
+        sentence = " ".join(random.choices(words, k=random.randint(4, 20))) + "."
+        parts.append(sentence)
+        parts.append(random.choice([" ", " ", "\n", "\n\n"]))
+        length += len(sentence) + 1
+    return "".join(parts)
+
+
+def generate_glued_text(count: int, seed: int = 0):
+    # short texts with runs of words glued by punctuation and no spaces, longer than a small
+    # chunk: token mode splits them by character, into pieces inside a token
+    random.seed(seed)
+    words = ["ab", "xyz", "c", "lorem"]
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(random.randint(1, 20)):
+            parts.append(random.choice([".", ""]).join(random.choices(words, k=random.randint(1, 8))))
+            parts.append(random.choice([" ", "\n", "\n\n", ". "]))
+        texts.append("".join(parts))
+    return texts
+
+
+def count_repeats(use_tokens: bool, texts: list):
+    # with no overlap every character of the text is in exactly one chunk
+    repeats = 0
+    for text in texts:
+        for chunk_size in range(1, 12):
+            chunks = NativeTextSplitter(
+                chunk_size=chunk_size, chunk_overlap=0, use_tokens=use_tokens
+            ).split_text(text)
+            if "".join("".join(chunks).split()) != "".join(text.split()):
+                repeats += 1
+    return repeats
+
+
+def time_split(splitter, text: str, repeat: int):
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        chunks = splitter.split_text(text)
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", nargs="?", help="text file to split, synthetic text if omitted")
+    parser.add_argument("--size", type=int, default=5_000_000, help="synthetic text size in characters")
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--overlap", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = generate_text(args.size)
+
+    print(f"text: {len(text):,} characters, chunk_size={args.chunk_size}, overlap={args.overlap}")
+    glued_texts = generate_glued_text(2000)
+
+    for unit, length_function, use_tokens in (
+        ("character", len, False),
+        ("token", count_tokens, True),
+    ):
+        langchain_time, langchain_chunks = time_split(
+            RecursiveCharacterTextSplitter(
+                chunk_size=args.chunk_size,
+                chunk_overlap=args.overlap,
+                length_function=length_function
+            ),
+            text, args.repeat
+        )
+        native_time, native_chunks = time_split(
+            NativeTextSplitter(
+                chunk_size=args.chunk_size,
+                chunk_overlap=args.overlap,
+                use_tokens=use_tokens
+            ),
+            text, args.repeat
+        )
+
+        print(
+            f"{unit:>9}: langchain {langchain_time:.3f}s ({len(langchain_chunks)} chunks) | "
+            f"native {native_time:.3f}s ({len(native_chunks)} chunks) | "
+            f"speedup x{langchain_time / native_time:.1f} | "
+            f"identical={langchain_chunks == native_chunks} | "
+            f"repeats at overlap 0: {count_repeats(use_tokens, glued_texts)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
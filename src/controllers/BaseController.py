@@ -19,6 +19,16 @@ class BaseController:
             "assets/database"
         )
 
+        self.objects_dir = os.path.join(
+            self.base_dir,
+            "assets/objects"
+        )
+
+        self.parsed_dir = os.path.join(
+            self.base_dir,
+            "assets/parsed"
+        )
+
     def generate_random_string(self, length: int = 12):
         return ''.join(random.choices(string.ascii_lowercase+string.digits, k=length))
 
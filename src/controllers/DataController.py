@@ -2,24 +2,92 @@ from .BaseController import BaseController
 from .ProjectController import ProjectController
 from fastapi import UploadFile
 from models import ResponseSignal
+import aiofiles
+import asyncio
+import hashlib
+import inspect
+import mimetypes
 import re
 import os
+import shutil
+import tarfile
+import zipfile
+import logging
 
 
 class DataController(BaseController):
     def __init__(self):
         super().__init__()
+        self.logger = logging.getLogger(__name__)
 
     def validate_uploaded_file(self, file: UploadFile):
+        return self.validate_file(content_type=file.content_type, size=file.size)
+
+    def validate_file(self, content_type: str, size: int):
         self.size_scale = 1048576  # CONVERT MB TO BYTES
-        if file.content_type not in self.app_settings.FILE_ALLOWED_TYPES:
+        if content_type not in self.app_settings.FILE_ALLOWED_TYPES:
             return False, ResponseSignal.FILE_TYPE_NOT_SUPPORTED.value
 
-        if file.size > self.app_settings.FILE_MAX_SIZE * self.size_scale:
+        if size is None or size > self.app_settings.FILE_MAX_SIZE * self.size_scale:
+            return False, ResponseSignal.FILE_SIZE_EXCEEDED.value
+
+        return True, ResponseSignal.FILE_UPLOAD_SUCCESS.value
+
+    def is_archive_file(self, file: UploadFile):
+        return file.content_type in self.app_settings.FILE_ARCHIVE_TYPES
+
+    def validate_archive_file(self, file: UploadFile):
+        self.size_scale = 1048576  # CONVERT MB TO BYTES
+        if file.size > self.app_settings.FILE_MAX_ARCHIVE_SIZE * self.size_scale:
             return False, ResponseSignal.FILE_SIZE_EXCEEDED.value
 
         return True, ResponseSignal.FILE_UPLOAD_SUCCESS.value
 
+    def get_archive_members(self, file: UploadFile):
+        # members are read straight out of the spooled upload, nothing is extracted to disk;
+        # zip members can be read concurrently, tar members have to be read in order
+        file.file.seek(0)
+        if zipfile.is_zipfile(file.file):
+            file.file.seek(0)
+            archive = zipfile.ZipFile(file.file)
+            members = [
+                (
+                    os.path.basename(info.filename),
+                    mimetypes.guess_type(info.filename)[0],
+                    info.file_size,
+                    self.open_zip_member(archive=archive, info=info)
+                )
+                for info in archive.infolist()
+                if not info.is_dir()
+            ]
+            return members, False
+
+        file.file.seek(0)
+        archive = tarfile.open(fileobj=file.file, mode="r:*")
+        members = [
+            (
+                os.path.basename(member.name),
+                mimetypes.guess_type(member.name)[0],
+                member.size,
+                archive.extractfile(member)
+            )
+            for member in archive.getmembers()
+            if member.isfile()
+        ]
+        return members, True
+
+    def open_zip_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        # encrypted members and unsupported compression methods fail on open,
+        # they are reported per file instead of failing the whole archive
+        try:
+            return archive.open(info)
+        except (RuntimeError, NotImplementedError) as e:
+            self.logger.error(f"Error while opening archive member {info.filename}: {e}")
+            return None
+
+    def get_tmp_file_path(self, file_path: str):
+        return file_path + ".part"
+
     def generate_unique_filepath(self, original_file_name: str, project_id: str):
         random_key = self.generate_random_string()
 
@@ -45,3 +113,73 @@ class DataController(BaseController):
         cleaned_file_name = re.sub(r'[^\w.]', '', original_file_name.strip())
         cleaned_file_name = cleaned_file_name.replace(" ", "_")
         return cleaned_file_name
+
+    async def write_file_stream(self, stream, file_path: str, max_size: int = None):
+        # hashes while writing so deduplication costs no extra pass over the file
+        hasher = hashlib.sha256()
+        written_size = 0
+        async with aiofiles.open(file_path, mode='wb') as f:
+            while True:
+                # archive members are plain file objects that decompress on read, off the event loop
+                if inspect.iscoroutinefunction(stream.read):
+                    chunk = await stream.read(self.app_settings.FILE_DEFAULT_CHUNK_SIZE)
+                else:
+                    chunk = await asyncio.to_thread(stream.read, self.app_settings.FILE_DEFAULT_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                # archive headers can under-report member sizes
+                written_size += len(chunk)
+                if max_size is not None and written_size > max_size:
+                    raise ValueError(f"file exceeds {max_size} bytes")
+
+                hasher.update(chunk)
+                await f.write(chunk)
+
+        return hasher.hexdigest()
+
+    async def write_project_files(self, members: list, project_id: str, max_size: int = None):
+        written_files = []
+        for file_name, stream in members:
+            file_path, file_id = self.generate_unique_filepath(
+                original_file_name=file_name,
+                project_id=project_id
+            )
+            tmp_file_path = self.get_tmp_file_path(file_path)
+            try:
+                file_hash = await self.write_file_stream(
+                    stream=stream, file_path=tmp_file_path, max_size=max_size
+                )
+            except Exception as e:
+                self.logger.error(f"Error while writing file {file_name}: {e}")
+                if os.path.exists(tmp_file_path):
+                    os.remove(tmp_file_path)
+                written_files.append((file_name, None, None, None))
+                continue
+
+            written_files.append((file_name, file_path, file_id, file_hash))
+
+        return written_files
+
+    def get_object_path(self, file_hash: str):
+        object_dir = os.path.join(self.objects_dir, file_hash[:2])
+        if not os.path.exists(object_dir):
+            os.makedirs(object_dir, exist_ok=True)
+
+        return os.path.join(object_dir, file_hash)
+
+    def store_file_by_hash(self, tmp_file_path: str, file_hash: str, file_path: str):
+        object_path = self.get_object_path(file_hash)
+
+        if os.path.exists(object_path):
+            os.remove(tmp_file_path)
+        else:
+            os.replace(tmp_file_path, object_path)
+
+        # identical content across projects shares one copy on disk
+        try:
+            os.link(object_path, file_path)
+        except OSError:
+            shutil.copyfile(object_path, file_path)
+
+        return file_path
@@ -0,0 +1,161 @@
+from .BaseController import BaseController
+from .ProcessController import ProcessController
+from models.db_schemas import Project, Asset
+import asyncio
+import logging
+
+
+class LeaseLostError(Exception):
+    pass
+
+
+class IngestController(BaseController):
+
+    def __init__(
+            self, project: Project, asset_model, chunk_model,
+            embedding_model=None, nlp_controller=None, lease_check=None
+    ):
+        super().__init__()
+
+        self.project = project
+        self.asset_model = asset_model
+        self.chunk_model = chunk_model
+        self.embedding_model = embedding_model
+        self.nlp_controller = nlp_controller
+        # async callable, False once the job running this ingest was taken over by another worker
+        self.lease_check = lease_check
+        self.process_controller = ProcessController(project_id=project.project_id)
+
+        self.logger = logging.getLogger(__name__)
+
+    async def chunk_asset(
+            self, asset: Asset, chunk_size: int = 100, overlap_size: int = 20,
+            splitter: str = None, length_unit: str = None
+    ):
+        # returns the stored chunk records, None when the file can't be read
+        # parsing and splitting are CPU bound, keep them off the event loop serving searches
+        parsed_file = await asyncio.to_thread(
+            self.process_controller.parse_file,
+            file_id=asset.asset_name,
+            asset_id=str(asset.id),
+            file_hash=asset.asset_hash,
+            chunk_size=chunk_size,
+            overlap_size=overlap_size,
+            splitter=splitter,
+            length_unit=length_unit
+        )
+
+        if parsed_file is None:
+            return None
+
+        asset_metadata, chunk_texts, chunks_metadata = parsed_file
+        return await self.store_asset_chunks(
+            asset=asset,
+            asset_metadata=asset_metadata,
+            chunk_texts=chunk_texts,
+            chunks_metadata=chunks_metadata
+        )
+
+    async def ensure_lease(self):
+        # checked right before every write, so a worker that lost its job never writes for it again
+        if self.lease_check is not None and not await self.lease_check():
+            raise LeaseLostError()
+
+    async def store_asset_chunks(
+            self, asset: Asset, asset_metadata: dict, chunk_texts: list, chunks_metadata: list
+    ):
+        if len(chunk_texts) == 0:
+            return []
+
+        await self.ensure_lease()
+
+        _ = await self.asset_model.mark_assets_chunking(asset_ids=[asset.id])
+        file_chunks_records = self.chunk_model.encode_chunk_batch(
+            chunk_texts=chunk_texts,
+            chunks_metadata=chunks_metadata,
+            chunk_project_id=self.project.id,
+            chunk_asset_id=asset.id
+        )
+        _ = await self.chunk_model.insert_chunk_records(records=file_chunks_records)
+
+        # document-level metadata is stored once on the asset, not on every chunk;
+        # written last, so an asset with metadata has all of its chunks
+        _ = await self.asset_model.update_asset_metadata(
+            asset_id=asset.id, asset_metadata=asset_metadata
+        )
+        asset.asset_metadata = asset_metadata
+
+        return file_chunks_records
+
+    async def clear_asset(self, asset: Asset):
+        # an asset is re-ingested from scratch: its earlier chunks, vectors and stored embeddings go first
+        chunk_ids = await self.chunk_model.get_asset_chunk_ids(asset_id=asset.id)
+        if len(chunk_ids) == 0:
+            return 0
+
+        await self.ensure_lease()
+
+        if self.nlp_controller is not None:
+            _ = await asyncio.to_thread(
+                self.nlp_controller.delete_vector_db_chunks,
+                project=self.project, chunk_ids=chunk_ids
+            )
+        if self.embedding_model is not None:
+            _ = await self.embedding_model.delete_embeddings_by_chunk_ids(chunk_ids=chunk_ids)
+
+        deleted_count = await self.chunk_model.delete_chunks_by_asset_id(asset_id=asset.id)
+
+        # near duplicates in other assets shared the deleted points, they are indexed on their own now
+        duplicate_chunks = await self.chunk_model.detach_duplicate_chunks(canonical_ids=chunk_ids)
+        if duplicate_chunks and self.nlp_controller is not None:
+            if not await self.index_chunks(chunks=duplicate_chunks):
+                self.logger.error(f"{len(duplicate_chunks)} duplicates of asset {asset.id} not indexed, push to index them")
+
+        return deleted_count
+
+    async def index_asset_records(self, asset: Asset, records: list, page_size: int = 50):
+        # insert_many filled in the _ids, the records don't need to be read back
+        chunks = self.chunk_model.decode_chunk_batch(
+            records, assets_metadata={asset.id: asset.asset_metadata}
+        )
+        return await self.index_chunks(chunks=chunks, page_size=page_size)
+
+    async def index_chunks(self, chunks: list, page_size: int = 50):
+        for i in range(0, len(chunks), page_size):
+            await self.ensure_lease()
+            is_inserted = await self.nlp_controller.index_into_vector_db(
+                project=self.project,
+                chunks=chunks[i:i+page_size],
+                embedding_model=self.embedding_model,
+                chunk_model=self.chunk_model
+            )
+            if not is_inserted:
+                return False
+
+        return True
+
+    async def ingest_asset(
+            self, asset: Asset, chunk_size: int = 100, overlap_size: int = 20,
+            splitter: str = None, length_unit: str = None, do_index: bool = True
+    ):
+        # parse, chunk, embed and index one asset; safe to run again after a partial attempt
+        _ = await self.clear_asset(asset=asset)
+
+        records = await self.chunk_asset(
+            asset=asset,
+            chunk_size=chunk_size,
+            overlap_size=overlap_size,
+            splitter=splitter,
+            length_unit=length_unit
+        )
+
+        if records is None:
+            return False, 0, f"file {asset.asset_name} could not be read"
+
+        if len(records) == 0:
+            return False, 0, f"file {asset.asset_name} produced no chunks"
+
+        if do_index and not await self.index_asset_records(asset=asset, records=records):
+            return False, len(records), "insert into vectordb failed"
+
+        return True, len(records), None
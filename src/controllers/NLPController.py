@@ -1,97 +1,738 @@
 from .BaseController import BaseController
-from models.db_schemas import Project, DataChunk
+from models.db_schemas import Project, DataChunk, CollectionInfo, IndexingRun
+from models import SearchFieldEnum, IndexingRunStatusEnum, PriorityEnum
 from stores.llm.LLM_Enums import DocumentTypeEnum
+from stores.llm.templates import rag
+from stores.vectordb.VectorDBEnums import TenancyModeEnums
+from helpers.minhash import MinHashLSH
 from typing import List
-import json
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
 
 
 class NLPController(BaseController):
 
-    def __init__(self, vectordb_client, generation_client, embedding_client):
+    def __init__(
+            self, vectordb_client, generation_client, embedding_client,
+            query_batcher=None, chunk_cache=None, answer_cache=None
+    ):
         super().__init__()
 
         self.vectordb_client = vectordb_client
         self.generation_client = generation_client
         self.embedding_client = embedding_client
+        self.query_batcher = query_batcher
+        self.chunk_cache = chunk_cache
+        self.answer_cache = answer_cache
+        self.document_batch_size = self.app_settings.EMBEDDING_DOCUMENT_BATCH_SIZE
+        self.minhash = None
+        if self.app_settings.CHUNK_DEDUP_ENABLED:
+            self.minhash = MinHashLSH(
+                num_perm=self.app_settings.CHUNK_DEDUP_NUM_PERM,
+                bands=self.app_settings.CHUNK_DEDUP_BANDS,
+                shingle_size=self.app_settings.CHUNK_DEDUP_SHINGLE_SIZE
+            )
+
+        self.logger = logging.getLogger(__name__)
+
+    def is_shared_tenancy(self):
+        return self.app_settings.VECTOR_DB_TENANCY_MODE == TenancyModeEnums.SHARED.value
 
     def create_collection_name(self, project_id: str):
+        if self.is_shared_tenancy():
+            return self.app_settings.VECTOR_DB_SHARED_COLLECTION_NAME
         return f"collection_{project_id}".strip()
 
+    def get_project_filter(self, project: Project, filter: dict = None):
+        # in the shared collection every read and delete is scoped to the project
+        if not self.is_shared_tenancy():
+            return filter
+        return {**(filter or {}), "project_id": project.project_id}
+
+    def get_record_id(self, chunk_id):
+        # deterministic and unique across projects, so re-indexing a chunk overwrites its point
+        return str(uuid.UUID(bytes=chunk_id.binary + b"\x00" * 4))
+
     def reset_vector_db_collection(self, project: Project):
         collection_name = self.create_collection_name(
             project_id=project.project_id
         )
 
+        if self.is_shared_tenancy():
+            return self.vectordb_client.delete_by_filter(
+                collection_name=collection_name,
+                filter=self.get_project_filter(project)
+            )
+
         return self.vectordb_client.delete_collection(collection_name=collection_name)
 
-    def get_vector_db_collection_info(self, project: Project):
+    def delete_vector_db_chunks(self, project: Project, chunk_ids: list):
+        collection_name = self.create_collection_name(
+            project_id=project.project_id
+        )
+        return self.vectordb_client.delete_by_filter(
+            collection_name=collection_name,
+            filter=self.get_project_filter(project, {"chunk_id": [str(chunk_id) for chunk_id in chunk_ids]})
+        )
+
+    def get_vector_db_collection_info(self, project: Project) -> CollectionInfo:
         collection_name = self.create_collection_name(
             project_id=project.project_id
         )
         collection_info = self.vectordb_client.get_collection_info(
             collection_name=collection_name
         )
-        return json.loads(
-            json.dumps(
-                collection_info, default=lambda x: x.__dict__
+
+        if collection_info and self.is_shared_tenancy():
+            collection_info.project_points_count = self.vectordb_client.count(
+                collection_name=collection_name,
+                filter=self.get_project_filter(project)
             )
-        )
 
-    def index_into_vector_db(
-            self, project: Project, chunk_ids: List[int], chunks: List[DataChunk], do_reset: bool = False
+        return collection_info
+
+    def get_embedding_model_id(self):
+        # stored vectors are only reusable with the exact model that produced them
+        return f"{self.app_settings.EMBEDDING_BACKEND}/{self.embedding_client.embedding_model_id}"
+
+    def embed_chunk_texts(self, texts: list):
+        # the provider scheduler throttles these down to the sustainable rate,
+        # behind any query embeddings waiting for the same provider
+        batch_size = max(1, self.document_batch_size)
+        with ThreadPoolExecutor(
+            max_workers=self.app_settings.LLM_SCHEDULER_MAX_CONCURRENCY
+        ) as executor:
+            if batch_size == 1:
+                return list(executor.map(
+                    lambda text: self.embedding_client.embed_text(
+                        text=text, document_type=DocumentTypeEnum.DOCUMENT.value,
+                        priority=PriorityEnum.BULK.value),
+                    texts
+                ))
+
+            # a failed call leaves its whole batch without vectors
+            batches = [texts[i:i+batch_size] for i in range(0, len(texts), batch_size)]
+            return [
+                vector
+                for batch, vectors in zip(batches, executor.map(
+                    lambda batch: self.embedding_client.embed_batch(
+                        texts=batch, document_type=DocumentTypeEnum.DOCUMENT.value,
+                        priority=PriorityEnum.BULK.value),
+                    batches
+                ))
+                for vector in (vectors or [None] * len(batch))
+            ]
+
+    def insert_into_vector_db(
+            self, project: Project, chunks: List[DataChunk], vectors: list, do_reset: bool = False
     ):
         collection_name = self.create_collection_name(
             project_id=project.project_id
         )
-        texts = [c.chunk_text for c in chunks]
-        metadata = [c.chunk_metadata for c in chunks]
-        vectors = [
-            self.embedding_client.embed_text(
-                text=text, document_type=DocumentTypeEnum.DOCUMENT.value)
-            for text in texts
-        ]
+
+        if do_reset and self.is_shared_tenancy():
+            _ = self.reset_vector_db_collection(project=project)
 
         _ = self.vectordb_client.create_collection(
             collection_name=collection_name,
             embedding_size=self.embedding_client.embedding_size,
-            do_reset=do_reset
+            do_reset=do_reset and not self.is_shared_tenancy(),
+            tenant_field="project_id" if self.is_shared_tenancy() else None
         )
 
-        _ = self.vectordb_client.insert_many(
+        extra_payloads = [{"chunk_id": str(c.id)} for c in chunks]
+        if self.is_shared_tenancy():
+            for extra_payload in extra_payloads:
+                extra_payload["project_id"] = project.project_id
+
+        # point ids are derived from chunk ids, so re-sending a batch overwrites instead of duplicating
+        return self.vectordb_client.insert_many(
             collection_name=collection_name,
-            texts=texts,
-            metadata=metadata,
+            texts=[c.chunk_text for c in chunks],
+            metadata=[c.chunk_metadata for c in chunks],
             vectors=vectors,
-            record_ids=chunk_ids
+            record_ids=[self.get_record_id(c.id) for c in chunks],
+            extra_payloads=extra_payloads
+        )
+
+    async def find_duplicate_chunks(self, project: Project, chunks: List[DataChunk], chunk_model):
+        # returns the lsh bands of the chunks and, for the near duplicates, their canonical chunk id;
+        # chunks only match earlier chunks, so a canonical chunk is indexed before its duplicates
+        signatures = await asyncio.to_thread(
+            lambda: [self.minhash.get_signature(c.chunk_text) for c in chunks]
+        )
+        chunks_bands = {
+            c.id: self.minhash.get_bands(signature)
+            for c, signature in zip(chunks, signatures)
+            if signature is not None
+        }
+        if len(chunks_bands) == 0:
+            return chunks_bands, {}
+
+        candidates = await chunk_model.get_dedup_candidates(
+            project_id=project.id,
+            bands=list({band for bands in chunks_bands.values() for band in bands}),
+            before_chunk_id=max(c.id for c in chunks),
+            exclude_chunk_ids=[c.id for c in chunks]
+        )
+        candidate_signatures = await asyncio.to_thread(
+            lambda: [self.minhash.get_signature(text) for _, text in candidates]
+        )
+
+        buckets = {}
+        for (candidate_id, _), signature in zip(candidates, candidate_signatures):
+            if signature is None:
+                continue
+            for band in self.minhash.get_bands(signature):
+                buckets.setdefault(band, []).append((candidate_id, signature))
+
+        canonical_ids = {}
+        for chunk, signature in sorted(zip(chunks, signatures), key=lambda item: item[0].id):
+            if signature is None:
+                continue
+
+            best_id, best_similarity = None, 0.0
+            for band in chunks_bands[chunk.id]:
+                for candidate_id, candidate_signature in buckets.get(band, []):
+                    if candidate_id >= chunk.id:
+                        continue
+                    similarity = self.minhash.get_similarity(signature, candidate_signature)
+                    if similarity >= self.app_settings.CHUNK_DEDUP_THRESHOLD and similarity > best_similarity:
+                        best_id, best_similarity = candidate_id, similarity
+
+            if best_id is not None:
+                canonical_ids[chunk.id] = best_id
+                continue
+
+            # canonical chunks of the page are candidates for the rest of it
+            for band in chunks_bands[chunk.id]:
+                buckets.setdefault(band, []).append((chunk.id, signature))
+
+        return chunks_bands, canonical_ids
+
+    async def index_into_vector_db(
+            self, project: Project, chunks: List[DataChunk], do_reset: bool = False,
+            embedding_model=None, chunk_model=None
+    ):
+        use_store = embedding_model is not None and self.app_settings.EMBEDDING_STORE_ENABLED
+        model_id = self.get_embedding_model_id()
+
+        chunks_bands, canonical_ids = {}, {}
+        if self.minhash is not None and chunk_model is not None and chunks:
+            chunks_bands, canonical_ids = await self.find_duplicate_chunks(
+                project=project, chunks=chunks, chunk_model=chunk_model
+            )
+        # near duplicates are neither embedded nor stored, they share the point of their canonical chunk
+        page_chunks = chunks
+        chunks = [c for c in page_chunks if c.id not in canonical_ids]
+
+        stored_vectors = {}
+        if use_store:
+            stored_vectors = await embedding_model.get_embeddings_by_chunk_ids(
+                chunk_ids=[c.id for c in chunks], model_id=model_id
+            )
+
+        missing_chunks = [c for c in chunks if c.id not in stored_vectors]
+        new_vectors = await asyncio.to_thread(
+            self.embed_chunk_texts, [c.chunk_text for c in missing_chunks]
         )
 
+        if any(not vector for vector in new_vectors):
+            self.logger.error(
+                f"Embedding failed for {sum(1 for v in new_vectors if not v)} chunks, batch not indexed")
+            return False
+
+        if use_store and missing_chunks:
+            _ = await embedding_model.upsert_embeddings(embeddings=[
+                embedding_model.encode_embedding(
+                    chunk_id=c.id, project_id=project.id, model_id=model_id, vector=vector
+                )
+                for c, vector in zip(missing_chunks, new_vectors)
+            ])
+
+        vectors = {c.id: vector for c, vector in zip(missing_chunks, new_vectors)}
+        vectors.update(stored_vectors)
+
+        # off the event loop: the writes wait behind searches in the vector store
+        is_inserted = await asyncio.to_thread(
+            self.insert_into_vector_db,
+            project=project,
+            chunks=chunks,
+            vectors=[vectors[c.id] for c in chunks],
+            do_reset=do_reset
+        )
+        if not is_inserted or len(chunks_bands) == 0:
+            return is_inserted
+
+        # chunks indexed on their own before drop their point once they turn out to be duplicates
+        demoted_chunk_ids = [
+            c.id for c in page_chunks
+            if c.id in canonical_ids and c.chunk_lsh_bands is not None and c.chunk_canonical_id is None
+        ]
+        if demoted_chunk_ids:
+            _ = await asyncio.to_thread(
+                self.delete_vector_db_chunks, project=project, chunk_ids=demoted_chunk_ids
+            )
+
+        # written after the insert: only chunks with a point become candidates for later ones
+        _ = await chunk_model.update_chunks_dedup(
+            chunks_bands=chunks_bands, canonical_ids=canonical_ids, demoted_chunk_ids=demoted_chunk_ids
+        )
         return True
 
-    def search_vector_db_collection(
-            self, project: Project, text: str, limit: int = 10
+    async def rebuild_vector_db_collection(
+            self, project: Project, chunk_model, embedding_model, page_size: int = 1000
     ):
-        collection_name = self.create_collection_name(
-            project_id=project.project_id
+        # streams stored vectors into a fresh collection, no provider calls
+        model_id = self.get_embedding_model_id()
+        last_chunk_id = None
+        rebuilt_count = 0
+
+        # the live index is only dropped when every chunk can be restored from the store
+        missing_count = await self.count_missing_embeddings(
+            project=project, chunk_model=chunk_model, embedding_model=embedding_model,
+            model_id=model_id, page_size=page_size
+        )
+        if missing_count > 0:
+            return False, rebuilt_count, missing_count
+
+        _ = await asyncio.to_thread(self.reset_vector_db_collection, project=project)
+
+        while True:
+            page_chunks = await chunk_model.get_project_chunks_after(
+                project_id=project.id, after_chunk_id=last_chunk_id, page_size=page_size
+            )
+            if not page_chunks:
+                break
+
+            # near duplicates have no vector of their own
+            canonical_chunks = [c for c in page_chunks if c.chunk_canonical_id is None]
+            stored_vectors = await embedding_model.get_embeddings_by_chunk_ids(
+                chunk_ids=[c.id for c in canonical_chunks], model_id=model_id
+            )
+            chunks = [c for c in canonical_chunks if c.id in stored_vectors]
+            missing_count += len(canonical_chunks) - len(chunks)
+
+            if chunks:
+                is_inserted = await asyncio.to_thread(
+                    self.insert_into_vector_db,
+                    project=project,
+                    chunks=chunks,
+                    vectors=[stored_vectors[c.id] for c in chunks]
+                )
+                if not is_inserted:
+                    return False, rebuilt_count, missing_count
+                rebuilt_count += len(chunks)
+
+            last_chunk_id = page_chunks[-1].id
+
+        return True, rebuilt_count, missing_count
+
+    async def count_missing_embeddings(
+            self, project: Project, chunk_model, embedding_model, model_id: str, page_size: int = 1000
+    ):
+        missing_count = 0
+        last_chunk_id = None
+        while True:
+            records = await chunk_model.get_project_chunk_ids_after(
+                project_id=project.id, after_chunk_id=last_chunk_id, page_size=page_size
+            )
+            if not records:
+                break
+
+            # near duplicates have no vector of their own
+            chunk_ids = [record["_id"] for record in records if record.get("chunk_canonical_id") is None]
+            missing_count += len(chunk_ids) - await embedding_model.count_embeddings(
+                chunk_ids=chunk_ids, model_id=model_id
+            )
+            last_chunk_id = records[-1]["_id"]
+
+        return missing_count
+
+    async def index_project_chunks(
+            self, project: Project, run: IndexingRun, chunk_model, indexing_run_model,
+            embedding_model=None, page_size: int = 50
+    ):
+        # continues from the run checkpoint, a fresh run starts at the first chunk
+        last_chunk_id = run.run_last_chunk_id
+        indexed_count = run.run_indexed_count
+        status = IndexingRunStatusEnum.COMPLETED.value
+        error = None
+
+        try:
+            while True:
+                page_chunks = await chunk_model.get_project_chunks_after(
+                    project_id=project.id, after_chunk_id=last_chunk_id, page_size=page_size
+                )
+                if not page_chunks:
+                    break
+
+                # only the first page of a run may reset the collection, later pages append to it
+                is_inserted = await self.index_into_vector_db(
+                    project=project,
+                    chunks=page_chunks,
+                    do_reset=bool(run.run_do_reset) and last_chunk_id is None,
+                    embedding_model=embedding_model,
+                    chunk_model=chunk_model
+                )
+                if not is_inserted:
+                    status = IndexingRunStatusEnum.FAILED.value
+                    error = "insert into vectordb failed"
+                    break
+
+                last_chunk_id = page_chunks[-1].id
+                indexed_count += len(page_chunks)
+                _ = await indexing_run_model.update_checkpoint(
+                    run_id=run.id, last_chunk_id=last_chunk_id, indexed_count=indexed_count
+                )
+        except Exception as e:
+            self.logger.error(f"Indexing run {run.id} failed: {e}")
+            status = IndexingRunStatusEnum.FAILED.value
+            error = str(e)
+
+        _ = await indexing_run_model.update_status(run_id=run.id, status=status, error=error)
+
+        run.run_last_chunk_id = last_chunk_id
+        run.run_indexed_count = indexed_count
+        run.run_status = status
+        run.run_error = error
+        return run
+
+    def get_request_deadline(self):
+        return time.monotonic() + self.app_settings.SEARCH_DEADLINE_MS / 1000.0
+
+    def is_embedding_unavailable(self):
+        scheduler = getattr(self.embedding_client, "scheduler", None)
+        return scheduler is not None and scheduler.breaker.is_open()
+
+    async def embed_query(self, text: str, deadline: float = None):
+        if self.query_batcher is not None:
+            return await self.query_batcher.embed(text, deadline=deadline)
+
+        return await asyncio.to_thread(
+            self.embedding_client.embed_text,
+            text=text, document_type=DocumentTypeEnum.QUERY.value, deadline=deadline
         )
 
-        vector = self.embedding_client.embed_text(
-            text=text, document_type=DocumentTypeEnum.QUERY.value
+    def get_result_fields(self, fields: list = None):
+        # id and score are always returned, the rest is opt-in once fields are given
+        if not fields:
+            fields = list(SearchFieldEnum)
+        result_fields = {"id", "score", *(SearchFieldEnum(field).value for field in fields)}
+        if SearchFieldEnum.DUPLICATES.value in result_fields:
+            result_fields.add("duplicates_count")
+        return result_fields
+
+    def needs_hydration(self, result_fields: set):
+        return bool(result_fields & {SearchFieldEnum.TEXT.value, SearchFieldEnum.METADATA.value})
+
+    def needs_duplicates(self, result_fields: set):
+        if not self.app_settings.CHUNK_DEDUP_ENABLED:
+            return False
+        return result_fields is None or SearchFieldEnum.DUPLICATES.value in result_fields
+
+    async def attach_duplicates(self, results: list, chunk_model):
+        # a hit on a canonical chunk stands for its near duplicates too, list them with it
+        chunk_ids = list({document.chunk_id for document in results if document.chunk_id})
+        if len(chunk_ids) == 0 or chunk_model is None:
+            return results
+
+        duplicates = await chunk_model.get_duplicate_chunks(
+            canonical_ids=chunk_ids, max_per_chunk=self.app_settings.CHUNK_DEDUP_MAX_ATTACHED
         )
+        for document in results:
+            if document.chunk_id in duplicates:
+                document.duplicates_count, document.duplicates = duplicates[document.chunk_id]
+
+        return results
+
+    async def hydrate_search_results(self, results: list, chunk_model):
+        # slim payloads only carry the chunk id, fill text/metadata back in from mongo
+        missing_ids = []
+        for document in results:
+            chunk_id = document.chunk_id
+            if chunk_id is None or document.text is not None:
+                continue
+            if self.chunk_cache is None or self.chunk_cache.get(chunk_id) is None:
+                missing_ids.append(chunk_id)
+
+        chunks = {}
+        if missing_ids and chunk_model is not None:
+            chunks = await chunk_model.get_chunks_by_ids(chunk_ids=missing_ids)
+            if self.chunk_cache is not None:
+                for chunk_id, chunk in chunks.items():
+                    self.chunk_cache.set(chunk_id, chunk)
+
+        for document in results:
+            chunk_id = document.chunk_id
+            if chunk_id is None or document.text is not None:
+                continue
+
+            chunk = chunks.get(chunk_id)
+            if chunk is None and self.chunk_cache is not None:
+                chunk = self.chunk_cache.get(chunk_id)
+            if chunk is None:
+                self.logger.error(f"Chunk {chunk_id} referenced by the vector store was not found")
+                continue
+
+            document.text = chunk.chunk_text
+            document.metadata = chunk.chunk_metadata
+
+        return results
+
+    async def search_vector_db_collection(
+            self, project: Project, text: str, limit: int = 10, chunk_model=None,
+            result_fields: set = None, deadline: float = None
+    ):
+        vector = await self.embed_query(text=text, deadline=deadline)
 
         if not vector or len(vector) == 0:
             return False
 
-        result = self.vectordb_client.search_by_vector(
+        return await self.search_vector_db_collection_by_vector(
+            project=project, vector=vector, limit=limit,
+            chunk_model=chunk_model, result_fields=result_fields
+        )
+
+    async def search_vector_db_collection_by_vector(
+            self, project: Project, vector: list, limit: int = 10, chunk_model=None,
+            result_fields: set = None
+    ):
+        collection_name = self.create_collection_name(
+            project_id=project.project_id
+        )
+
+        result = await asyncio.to_thread(
+            self.vectordb_client.search_by_vector,
             collection_name=collection_name,
             vector=vector,
-            limit=limit
+            limit=limit,
+            filter=self.get_project_filter(project)
         )
 
         if not result:
             return False
 
-        return json.loads(
-            json.dumps(
-                result, default=lambda x: x.__dict__
+        if result_fields is None or self.needs_hydration(result_fields):
+            result = await self.hydrate_search_results(result, chunk_model=chunk_model)
+
+        if self.needs_duplicates(result_fields):
+            result = await self.attach_duplicates(result, chunk_model=chunk_model)
+
+        return result
+
+    def get_document_budgets(self, footer_prompt: str, texts: list):
+        # the provider cuts the prompt at its input limit, so the documents share
+        # what the question leaves and the footer is never truncated
+        max_characters = self.generation_client.default_input_max_characters
+        if not max_characters:
+            return [len(text) for text in texts]
+
+        headers_size = sum(
+            len(rag.document_prompt.substitute(doc_num=i + 1, chunk_text="")) + 1
+            for i in range(len(texts))
+        ) + 1
+        remaining = max(0, max_characters - len(footer_prompt) - headers_size)
+
+        # shorter documents take what they need, the rest is split among the longer ones
+        budgets = [0] * len(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for position, i in enumerate(order):
+            budgets[i] = min(len(texts[i]), remaining // (len(texts) - position))
+            remaining -= budgets[i]
+
+        return budgets
+
+    def construct_rag_prompts(self, query: str, documents: list):
+        footer_prompt = rag.footer_prompt.substitute(query=query)
+
+        texts = [document.text for document in documents if document.text]
+        budgets = self.get_document_budgets(footer_prompt=footer_prompt, texts=texts)
+        texts = [text[:budget] for text, budget in zip(texts, budgets) if budget > 0]
+
+        documents_prompts = "\n".join([
+            rag.document_prompt.substitute(doc_num=i + 1, chunk_text=text)
+            for i, text in enumerate(texts)
+        ])
+        full_prompt = "\n\n".join([
+            documents_prompts,
+            footer_prompt
+        ])
+
+        chat_history = [
+            self.generation_client.construct_prompt(
+                prompt=rag.system_prompt,
+                role=self.generation_client.enums.SYSTEM.value
             )
+        ]
+        return full_prompt, chat_history
+
+    async def answer_rag_question(
+            self, project: Project, query: str, limit: int = 5, chunk_model=None,
+            deadline: float = None
+    ):
+        vector = await self.embed_query(text=query, deadline=deadline)
+
+        if not vector or len(vector) == 0:
+            return None, None, False
+
+        # a rephrased question against an unchanged index reuses the earlier answer
+        cache_key = f"{project.project_id}/{limit}"
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(
+                key=cache_key, version=project.project_index_version, vector=vector
+            )
+            if cached is not None:
+                answer, chunk_ids = cached
+                return answer, chunk_ids, True
+
+        documents = await self.search_vector_db_collection_by_vector(
+            project=project, vector=vector, limit=limit, chunk_model=chunk_model,
+            result_fields=self.get_result_fields([SearchFieldEnum.TEXT, SearchFieldEnum.CHUNK_ID])
+        )
+
+        if not documents:
+            return None, None, False
+
+        full_prompt, chat_history = self.construct_rag_prompts(query=query, documents=documents)
+
+        answer = await asyncio.to_thread(
+            self.generation_client.generate_text,
+            prompt=full_prompt,
+            chat_history=chat_history
         )
+
+        if not answer:
+            return None, None, False
+
+        chunk_ids = [document.chunk_id for document in documents if document.chunk_id]
+        if self.answer_cache is not None:
+            self.answer_cache.set(
+                key=cache_key, version=project.project_index_version,
+                vector=vector, value=(answer, chunk_ids)
+            )
+
+        return answer, chunk_ids, False
+
+    async def search_vector_db_collection_batch(
+            self, project: Project, queries: list, chunk_model=None,
+            result_fields: set = None, deadline: float = None
+    ):
+        collection_name = self.create_collection_name(
+            project_id=project.project_id
+        )
+
+        # the queries are already a batch, embed them in one call without the micro-batcher
+        vectors = await asyncio.to_thread(
+            self.embedding_client.embed_batch,
+            texts=[query.text for query in queries],
+            document_type=DocumentTypeEnum.QUERY.value,
+            deadline=deadline
+        )
+
+        if not vectors or len(vectors) != len(queries):
+            return False
+
+        results = await asyncio.to_thread(
+            self.vectordb_client.search_batch,
+            collection_name=collection_name,
+            vectors=vectors,
+            limits=[query.limit for query in queries],
+            filters=[self.get_project_filter(project, query.filter) for query in queries]
+        )
+
+        if results is None:
+            return False
+
+        # one hydration pass for the hits of every query
+        if result_fields is None or self.needs_hydration(result_fields):
+            _ = await self.hydrate_search_results(
+                [document for result in results for document in result],
+                chunk_model=chunk_model
+            )
+
+        if self.needs_duplicates(result_fields):
+            _ = await self.attach_duplicates(
+                [document for result in results for document in result],
+                chunk_model=chunk_model
+            )
+
+        return results
+
+    async def search_collection_with_deadline(
+            self, project: Project, vector: list, limit: int, deadline: float
+    ):
+        collection_name = self.create_collection_name(
+            project_id=project.project_id
+        )
+        try:
+            result = await asyncio.wait_for(
+                asyncio.to_thread(
+                    self.vectordb_client.search_by_vector,
+                    collection_name=collection_name,
+                    vector=vector,
+                    limit=limit,
+                    filter=self.get_project_filter(project),
+                    timeout=deadline
+                ),
+                timeout=deadline
+            )
+        except asyncio.TimeoutError:
+            self.logger.error(f"Search in {collection_name} missed its deadline")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error while searching {collection_name}: {e}")
+            return None
+
+        for document in result:
+            document.project_id = project.project_id
+            document.normalized_score = self.vectordb_client.normalize_score(document.score)
+
+        return result
+
+    async def search_vector_db_collections_federated(
+            self, projects: list, text: str, limit: int = 10,
+            deadline: float = 2.0, chunk_model=None, result_fields: set = None,
+            request_deadline: float = None
+    ):
+        vector = await self.embed_query(text=text, deadline=request_deadline)
+
+        if not vector or len(vector) == 0:
+            return False, []
+
+        # every collection is searched concurrently, a slow one only costs its own deadline
+        project_results = await asyncio.gather(*[
+            self.search_collection_with_deadline(
+                project=project, vector=vector, limit=limit, deadline=deadline
+            )
+            for project in projects
+        ])
+
+        skipped_projects = [
+            project.project_id
+            for project, result in zip(projects, project_results)
+            if result is None
+        ]
+
+        # each list is already sorted by score, so a heap merge yields the global top-k
+        merged = list(itertools.islice(
+            heapq.merge(
+                *[result for result in project_results if result],
+                key=lambda document: document.normalized_score,
+                reverse=True
+            ),
+            limit
+        ))
+
+        if result_fields is None or self.needs_hydration(result_fields):
+            merged = await self.hydrate_search_results(merged, chunk_model=chunk_model)
+
+        if self.needs_duplicates(result_fields):
+            merged = await self.attach_duplicates(merged, chunk_model=chunk_model)
+
+        return merged, skipped_projects
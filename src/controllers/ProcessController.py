@@ -2,9 +2,11 @@ from .BaseController import BaseController
 
 from .ProjectController import ProjectController
 import os
-from langchain_community.document_loaders import TextLoader, PyMuPDFLoader
-from models import ProcessingEnum
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import json
+import zlib
+from models import ProcessingEnum, SplitterEnum, LengthUnitEnum
+from helpers.text_splitter import NativeTextSplitter, count_tokens
+from helpers.cache import DiskCache
 
 
 class ProcessController(BaseController):
@@ -12,6 +14,10 @@ class ProcessController(BaseController):
         self.project_id = project_id
         super().__init__()
         self.project_path = ProjectController().get_project_path(project_id)
+        self.parsed_cache = DiskCache.for_dir(
+            cache_dir=self.parsed_dir,
+            max_size=self.app_settings.PARSED_TEXT_CACHE_MAX_SIZE * 1024 * 1024
+        )
 
     def get_file_extension(self, file_id: str):
         return os.path.splitext(file_id)[-1]
@@ -24,31 +30,66 @@ class ProcessController(BaseController):
         )
         if not os.path.exists(file_path):
             return None
+        # loaders pull in langchain_community and PyMuPDF, import them on first use
         if file_ext == ProcessingEnum.TXT.value:
+            from langchain_community.document_loaders import TextLoader
             return TextLoader(file_path, encoding='utf-8')
 
         if file_ext == ProcessingEnum.PDF.value:
+            from langchain_community.document_loaders import PyMuPDFLoader
             return PyMuPDFLoader(file_path)
 
         return None
 
-    def get_file_content(self, file_id: str):
+    def get_parsed_cache_key(self, file_id: str, asset_id: str, file_hash: str = None):
+        if file_hash is None:
+            # assets uploaded before hashing: the file size and mtime stand in for the hash
+            file_path = os.path.join(self.project_path, file_id)
+            if not os.path.exists(file_path):
+                return None
+            stat = os.stat(file_path)
+            file_hash = f"{stat.st_size}-{stat.st_mtime_ns}"
+        return f"{asset_id}_{file_hash}"
+
+    def get_file_content(self, file_id: str, asset_id: str = None, file_hash: str = None):
+
+        cache_key = None
+        if asset_id is not None:
+            cache_key = self.get_parsed_cache_key(file_id, asset_id, file_hash)
+
+        if cache_key is not None:
+            cached = self.parsed_cache.get(cache_key)
+            if cached is not None:
+                from langchain_core.documents import Document
+                return [
+                    Document(page_content=text, metadata=metadata)
+                    for text, metadata in json.loads(zlib.decompress(cached))
+                ]
 
         loader = self.get_file_loader(file_id)
-        if loader:
-            return loader.load()
-        return None
+        if not loader:
+            return None
+
+        file_content = loader.load()
+
+        if cache_key is not None:
+            # entries of an older version of this asset can never be hit again
+            self.parsed_cache.delete_prefix(f"{asset_id}_", keep=cache_key)
+            self.parsed_cache.set(cache_key, zlib.compress(json.dumps(
+                [[rec.page_content, rec.metadata] for rec in file_content],
+                separators=(",", ":")
+            ).encode("utf-8")))
+
+        return file_content
 
     def process_file_content(
             self, file_content: list, file_id: str,
-            chunk_size: int = 100, overlap_size: int = 20
+            chunk_size: int = 100, overlap_size: int = 20,
+            splitter: str = None, length_unit: str = None
     ):
+        splitter = splitter if splitter else self.app_settings.TEXT_SPLITTER_BACKEND
+        length_unit = length_unit if length_unit else self.app_settings.TEXT_SPLITTER_LENGTH_UNIT
 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=overlap_size,
-            length_function=len
-        )
         file_content_text = [
             rec.page_content
             for rec in file_content
@@ -57,9 +98,76 @@ class ProcessController(BaseController):
             rec.metadata
             for rec in file_content
         ]
+
+        if splitter == SplitterEnum.NATIVE.value:
+            from langchain_core.documents import Document
+            text_splitter = NativeTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=overlap_size,
+                use_tokens=length_unit == LengthUnitEnum.TOKEN.value
+            )
+            return [
+                Document(page_content=chunk, metadata=dict(metadata))
+                for text, metadata in zip(file_content_text, file_content_metadata)
+                for chunk in text_splitter.split_text(text)
+            ]
+
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=overlap_size,
+            length_function=count_tokens if length_unit == LengthUnitEnum.TOKEN.value else len
+        )
         chunks = text_splitter.create_documents(
             file_content_text,
             metadatas=file_content_metadata
         )
 
         return chunks
+
+    def split_chunks_metadata(self, chunks: list):
+        # fields shared by every chunk (source, author, dates...) belong to the asset,
+        # only the ones that vary (page...) are kept per chunk
+        if len(chunks) == 0:
+            return {}, []
+
+        asset_metadata = dict(chunks[0].metadata)
+        for chunk in chunks[1:]:
+            for key in list(asset_metadata.keys()):
+                if key not in chunk.metadata or chunk.metadata[key] != asset_metadata[key]:
+                    del asset_metadata[key]
+
+        chunks_metadata = [
+            {
+                key: value
+                for key, value in chunk.metadata.items()
+                if key not in asset_metadata
+            }
+            for chunk in chunks
+        ]
+
+        return asset_metadata, chunks_metadata
+
+    def parse_file(
+            self, file_id: str, asset_id: str = None, file_hash: str = None,
+            chunk_size: int = 100, overlap_size: int = 20,
+            splitter: str = None, length_unit: str = None
+    ):
+        # plain values only, so it can run in another process; None when the file can't be read
+        file_content = self.get_file_content(file_id=file_id, asset_id=asset_id, file_hash=file_hash)
+        if file_content is None:
+            return None
+
+        file_chunks = self.process_file_content(
+            file_content=file_content,
+            file_id=file_id,
+            chunk_size=chunk_size,
+            overlap_size=overlap_size,
+            splitter=splitter,
+            length_unit=length_unit
+        )
+        if file_chunks is None or len(file_chunks) == 0:
+            return {}, [], []
+
+        asset_metadata, chunks_metadata = self.split_chunks_metadata(chunks=file_chunks)
+        return asset_metadata, [chunk.page_content for chunk in file_chunks], chunks_metadata
@@ -0,0 +1,92 @@
+from fastapi import Request
+from collections import deque
+import asyncio
+import math
+import time
+
+
+class AdmissionRejectedError(Exception):
+
+    def __init__(self, pool_name: str, retry_after: int):
+        super().__init__(f"{pool_name} admission pool is saturated")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class AdmissionPool:
+
+    def __init__(self, name: str, max_concurrency: int, max_queue_size: int, queue_timeout_ms: float):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max(0, max_queue_size)
+        self.queue_timeout = max(0.0, queue_timeout_ms) / 1000.0
+
+        self.in_flight = 0
+        self.waiters = deque()
+        self.service_time = None
+
+    def get_retry_after(self):
+        # roughly how long it takes the pool to work through everything ahead of a new request
+        service_time = self.service_time or 1.0
+        waves = (len(self.waiters) + self.in_flight) / self.max_concurrency
+        return max(1, math.ceil(service_time * waves))
+
+    async def acquire(self):
+        if self.in_flight < self.max_concurrency and not self.waiters:
+            self.in_flight += 1
+            return
+
+        if len(self.waiters) >= self.max_queue_size:
+            raise AdmissionRejectedError(self.name, self.get_retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise AdmissionRejectedError(self.name, self.get_retry_after())
+        except BaseException:
+            # cancelled (client gone) after the slot was handed over: pass it on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self.waiters:
+                self.waiters.remove(future)
+
+    def release(self, service_time: float = None):
+        if service_time is not None:
+            self.service_time = service_time if self.service_time is None else (
+                0.9 * self.service_time + 0.1 * service_time
+            )
+
+        # the slot goes straight to the oldest waiter, in_flight stays the same
+        while self.waiters:
+            future = self.waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                return
+
+        self.in_flight -= 1
+
+    def get_status(self):
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size
+        }
+
+
+def admission(priority: str):
+    # route dependency: holds a slot of the priority's pool for the duration of the request
+    async def dependency(request: Request):
+        pool = request.app.admission_pools[priority]
+        await pool.acquire()
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            pool.release(service_time=time.monotonic() - started_at)
+
+    return dependency
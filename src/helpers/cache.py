@@ -0,0 +1,229 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class LRUCache:
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.items = OrderedDict()
+
+    def get(self, key):
+        if key not in self.items:
+            return None
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def delete(self, key):
+        self.items.pop(key, None)
+
+    def clear(self):
+        self.items.clear()
+
+
+class DiskCache:
+
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str, max_size: int):
+        # max_size is in bytes, 0 disables the cache
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        # bytes in the directory at the last scan plus the writes of this process since,
+        # None until the first scan; writes of other processes are picked up by the next scan
+        self.total_size = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_dir(cls, cache_dir: str, max_size: int):
+        # one cache per directory and process, so the running total outlives the controllers using it
+        with cls._caches_lock:
+            cache = cls._caches.get(cache_dir)
+            if cache is None or cache.max_size != max_size:
+                cache = cls._caches[cache_dir] = cls(cache_dir=cache_dir, max_size=max_size)
+            return cache
+
+    def get_path(self, key: str):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str):
+        if self.max_size <= 0:
+            return None
+
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+        except OSError:
+            return None
+
+        # mtime doubles as the last access time for eviction
+        os.utime(path)
+        return value
+
+    def set(self, key: str, value: bytes):
+        if self.max_size <= 0 or len(value) > self.max_size:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.get_path(key)
+        try:
+            replaced_size = os.path.getsize(path)
+        except OSError:
+            replaced_size = 0
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+        # the directory is only scanned once the running total goes over the limit
+        with self.lock:
+            if self.total_size is not None:
+                self.total_size += len(value) - replaced_size
+            is_over = self.total_size is None or self.total_size > self.max_size
+        if is_over:
+            self.evict()
+
+    def delete_prefix(self, prefix: str, keep: str = None):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(prefix) and entry.name != keep:
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+                with self.lock:
+                    if self.total_size is not None:
+                        self.total_size -= size
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file() or entry.name.endswith(".part"):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+        # least recently used first, down to 90% so a full cache is not rescanned on every write
+        target_size = self.max_size * 0.9
+        for _, size, path in sorted(entries):
+            if total_size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+        with self.lock:
+            self.total_size = total_size
+
+
+class SemanticCacheIndex:
+
+    def __init__(self, version: int, dimension: int):
+        self.version = version
+        self.vectors = np.zeros((16, dimension), dtype=np.float32)
+        self.last_used = np.zeros(16, dtype=np.int64)
+        self.values = []
+        self.count = 0
+
+    def grow(self, max_size: int):
+        # storage doubles up to max_size instead of being allocated upfront
+        capacity = min(max_size, 2 * len(self.vectors))
+        self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+        self.last_used = np.resize(self.last_used, capacity)
+
+
+class SemanticCache:
+
+    def __init__(self, max_size: int, similarity_threshold: float, max_indexes: int):
+        # max_size is the number of entries kept per key, 0 disables the cache;
+        # at most max_indexes keys are kept, the least recently used one is dropped
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+        self.max_indexes = max_indexes
+        self.indexes = OrderedDict()
+        self.clock = 0
+
+    def normalize(self, vector: list):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def get_index(self, key: str, version: int, dimension: int):
+        index = self.indexes.get(key)
+        if index is None or index.version != version or index.vectors.shape[1] != dimension:
+            return None
+        self.indexes.move_to_end(key)
+        return index
+
+    def get(self, key: str, version: int, vector: list):
+        if self.max_size <= 0:
+            return None
+
+        vector = self.normalize(vector)
+        index = self.get_index(key, version, len(vector))
+        if index is None or index.count == 0:
+            return None
+
+        # entries are unit vectors, so the dot product is the cosine similarity
+        similarities = index.vectors[:index.count] @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        self.clock += 1
+        index.last_used[best] = self.clock
+        return index.values[best]
+
+    def set(self, key: str, version: int, vector: list, value):
+        if self.max_size <= 0:
+            return
+
+        vector = self.normalize(vector)
+        index = self.get_index(key, version, len(vector))
+        if index is None:
+            current = self.indexes.get(key)
+            if current is not None and current.version > version:
+                # computed against an index that has been replaced since
+                return
+            index = SemanticCacheIndex(version, len(vector))
+            self.indexes[key] = index
+            self.indexes.move_to_end(key)
+            while len(self.indexes) > self.max_indexes:
+                self.indexes.popitem(last=False)
+
+        if index.count < self.max_size:
+            if index.count == len(index.vectors):
+                index.grow(self.max_size)
+            position = index.count
+            index.count += 1
+            index.values.append(value)
+        else:
+            # full: the least recently used answer makes room
+            position = int(np.argmin(index.last_used[:index.count]))
+            index.values[position] = value
+
+        self.clock += 1
+        index.vectors[position] = vector
+        index.last_used[position] = self.clock
+
+    def delete(self, key: str):
+        self.indexes.pop(key, None)
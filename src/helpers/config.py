@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -8,6 +9,24 @@ class Settings(BaseSettings):
     FILE_ALLOWED_TYPES: list
     FILE_MAX_SIZE: int
     FILE_DEFAULT_CHUNK_SIZE: int
+    FILE_ARCHIVE_TYPES: list = [
+        "application/zip", "application/x-zip-compressed",
+        "application/x-tar", "application/gzip", "application/x-gzip"
+    ]
+    FILE_MAX_ARCHIVE_SIZE: int = 1024
+    FILE_UPLOAD_CONCURRENCY: int = 8
+
+    CHUNK_TEXT_COMPRESSION: bool = False
+    CHUNK_BULK_CODEC: bool = True
+    CHUNK_DEDUP_ENABLED: bool = False
+    CHUNK_DEDUP_THRESHOLD: float = 0.9
+    CHUNK_DEDUP_NUM_PERM: int = 128
+    CHUNK_DEDUP_BANDS: int = 16
+    CHUNK_DEDUP_SHINGLE_SIZE: int = 5
+    CHUNK_DEDUP_MAX_ATTACHED: int = 10
+
+    TEXT_SPLITTER_BACKEND: str = "langchain"
+    TEXT_SPLITTER_LENGTH_UNIT: str = "character"
 
     MONGODB_URL: str
     MONGODB_DATABASE: str
@@ -22,14 +41,70 @@ class Settings(BaseSettings):
     GENERATION_MODEL_ID: str = None
     EMBEDDING_MODEL_ID: str = None
     EMBEDDING_MODEL_SIZE: int = None
+    EMBEDDING_STORE_ENABLED: bool = True
+    EMBEDDING_STORE_DTYPE: str = "float32"
+    EMBEDDING_DOCUMENT_BATCH_SIZE: int = 1
 
     INPUT_DEFAULT_MAX_CHARACTERS: int = None
     GENERATION_DEFAULT_MAX_TOKENS: int = None
     GENERATION_DEFAULT_TEMPERATURE: float = None
 
+    LLM_SCHEDULER_REQUESTS_PER_MINUTE: int = None
+    LLM_SCHEDULER_TOKENS_PER_MINUTE: int = None
+    LLM_SCHEDULER_MAX_CONCURRENCY: int = 8
+    LLM_SCHEDULER_MAX_RETRIES: int = 5
+    LLM_SCHEDULER_LATENCY_TARGET: float = 10.0
+    LLM_SCHEDULER_INTERACTIVE_RESERVE: float = 0.25
+    LLM_REQUEST_TIMEOUT: float = 60.0
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_TIMEOUT: float = 30.0
+
+    QUERY_EMBEDDING_MAX_BATCH_SIZE: int = 32
+    QUERY_EMBEDDING_MAX_WAIT_MS: float = 5
+    QUERY_EMBEDDING_HEDGE_ENABLED: bool = True
+    QUERY_EMBEDDING_HEDGE_MIN_DELAY_MS: float = 50
+    SEARCH_DEADLINE_MS: int = 5000
+
     VECTOR_DB_BACKEND: str
     VECTOR_DB_PATH: str
+    VECTOR_DB_URL: Optional[str] = None
     VECTOR_DB_DISTANCE_METHOD: str = None
+    VECTOR_DB_PAYLOAD_MODE: str = "full"
+    VECTOR_DB_PAYLOAD_INDEXED_FIELDS: list = []
+    VECTOR_DB_TENANCY_MODE: str = "collection"
+    VECTOR_DB_SHARED_COLLECTION_NAME: str = "collection_shared"
+    VECTOR_DB_HNSW_M: Optional[int] = None
+    VECTOR_DB_HNSW_EF_CONSTRUCT: Optional[int] = None
+    VECTOR_DB_SEARCH_HNSW_EF: Optional[int] = None
+    VECTOR_DB_QUANTIZATION: Optional[str] = None
+    VECTOR_DB_BULK_MAX_WAIT_MS: int = 500
+
+    CHUNK_CACHE_SIZE: int = 0
+    PARSED_TEXT_CACHE_MAX_SIZE: int = 512
+
+    FEDERATED_SEARCH_DEADLINE_MS: int = 2000
+
+    ANSWER_CACHE_MAX_SIZE: int = 1000
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_MAX_INDEXES: int = 100
+
+    ADMISSION_INTERACTIVE_CONCURRENCY: int = 64
+    ADMISSION_INTERACTIVE_QUEUE_SIZE: int = 256
+    ADMISSION_INTERACTIVE_QUEUE_TIMEOUT_MS: int = 1000
+    ADMISSION_BULK_CONCURRENCY: int = 2
+    ADMISSION_BULK_QUEUE_SIZE: int = 8
+    ADMISSION_BULK_QUEUE_TIMEOUT_MS: int = 30000
+
+    INGEST_WORKER_CONCURRENCY: int = 2
+    INGEST_WORKER_POLL_INTERVAL_SECONDS: float = 2
+    INGEST_JOB_LEASE_SECONDS: float = 60
+    INGEST_JOB_HEARTBEAT_SECONDS: float = 15
+    INGEST_JOB_MAX_ATTEMPTS: int = 3
+
+    SINGLE_FLIGHT_LEASE_SECONDS: float = 60
+    SINGLE_FLIGHT_HEARTBEAT_SECONDS: float = 15
+    SINGLE_FLIGHT_WAIT_TIMEOUT_MS: int = 10000
+    SINGLE_FLIGHT_POLL_INTERVAL_MS: int = 500
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,59 @@
+import re
+import zlib
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class MinHashLSH:
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = max(1, shingle_size)
+
+        # fixed seed: signatures of every process are comparable with the bands stored on the chunks
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    def get_shingle_hashes(self, text: str):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if len(tokens) == 0:
+            return None
+
+        # texts shorter than a shingle are one shingle
+        size = min(self.shingle_size, len(tokens))
+        return np.fromiter(
+            {
+                zlib.crc32(" ".join(tokens[i:i+size]).encode("utf-8"))
+                for i in range(len(tokens) - size + 1)
+            },
+            dtype=np.uint64
+        )
+
+    def get_signature(self, text: str):
+        hashes = self.get_shingle_hashes(text)
+        if hashes is None:
+            return None
+
+        # a * x + b stays below 2^64 for 32-bit shingle hashes and 31-bit a, b
+        permuted = (np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def get_bands(self, signature) -> list:
+        # the band number in the high bits keeps equal rows of different bands apart
+        return [
+            (band << 32) | zlib.crc32(signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def get_similarity(self, signature, other_signature) -> float:
+        # share of equal minhashes, an estimate of the jaccard similarity of the shingle sets
+        return float(np.mean(signature == other_signature))
@@ -0,0 +1,188 @@
+from fastapi import Request
+from fastapi.responses import JSONResponse
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+
+
+class ProjectBusyError(Exception):
+
+    def __init__(self, project_id: str, operation: str):
+        super().__init__(f"project {project_id} is busy with {operation}")
+        self.project_id = project_id
+        self.operation = operation
+
+
+class ProjectLeaseLostError(Exception):
+
+    def __init__(self, project_id: str, operation: str):
+        super().__init__(f"lost the lease of project {project_id} while running {operation}")
+        self.project_id = project_id
+        self.operation = operation
+
+
+class Flight:
+
+    def __init__(self, operation: str, key: str):
+        self.operation = operation
+        self.key = key
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class SingleFlight:
+
+    def __init__(
+            self, lock_model, lease_seconds: float, heartbeat_seconds: float,
+            wait_timeout_ms: float, poll_interval_ms: float
+    ):
+        # at most one expensive operation per project: in-process through shared futures,
+        # across processes through a leased lock document per project
+        self.lock_model = lock_model
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.wait_timeout = max(0.0, wait_timeout_ms) / 1000.0
+        self.poll_interval = max(1.0, poll_interval_ms) / 1000.0
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.flights = {}
+
+        self.logger = logging.getLogger(__name__)
+
+    def make_key(self, operation: str, params: dict = None):
+        return f"{operation}:{json.dumps(params or {}, sort_keys=True, default=str)}"
+
+    async def run(self, project_id: str, operation: str, func, params: dict = None):
+        # same operation and params: join the running one and share its result;
+        # anything else waits for it up to wait_timeout, then ProjectBusyError
+        key = self.make_key(operation, params)
+        deadline = time.monotonic() + self.wait_timeout
+
+        while True:
+            flight = self.flights.get(project_id)
+            if flight is None:
+                break
+
+            try:
+                if flight.key == key:
+                    return await asyncio.shield(flight.future)
+
+                await asyncio.wait_for(
+                    asyncio.shield(flight.future), timeout=max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                raise ProjectBusyError(project_id, flight.operation)
+            except asyncio.CancelledError:
+                # the flight was cancelled, not this request: look again
+                if not flight.future.cancelled():
+                    raise
+            except Exception:
+                if flight.key == key:
+                    raise
+
+        # registered before the first await, so concurrent requests of this process find it
+        flight = Flight(operation=operation, key=key)
+        self.flights[project_id] = flight
+        # joiners may never look at the outcome
+        flight.future.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+        try:
+            result = await self.run_leased(project_id, flight, func, deadline)
+        except asyncio.CancelledError:
+            flight.future.cancel()
+            raise
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        finally:
+            if self.flights.get(project_id) is flight:
+                del self.flights[project_id]
+
+        flight.future.set_result(result)
+        return result
+
+    async def run_leased(self, project_id: str, flight: Flight, func, deadline: float):
+        joined_token = None
+
+        while True:
+            if joined_token is not None:
+                lock = await self.lock_model.get_lock(lock_project_id=project_id)
+                if lock is not None and lock.lock_token == joined_token:
+                    if lock.lock_owner is None and lock.lock_result is not None:
+                        # the operation we joined in another process finished
+                        return lock.lock_result
+                    if lock.lock_owner is not None and lock.lock_expires_at > datetime.utcnow():
+                        await asyncio.sleep(self.poll_interval)
+                        continue
+                # failed, or its process died: run it here
+                joined_token = None
+
+            is_acquired, lock = await self.lock_model.acquire_lock(
+                lock_project_id=project_id, owner=self.owner, operation=flight.operation,
+                key=flight.key, lease_seconds=self.lease_seconds
+            )
+            if is_acquired:
+                break
+
+            if lock is not None and lock.lock_key == flight.key:
+                # another process runs the same operation: wait for its result instead of redoing it
+                joined_token = lock.lock_token
+            elif time.monotonic() >= deadline:
+                raise ProjectBusyError(project_id, lock.lock_operation if lock else flight.operation)
+
+            await asyncio.sleep(self.poll_interval)
+
+        work = asyncio.ensure_future(func())
+        heartbeat = asyncio.ensure_future(self.keep_lease(project_id, lock.lock_token, work))
+        result = None
+        try:
+            result = await work
+            return result
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled() and heartbeat.result():
+                raise ProjectLeaseLostError(project_id, flight.operation)
+            raise
+        finally:
+            heartbeat.cancel()
+            # failed operations store no result, their joiners run the operation themselves
+            _ = await self.lock_model.release_lock(
+                lock_project_id=project_id, token=lock.lock_token, result=result
+            )
+
+    async def keep_lease(self, project_id: str, token, work: asyncio.Future):
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                is_renewed = await self.lock_model.renew_lock(
+                    lock_project_id=project_id, token=token, lease_seconds=self.lease_seconds
+                )
+            except Exception as e:
+                self.logger.warning(f"renewing the lease of project {project_id} failed: {e}")
+                # retried on the next beat, unless the lease runs out before it
+                if time.monotonic() - renewed_at + self.heartbeat_seconds < self.lease_seconds:
+                    continue
+                is_renewed = False
+
+            if not is_renewed:
+                # another process may run an operation on the project now, stop this one
+                self.logger.warning(f"lost the lease of project {project_id}, cancelling the operation")
+                work.cancel()
+                return True
+
+            renewed_at = time.monotonic()
+
+
+async def run_single_flight(request: Request, project_id: str, operation: str, handler, params: dict = None):
+    # responses are shared as plain json, so joiners in other processes get the same answer
+    async def func():
+        response = await handler()
+        return {"status_code": response.status_code, "content": json.loads(response.body)}
+
+    result = await request.app.single_flight.run(
+        project_id=project_id, operation=operation, func=func, params=params
+    )
+    return JSONResponse(status_code=result["status_code"], content=result["content"])
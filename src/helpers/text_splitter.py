@@ -0,0 +1,125 @@
+from bisect import bisect_left, bisect_right
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str):
+    # word/punctuation pieces, a provider-agnostic stand-in for model tokens
+    return len(TOKEN_PATTERN.findall(text))
+
+
+# Recursive splitter working on (start, end) offsets of the source text.
+# In character mode it returns exactly what RecursiveCharacterTextSplitter
+# (keep_separator=True, strip_whitespace=True) returns: with the separator kept at the
+# start of each piece every split is a contiguous span, so merging a chunk is slicing
+# the text between two offsets instead of re-joining strings.
+class NativeTextSplitter:
+
+    def __init__(
+            self, chunk_size: int = 100, chunk_overlap: int = 20,
+            separators: list = None, use_tokens: bool = False
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                f"({chunk_size}), should be smaller."
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or ["\n\n", "\n", " ", ""]
+        self.use_tokens = use_tokens
+
+    def split_text(self, text: str):
+        token_starts = None
+        if self.use_tokens:
+            token_starts = [match.start() for match in TOKEN_PATTERN.finditer(text)]
+
+        spans = []
+        self.split_span(text, 0, len(text), self.separators, token_starts, spans)
+
+        chunks = []
+        for start, end, is_merged in spans:
+            # merged chunks are stripped, oversized leftovers are passed through as-is
+            chunk = text[start:end].strip() if is_merged else text[start:end]
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def split_span(self, text: str, start: int, end: int, separators: list, token_starts: list, spans: list):
+        separator = separators[-1]
+        new_separators = []
+        for i, _s in enumerate(separators):
+            if _s == "":
+                separator = _s
+                break
+            if text.find(_s, start, end) != -1:
+                separator = _s
+                new_separators = separators[i + 1:]
+                break
+
+        # piece i is text[bounds[i]:bounds[i + 1]], its length is sizes[i + 1] - sizes[i]
+        bounds = self.get_split_bounds(text, start, end, separator)
+        if token_starts is None:
+            sizes = bounds
+        else:
+            sizes = [bisect_left(token_starts, bound) for bound in bounds]
+
+        chunk_size = self.chunk_size
+        oversized = [
+            i for i in range(len(bounds) - 1)
+            if sizes[i + 1] - sizes[i] >= chunk_size
+        ]
+
+        good_start = 0
+        for i in oversized:
+            if i > good_start:
+                self.merge_splits(bounds, sizes, good_start, i, spans)
+            if not new_separators:
+                spans.append((bounds[i], bounds[i + 1], False))
+            else:
+                self.split_span(text, bounds[i], bounds[i + 1], new_separators, token_starts, spans)
+            good_start = i + 1
+
+        if len(bounds) - 1 > good_start:
+            self.merge_splits(bounds, sizes, good_start, len(bounds) - 1, spans)
+
+    def get_split_bounds(self, text: str, start: int, end: int, separator: str):
+        if separator == "":
+            return list(range(start, end + 1))
+
+        # each piece starts at a separator occurrence and keeps it, so pieces are contiguous
+        bounds = [start]
+        position = text.find(separator, start, end)
+        separator_length = len(separator)
+        while position != -1:
+            if position > bounds[-1]:
+                bounds.append(position)
+            position = text.find(separator, position + separator_length, end)
+
+        if end > bounds[-1]:
+            bounds.append(end)
+        return bounds
+
+    def merge_splits(self, bounds: list, sizes: list, first: int, last: int, spans: list):
+        # merges pieces first..last-1; the current chunk is always pieces first..i-1,
+        # so both the next overflow and the overlap kept after it are found by bisection
+        chunk_size = self.chunk_size
+        while True:
+            overflow = bisect_right(sizes, sizes[first] + chunk_size, first + 2, last + 1)
+            if overflow > last:
+                break
+
+            i = overflow - 1
+            spans.append((bounds[first], bounds[i], True))
+
+            # drop leading pieces while the chunk is longer than the overlap, or too long
+            # to take piece i
+            keep = min(self.chunk_overlap, max(chunk_size - (sizes[i + 1] - sizes[i]), 0))
+            first = bisect_left(sizes, sizes[i] - keep, first, i)
+            # pieces inside a token have no size in token mode, the overlap never starts with
+            # them: with no overlap they would be repeated in the next chunk
+            while first < i and sizes[first + 1] == sizes[first]:
+                first += 1
+
+        spans.append((bounds[first], bounds[last], True))
@@ -1,8 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from routes import base, data, nlp
 from motor.motor_asyncio import AsyncIOMotorClient
 from helpers.config import get_settings
+from helpers.cache import LRUCache, SemanticCache
+from helpers.admission import AdmissionPool, AdmissionRejectedError
+from helpers.single_flight import SingleFlight, ProjectBusyError, ProjectLeaseLostError
+from models import ResponseSignal, PriorityEnum
+from models.ProjectLockModel import ProjectLockModel
 from stores.llm.LLMProviderFactory import LLMProviderFactory
+from stores.llm.QueryEmbeddingBatcher import QueryEmbeddingBatcher
 from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
 
 app = FastAPI()
@@ -33,12 +40,56 @@ async def startup_span():
         embedding_size=settings.EMBEDDING_MODEL_SIZE
     )
 
+    # query embeddings of concurrent searches share provider calls
+    app.query_batcher = QueryEmbeddingBatcher(
+        embedding_client=app.embedding_client,
+        max_batch_size=settings.QUERY_EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms=settings.QUERY_EMBEDDING_MAX_WAIT_MS,
+        hedge_enabled=settings.QUERY_EMBEDDING_HEDGE_ENABLED,
+        hedge_min_delay_ms=settings.QUERY_EMBEDDING_HEDGE_MIN_DELAY_MS
+    )
+
     # vector db client
     app.vectordb_client = vectordb_provider_factory.create(
         provider=settings.VECTOR_DB_BACKEND
     )
     app.vectordb_client.connect()
 
+    # hot chunks in front of search hydration when payloads are slim
+    app.chunk_cache = LRUCache(max_size=settings.CHUNK_CACHE_SIZE)
+
+    # answers of semantically equal questions, per project index version
+    app.answer_cache = SemanticCache(
+        max_size=settings.ANSWER_CACHE_MAX_SIZE,
+        similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        max_indexes=settings.ANSWER_CACHE_MAX_INDEXES
+    )
+
+    # searches and ingestion queue separately, a large upload can't take the search slots
+    app.admission_pools = {
+        PriorityEnum.INTERACTIVE.value: AdmissionPool(
+            name=PriorityEnum.INTERACTIVE.value,
+            max_concurrency=settings.ADMISSION_INTERACTIVE_CONCURRENCY,
+            max_queue_size=settings.ADMISSION_INTERACTIVE_QUEUE_SIZE,
+            queue_timeout_ms=settings.ADMISSION_INTERACTIVE_QUEUE_TIMEOUT_MS
+        ),
+        PriorityEnum.BULK.value: AdmissionPool(
+            name=PriorityEnum.BULK.value,
+            max_concurrency=settings.ADMISSION_BULK_CONCURRENCY,
+            max_queue_size=settings.ADMISSION_BULK_QUEUE_SIZE,
+            queue_timeout_ms=settings.ADMISSION_BULK_QUEUE_TIMEOUT_MS
+        )
+    }
+
+    # one processing/indexing operation per project, shared with the other server processes
+    app.single_flight = SingleFlight(
+        lock_model=await ProjectLockModel.create_instance(db_client=app.db_client),
+        lease_seconds=settings.SINGLE_FLIGHT_LEASE_SECONDS,
+        heartbeat_seconds=settings.SINGLE_FLIGHT_HEARTBEAT_SECONDS,
+        wait_timeout_ms=settings.SINGLE_FLIGHT_WAIT_TIMEOUT_MS,
+        poll_interval_ms=settings.SINGLE_FLIGHT_POLL_INTERVAL_MS
+    )
+
 
 async def shutdown_span():
     app.mongo_conn.close()
@@ -49,6 +100,40 @@ async def shutdown_span():
 app.on_event("startup")(startup_span)
 app.on_event("shutdown")(shutdown_span)
 
+
+@app.exception_handler(AdmissionRejectedError)
+async def admission_rejected_handler(request: Request, error: AdmissionRejectedError):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(error.retry_after)},
+        content={
+            "signal": ResponseSignal.ADMISSION_REJECTED.value,
+            "pool": error.pool_name
+        }
+    )
+
+
+@app.exception_handler(ProjectBusyError)
+async def project_busy_handler(request: Request, error: ProjectBusyError):
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={
+            "signal": ResponseSignal.PROJECT_OPERATION_IN_PROGRESS.value,
+            "operation": error.operation
+        }
+    )
+
+
+@app.exception_handler(ProjectLeaseLostError)
+async def project_lease_lost_handler(request: Request, error: ProjectLeaseLostError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "signal": ResponseSignal.PROJECT_LEASE_LOST.value,
+            "operation": error.operation
+        }
+    )
+
 app.include_router(base.base_router)
 app.include_router(data.data_router)
 app.include_router(nlp.nlp_router)
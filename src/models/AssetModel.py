@@ -1,7 +1,11 @@
 from .BaseDataModel import BaseDataModel
 from .db_schemas import Asset
 from .enums.DataBaseEnum import DataBaseEnum
+from .enums.AssetTypeEnum import AssetTypeEnum
 from models.fields import PyObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from datetime import datetime
 
 
 class AssetModel(BaseDataModel):
@@ -18,15 +22,31 @@ class AssetModel(BaseDataModel):
         return instance
 
     async def init_collection(self):
-        all_collections = await self.db_client.list_collection_names()
-        if DataBaseEnum.COLLECTION_ASSET_NAME.value not in all_collections:
-            self.collection = self.db_client[DataBaseEnum.COLLECTION_ASSET_NAME.value]
-            indexes = Asset.get_indexes()
-            for index in indexes:
+        # create_index is a no-op for existing indexes, collections created by an earlier
+        # version get the ones added since
+        indexes = Asset.get_indexes()
+        for index in indexes:
+            options = {}
+            if "partial_filter" in index:
+                options["partialFilterExpression"] = index["partial_filter"]
+            try:
                 await self.collection.create_index(
                     index["key"],
                     name=index["name"],
-                    unique=index["unique"]
+                    unique=index["unique"],
+                    **options
+                )
+            except OperationFailure as e:
+                # IndexOptionsConflict
+                if e.code != 85:
+                    raise
+                # an index of an earlier version under the same name, rebuilt with the current options
+                await self.collection.drop_index(index["name"])
+                await self.collection.create_index(
+                    index["key"],
+                    name=index["name"],
+                    unique=index["unique"],
+                    **options
                 )
 
     async def create_asset(self, asset: Asset):
@@ -35,6 +55,36 @@ class AssetModel(BaseDataModel):
         asset.id = result.inserted_id
         return asset
 
+    async def insert_many_assets(self, assets: list):
+        if len(assets) == 0:
+            return []
+
+        documents = [
+            asset.model_dump(by_alias=True, exclude_unset=True)
+            for asset in assets
+        ]
+
+        duplicate_indexes = set()
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # duplicates of a stored asset (same name or hash) lost a race and are skipped,
+            # any other failure is an error
+            duplicate_indexes = {
+                error["index"] for error in e.details["writeErrors"] if error["code"] == 11000
+            }
+            if len(duplicate_indexes) < len(e.details["writeErrors"]):
+                raise
+
+        inserted_assets = []
+        for i, (asset, document) in enumerate(zip(assets, documents)):
+            if i in duplicate_indexes:
+                continue
+            asset.id = document["_id"]
+            inserted_assets.append(asset)
+
+        return inserted_assets
+
     async def get_all_project_assets(self, asset_project_id: str, asset_type: str):
 
         records = await self.collection.find({
@@ -49,6 +99,20 @@ class AssetModel(BaseDataModel):
             for record in records
         ]
 
+    async def get_unprocessed_project_assets(self, asset_project_id: PyObjectId):
+        # asset_chunked_at is set once all chunks of an asset are stored: it is null while they
+        # are written, and missing on assets never chunked or chunked before it existed
+        records = await self.collection.find({
+            'asset_project_id': asset_project_id,
+            'asset_type': AssetTypeEnum.FILE.value,
+            'asset_chunked_at': None
+        }).to_list(length=None)
+
+        return [
+            Asset(**record)
+            for record in records
+        ]
+
     async def get_asset_record(self, asset_project_id: str, asset_name: str):
         record = await self.collection.find_one({
             'asset_project_id':
@@ -61,3 +125,91 @@ class AssetModel(BaseDataModel):
             return Asset(**record)
         else:
             return None
+
+    async def get_asset_by_id(self, asset_id: PyObjectId):
+        record = await self.collection.find_one({'_id': asset_id})
+        if record:
+            return Asset(**record)
+        else:
+            return None
+
+    async def get_asset_by_hash(self, asset_project_id: str, asset_hash: str):
+        record = await self.collection.find_one({
+            'asset_project_id':
+            PyObjectId(asset_project_id) if isinstance(
+                asset_project_id, str) else asset_project_id,
+            'asset_hash': asset_hash,
+        })
+        if record:
+            return Asset(**record)
+        else:
+            return None
+
+    async def get_assets_by_hashes(self, asset_project_id: str, asset_hashes: list):
+        records = await self.collection.find({
+            'asset_project_id':
+            PyObjectId(asset_project_id) if isinstance(
+                asset_project_id, str) else asset_project_id,
+            'asset_hash': {'$in': asset_hashes},
+        }).to_list(length=None)
+
+        return {
+            record['asset_hash']: Asset(**record)
+            for record in records
+        }
+
+    async def update_asset_metadata(self, asset_id: PyObjectId, asset_metadata: dict):
+        # written after the chunks of the asset, so it also marks them complete
+        result = await self.collection.update_one(
+            {'_id': asset_id},
+            {'$set': {'asset_metadata': asset_metadata, 'asset_chunked_at': datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    async def update_assets_metadata(self, assets_metadata: dict):
+        if len(assets_metadata) == 0:
+            return 0
+
+        chunked_at = datetime.utcnow()
+        result = await self.collection.bulk_write([
+            UpdateOne(
+                {'_id': asset_id},
+                {'$set': {'asset_metadata': asset_metadata, 'asset_chunked_at': chunked_at}}
+            )
+            for asset_id, asset_metadata in assets_metadata.items()
+        ], ordered=False)
+        return result.modified_count
+
+    async def mark_assets_chunking(self, asset_ids: list):
+        # set before the chunks of the assets are written, tells an interrupted write apart
+        # from assets chunked before asset_chunked_at existed
+        if len(asset_ids) == 0:
+            return 0
+
+        result = await self.collection.update_many(
+            {'_id': {'$in': asset_ids}},
+            {'$set': {'asset_chunked_at': None}}
+        )
+        return result.modified_count
+
+    async def mark_assets_chunked(self, asset_ids: list):
+        if len(asset_ids) == 0:
+            return 0
+
+        result = await self.collection.update_many(
+            {'_id': {'$in': asset_ids}},
+            {'$set': {'asset_chunked_at': datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    async def get_chunking_asset_ids(self, asset_ids: list):
+        return set(await self.collection.distinct(
+            '_id', {'_id': {'$in': asset_ids}, 'asset_chunked_at': {'$exists': True, '$eq': None}}
+        ))
+
+    async def reset_project_assets_chunked(self, asset_project_id: PyObjectId):
+        result = await self.collection.update_many(
+            {'asset_project_id': asset_project_id},
+            {'$unset': {'asset_chunked_at': ''}}
+        )
+        return result.modified_count
@@ -2,7 +2,8 @@ from .BaseDataModel import BaseDataModel
 from .db_schemas import DataChunk
 from .enums.DataBaseEnum import DataBaseEnum
 from .fields import PyObjectId
-from pymongo import InsertOne
+from pymongo import InsertOne, UpdateOne, UpdateMany
+import zlib
 
 
 class ChunkModel(BaseDataModel):
@@ -18,19 +19,134 @@ class ChunkModel(BaseDataModel):
         return instance
 
     async def init_collection(self):
-        all_collections = await self.db_client.list_collection_names()
-        if DataBaseEnum.COLLECTION_CHUNK_NAME.value not in all_collections:
-            self.collection = self.db_client[DataBaseEnum.COLLECTION_CHUNK_NAME.value]
-            indexes = DataChunk.get_indexes()
-            for index in indexes:
-                await self.collection.create_index(
-                    index["key"],
-                    name=index["name"],
-                    unique=index["unique"]
-                )
+        # create_index is a no-op for existing indexes, collections created by an earlier
+        # version get the ones added since
+        indexes = DataChunk.get_indexes()
+        for index in indexes:
+            await self.collection.create_index(
+                index["key"],
+                name=index["name"],
+                unique=index["unique"]
+            )
+
+    def encode_chunk(self, chunk: DataChunk):
+        return self.encode_record(chunk.model_dump(by_alias=True, exclude_unset=True))
+
+    def encode_record(self, record: dict):
+        if self.app_settings.CHUNK_TEXT_COMPRESSION:
+            text_bytes = record["chunk_text"].encode("utf-8")
+            compressed_text = zlib.compress(text_bytes)
+            # short chunks often grow when compressed, keep those as plain strings
+            if len(compressed_text) < len(text_bytes):
+                record["chunk_text"] = compressed_text
+
+        return record
+
+    def decode_text(self, chunk_text):
+        if isinstance(chunk_text, bytes):
+            return zlib.decompress(chunk_text).decode("utf-8")
+        return chunk_text
+
+    def decode_chunk(self, record: dict, assets_metadata: dict = None):
+        record["chunk_text"] = self.decode_text(record["chunk_text"])
+
+        asset_metadata = (assets_metadata or {}).get(record["chunk_asset_id"])
+        if asset_metadata:
+            record["chunk_metadata"] = {
+                **asset_metadata,
+                **(record.get("chunk_metadata") or {})
+            }
+
+        return DataChunk(**record)
+
+    def encode_chunk_batch(
+        self, chunk_texts: list, chunks_metadata: list,
+        chunk_project_id: PyObjectId, chunk_asset_id: PyObjectId, start_order: int = 1
+    ):
+        if len(chunk_texts) != len(chunks_metadata):
+            raise ValueError("every chunk needs its metadata")
+
+        if not self.app_settings.CHUNK_BULK_CODEC:
+            return [
+                self.encode_chunk(DataChunk(
+                    chunk_text=chunk_text,
+                    chunk_metadata=chunk_metadata,
+                    chunk_order=start_order + i,
+                    chunk_project_id=chunk_project_id,
+                    chunk_asset_id=chunk_asset_id
+                ))
+                for i, (chunk_text, chunk_metadata) in enumerate(zip(chunk_texts, chunks_metadata))
+            ]
+
+        # the ids are shared by the whole batch, validate them once instead of per chunk
+        chunk_project_id = PyObjectId.validate(chunk_project_id)
+        chunk_asset_id = PyObjectId.validate(chunk_asset_id)
+        if start_order < 1:
+            raise ValueError("chunk_order starts at 1")
+
+        records = []
+        for i, (chunk_text, chunk_metadata) in enumerate(zip(chunk_texts, chunks_metadata)):
+            if not isinstance(chunk_text, str) or not chunk_text:
+                raise ValueError(f"chunk {start_order + i} has no text")
+            if not isinstance(chunk_metadata, dict):
+                raise ValueError(f"chunk {start_order + i} metadata must be a dict")
+
+            records.append(self.encode_record({
+                "chunk_text": chunk_text,
+                "chunk_metadata": chunk_metadata,
+                "chunk_order": start_order + i,
+                "chunk_project_id": chunk_project_id,
+                "chunk_asset_id": chunk_asset_id
+            }))
+
+        return records
+
+    def decode_chunk_batch(self, records: list, assets_metadata: dict = None):
+        if not self.app_settings.CHUNK_BULK_CODEC:
+            return [
+                self.decode_chunk(record, assets_metadata=assets_metadata)
+                for record in records
+            ]
+
+        # records come from our own collection and were validated when written
+        assets_metadata = assets_metadata or {}
+        chunks = []
+        for record in records:
+            chunk_metadata = record.get("chunk_metadata") or {}
+            asset_metadata = assets_metadata.get(record["chunk_asset_id"])
+            if asset_metadata:
+                chunk_metadata = {**asset_metadata, **chunk_metadata}
+
+            chunks.append(DataChunk.model_construct(
+                id=record["_id"],
+                chunk_text=self.decode_text(record["chunk_text"]),
+                chunk_metadata=chunk_metadata,
+                chunk_order=record["chunk_order"],
+                chunk_project_id=record["chunk_project_id"],
+                chunk_asset_id=record["chunk_asset_id"],
+                chunk_canonical_id=record.get("chunk_canonical_id"),
+                chunk_lsh_bands=record.get("chunk_lsh_bands")
+            ))
+
+        return chunks
+
+    async def get_assets_metadata(self, records: list):
+        asset_ids = list({record["chunk_asset_id"] for record in records})
+        if len(asset_ids) == 0:
+            return {}
+
+        assets = await self.db_client[DataBaseEnum.COLLECTION_ASSET_NAME.value].find(
+            {"_id": {"$in": asset_ids}},
+            {"asset_metadata": 1}
+        ).to_list(length=None)
+
+        return {
+            asset["_id"]: asset.get("asset_metadata")
+            for asset in assets
+        }
 
     async def create_chunk(self, chunk: DataChunk):
-        result = await self.collection.insert_one(chunk.model_dump(by_alias=True, exclude_unset=True))
+        result = await self.collection.insert_one(self.encode_chunk(chunk))
 
         chunk._id = result.inserted_id
         return chunk
@@ -43,25 +159,162 @@ class ChunkModel(BaseDataModel):
         if result is None:
             return None
 
-        return DataChunk(**result)
+        return self.decode_chunk(
+            result, assets_metadata=await self.get_assets_metadata([result])
+        )
+
+    async def get_chunks_by_ids(self, chunk_ids: list):
+        records = await self.collection.find({
+            "_id": {"$in": [PyObjectId(chunk_id) for chunk_id in chunk_ids]}
+        }).to_list(length=None)
+
+        assets_metadata = await self.get_assets_metadata(records)
+        chunks = self.decode_chunk_batch(records, assets_metadata=assets_metadata)
+
+        return {
+            str(chunk.id): chunk
+            for chunk in chunks
+        }
 
     async def insert_many_chunks(self, chunks: list, batch_size: int = 100):
         for i in range(0, len(chunks), batch_size):
             batch = chunks[i:i+batch_size]
 
             operations = [
-                InsertOne(chunk.model_dump(by_alias=True, exclude_unset=True))
+                InsertOne(self.encode_chunk(chunk))
                 for chunk in batch
             ]
-            await self.collection.bulk_write(operations)
+            # unordered: the server applies the batch in parallel and keeps going past a bad document
+            await self.collection.bulk_write(operations, ordered=False)
         return len(chunks)
 
+    async def insert_chunk_records(self, records: list, batch_size: int = 1000):
+        for i in range(0, len(records), batch_size):
+            await self.collection.insert_many(records[i:i+batch_size], ordered=False)
+        return len(records)
+
     async def delete_chunks_by_project_id(self, project_id: PyObjectId):
         result = await self.collection.delete_many({
             "chunk_project_id": project_id
         })
         return result.deleted_count
 
+    async def get_asset_chunk_ids(self, asset_id: PyObjectId):
+        records = await self.collection.find(
+            {"chunk_asset_id": asset_id}, {"_id": 1}
+        ).to_list(length=None)
+        return [record["_id"] for record in records]
+
+    async def get_chunked_asset_ids(self, asset_ids: list):
+        return set(await self.collection.distinct(
+            "chunk_asset_id", {"chunk_asset_id": {"$in": asset_ids}}
+        ))
+
+    async def delete_chunks_by_asset_id(self, asset_id: PyObjectId):
+        result = await self.collection.delete_many({
+            "chunk_asset_id": asset_id
+        })
+        return result.deleted_count
+
+    async def get_dedup_candidates(
+        self, project_id: PyObjectId, bands: list, before_chunk_id: PyObjectId, exclude_chunk_ids: list
+    ):
+        # canonical chunks sharing a band, only those have a point of their own
+        records = await self.collection.find(
+            {
+                "chunk_project_id": project_id,
+                "chunk_lsh_bands": {"$in": bands},
+                "chunk_canonical_id": None,
+                "_id": {"$lt": before_chunk_id, "$nin": exclude_chunk_ids}
+            },
+            {"chunk_text": 1}
+        ).to_list(length=None)
+
+        return [
+            (record["_id"], self.decode_text(record["chunk_text"]))
+            for record in records
+        ]
+
+    async def update_chunks_dedup(self, chunks_bands: dict, canonical_ids: dict, demoted_chunk_ids: list):
+        if len(chunks_bands) == 0:
+            return 0
+
+        operations = [
+            UpdateOne(
+                {"_id": chunk_id},
+                {"$set": {
+                    "chunk_lsh_bands": bands,
+                    "chunk_canonical_id": canonical_ids.get(chunk_id)
+                }}
+            )
+            for chunk_id, bands in chunks_bands.items()
+        ]
+        # duplicates of a chunk that turned out to be a duplicate itself follow it to its canonical chunk
+        operations += [
+            UpdateMany(
+                {"chunk_canonical_id": chunk_id},
+                {"$set": {"chunk_canonical_id": canonical_ids[chunk_id]}}
+            )
+            for chunk_id in demoted_chunk_ids
+        ]
+
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    async def get_duplicate_chunks(self, canonical_ids: list, max_per_chunk: int = 10):
+        # per canonical chunk: how many duplicates it has and the first max_per_chunk of them
+        groups = await self.collection.aggregate([
+            {"$match": {"chunk_canonical_id": {"$in": [PyObjectId(chunk_id) for chunk_id in canonical_ids]}}},
+            {"$sort": {"_id": 1}},
+            {"$group": {
+                "_id": "$chunk_canonical_id",
+                "count": {"$sum": 1},
+                "records": {"$push": {
+                    "_id": "$_id",
+                    "chunk_asset_id": "$chunk_asset_id",
+                    "chunk_metadata": "$chunk_metadata"
+                }}
+            }},
+            {"$project": {"count": 1, "records": {"$slice": ["$records", max_per_chunk]}}}
+        ]).to_list(length=None)
+
+        assets_metadata = await self.get_assets_metadata(
+            [record for group in groups for record in group["records"]]
+        )
+
+        return {
+            str(group["_id"]): (group["count"], [
+                {
+                    "chunk_id": str(record["_id"]),
+                    "metadata": {
+                        **(assets_metadata.get(record["chunk_asset_id"]) or {}),
+                        **(record.get("chunk_metadata") or {})
+                    }
+                }
+                for record in group["records"]
+            ])
+            for group in groups
+        }
+
+    async def detach_duplicate_chunks(self, canonical_ids: list):
+        # the canonical chunks are gone, their duplicates become regular chunks without a point
+        records = await self.collection.find({
+            "chunk_canonical_id": {"$in": canonical_ids}
+        }).sort("_id", 1).to_list(length=None)
+        if len(records) == 0:
+            return []
+
+        _ = await self.collection.update_many(
+            {"_id": {"$in": [record["_id"] for record in records]}},
+            {"$unset": {"chunk_canonical_id": "", "chunk_lsh_bands": ""}}
+        )
+        for record in records:
+            record.pop("chunk_canonical_id", None)
+            record.pop("chunk_lsh_bands", None)
+
+        assets_metadata = await self.get_assets_metadata(records)
+        return self.decode_chunk_batch(records, assets_metadata=assets_metadata)
+
     async def get_project_chunks(
         self, project_id: PyObjectId, page_no: int = 1, page_size: int = 50
     ):
@@ -71,7 +324,34 @@ class ChunkModel(BaseDataModel):
             (page_no-1)*page_size
         ).limit(page_size).to_list(length=None)
 
-        return [
-            DataChunk(**record)
-            for record in records
-        ]
+        assets_metadata = await self.get_assets_metadata(records)
+
+        return self.decode_chunk_batch(records, assets_metadata=assets_metadata)
+
+    async def get_project_chunk_ids_after(
+        self, project_id: PyObjectId, after_chunk_id: PyObjectId = None, page_size: int = 1000
+    ):
+        # ids and canonical links only, for passes that don't need the text
+        query = {"chunk_project_id": project_id}
+        if after_chunk_id is not None:
+            query["_id"] = {"$gt": after_chunk_id}
+
+        return await self.collection.find(
+            query, {"_id": 1, "chunk_canonical_id": 1}
+        ).sort("_id", 1).limit(page_size).to_list(length=None)
+
+    async def get_project_chunks_after(
+        self, project_id: PyObjectId, after_chunk_id: PyObjectId = None, page_size: int = 50
+    ):
+        # keyset pagination on _id: stable while chunks are added and cheap at any depth
+        query = {"chunk_project_id": project_id}
+        if after_chunk_id is not None:
+            query["_id"] = {"$gt": after_chunk_id}
+
+        records = await self.collection.find(query).sort(
+            "_id", 1
+        ).limit(page_size).to_list(length=None)
+
+        assets_metadata = await self.get_assets_metadata(records)
+
+        return self.decode_chunk_batch(records, assets_metadata=assets_metadata)
@@ -0,0 +1,110 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemas import ChunkEmbedding
+from .enums.DataBaseEnum import DataBaseEnum
+from .fields import PyObjectId
+from pymongo import UpdateOne
+import numpy as np
+
+
+class EmbeddingModel(BaseDataModel):
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client)
+        self.collection = self.db_client[DataBaseEnum.COLLECTION_EMBEDDING_NAME.value]
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client)
+        await instance.init_collection()
+        return instance
+
+    async def init_collection(self):
+        # create_index is a no-op for existing indexes, collections created without them
+        # get them too; the upserts here rely on the unique ones
+        indexes = ChunkEmbedding.get_indexes()
+        for index in indexes:
+            await self.collection.create_index(
+                index["key"],
+                name=index["name"],
+                unique=index["unique"]
+            )
+
+    def encode_embedding(self, chunk_id: PyObjectId, project_id: PyObjectId, model_id: str, vector: list):
+        dtype = self.app_settings.EMBEDDING_STORE_DTYPE
+        return ChunkEmbedding(
+            embedding_chunk_id=chunk_id,
+            embedding_project_id=project_id,
+            embedding_model_id=model_id,
+            embedding_dtype=dtype,
+            embedding_vector=np.asarray(vector, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+        )
+
+    def decode_array(self, record: dict):
+        return np.frombuffer(
+            record["embedding_vector"],
+            dtype=np.dtype(record["embedding_dtype"]).newbyteorder("<")
+        )
+
+    def decode_vector(self, record: dict):
+        return self.decode_array(record).astype(np.float32).tolist()
+
+    async def upsert_embeddings(self, embeddings: list):
+        if len(embeddings) == 0:
+            return 0
+
+        # re-embedding a chunk with the same model replaces its vector
+        operations = [
+            UpdateOne(
+                {
+                    "embedding_chunk_id": embedding.embedding_chunk_id,
+                    "embedding_model_id": embedding.embedding_model_id
+                },
+                {"$set": embedding.model_dump(by_alias=True, exclude={"id"})},
+                upsert=True
+            )
+            for embedding in embeddings
+        ]
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    async def get_embedding_records(self, chunk_ids: list, model_id: str):
+        return await self.collection.find(
+            {
+                "embedding_chunk_id": {"$in": chunk_ids},
+                "embedding_model_id": model_id
+            },
+            {"embedding_chunk_id": 1, "embedding_dtype": 1, "embedding_vector": 1}
+        ).to_list(length=None)
+
+    async def count_embeddings(self, chunk_ids: list, model_id: str):
+        return await self.collection.count_documents({
+            "embedding_chunk_id": {"$in": chunk_ids},
+            "embedding_model_id": model_id
+        })
+
+    async def get_embeddings_by_chunk_ids(self, chunk_ids: list, model_id: str):
+        records = await self.get_embedding_records(chunk_ids=chunk_ids, model_id=model_id)
+        return {
+            record["embedding_chunk_id"]: self.decode_vector(record)
+            for record in records
+        }
+
+    async def get_embedding_arrays_by_chunk_ids(self, chunk_ids: list, model_id: str):
+        # numpy views over the stored bytes, for bulk consumers that never need python lists
+        records = await self.get_embedding_records(chunk_ids=chunk_ids, model_id=model_id)
+        return {
+            record["embedding_chunk_id"]: self.decode_array(record)
+            for record in records
+        }
+
+    async def delete_embeddings_by_project_id(self, project_id: PyObjectId):
+        result = await self.collection.delete_many({
+            "embedding_project_id": project_id
+        })
+        return result.deleted_count
+
+    async def delete_embeddings_by_chunk_ids(self, chunk_ids: list):
+        result = await self.collection.delete_many({
+            "embedding_chunk_id": {"$in": chunk_ids}
+        })
+        return result.deleted_count
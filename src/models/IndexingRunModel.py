@@ -0,0 +1,68 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemas import IndexingRun
+from .enums.DataBaseEnum import DataBaseEnum
+from .fields import PyObjectId
+from datetime import datetime
+
+
+class IndexingRunModel(BaseDataModel):
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client)
+        self.collection = self.db_client[DataBaseEnum.COLLECTION_INDEXING_RUN_NAME.value]
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client)
+        await instance.init_collection()
+        return instance
+
+    async def init_collection(self):
+        # create_index is a no-op for existing indexes, collections created without them
+        # get them too; the upserts here rely on the unique ones
+        indexes = IndexingRun.get_indexes()
+        for index in indexes:
+            await self.collection.create_index(
+                index["key"],
+                name=index["name"],
+                unique=index["unique"]
+            )
+
+    async def create_run(self, run: IndexingRun):
+        # defaults are stored too, get_latest_run sorts on run_created_at
+        result = await self.collection.insert_one(run.model_dump(by_alias=True, exclude={"id"}))
+        run.id = result.inserted_id
+        return run
+
+    async def get_latest_run(self, run_project_id: PyObjectId):
+        record = await self.collection.find_one(
+            {"run_project_id": run_project_id},
+            sort=[("run_created_at", -1)]
+        )
+        if record is None:
+            return None
+
+        return IndexingRun(**record)
+
+    async def update_checkpoint(self, run_id: PyObjectId, last_chunk_id: PyObjectId, indexed_count: int):
+        # written only after the vector store accepted the batch
+        result = await self.collection.update_one(
+            {"_id": run_id},
+            {"$set": {
+                "run_last_chunk_id": last_chunk_id,
+                "run_indexed_count": indexed_count,
+                "run_updated_at": datetime.utcnow()
+            }}
+        )
+        return result.modified_count
+
+    async def update_status(self, run_id: PyObjectId, status: str, error: str = None):
+        result = await self.collection.update_one(
+            {"_id": run_id},
+            {"$set": {
+                "run_status": status,
+                "run_error": error,
+                "run_updated_at": datetime.utcnow()
+            }}
+        )
+        return result.modified_count
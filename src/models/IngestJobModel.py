@@ -0,0 +1,205 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemas import IngestJob
+from .enums.DataBaseEnum import DataBaseEnum
+from .enums.IngestJobEnum import IngestJobStatusEnum
+from .fields import PyObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timedelta
+
+
+class IngestJobModel(BaseDataModel):
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client)
+        self.collection = self.db_client[DataBaseEnum.COLLECTION_INGEST_JOB_NAME.value]
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client)
+        await instance.init_collection()
+        return instance
+
+    async def init_collection(self):
+        # create_index is a no-op for existing indexes, collections created by an earlier
+        # version get the ones added since
+        indexes = IngestJob.get_indexes()
+        for index in indexes:
+            options = {}
+            if "partial_filter" in index:
+                options["partialFilterExpression"] = index["partial_filter"]
+            await self.collection.create_index(
+                index["key"],
+                name=index["name"],
+                unique=index["unique"],
+                **options
+            )
+
+    async def enqueue_jobs(self, jobs: list):
+        if len(jobs) == 0:
+            return []
+
+        # an asset already waiting or being worked on is not queued twice
+        active_records = await self.collection.find(
+            {
+                "job_asset_id": {"$in": [job.job_asset_id for job in jobs]},
+                "job_status": {"$in": [
+                    IngestJobStatusEnum.PENDING.value, IngestJobStatusEnum.RUNNING.value
+                ]}
+            },
+            {"job_asset_id": 1}
+        ).to_list(length=None)
+        active_asset_ids = {record["job_asset_id"] for record in active_records}
+
+        jobs = [job for job in jobs if job.job_asset_id not in active_asset_ids]
+        if len(jobs) == 0:
+            return []
+
+        # the unique active-job index settles enqueues racing past the check above
+        documents = [job.model_dump(by_alias=True, exclude={"id"}) for job in jobs]
+        duplicate_indexes = set()
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            duplicate_indexes = {
+                error["index"] for error in e.details["writeErrors"] if error["code"] == 11000
+            }
+            if len(duplicate_indexes) < len(e.details["writeErrors"]):
+                raise
+
+        queued_jobs = []
+        for i, (job, document) in enumerate(zip(jobs, documents)):
+            if i not in duplicate_indexes:
+                job.id = document["_id"]
+                queued_jobs.append(job)
+
+        return queued_jobs
+
+    async def count_active_jobs(self, job_project_id: PyObjectId):
+        return await self.collection.count_documents({
+            "job_project_id": job_project_id,
+            "job_status": {"$in": [
+                IngestJobStatusEnum.PENDING.value, IngestJobStatusEnum.RUNNING.value
+            ]}
+        })
+
+    async def claim_job(self, worker_id: str, lease_seconds: float, max_attempts: int):
+        # atomic: of all workers polling at once exactly one gets each job; a running job
+        # whose lease ran out (worker crashed or hung) is claimable again
+        now = datetime.utcnow()
+        record = await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"job_status": IngestJobStatusEnum.PENDING.value},
+                    {
+                        "job_status": IngestJobStatusEnum.RUNNING.value,
+                        "job_lease_expires_at": {"$lt": now}
+                    }
+                ],
+                "job_attempts": {"$lt": max_attempts}
+            },
+            {
+                "$set": {
+                    "job_status": IngestJobStatusEnum.RUNNING.value,
+                    "job_lease_owner": worker_id,
+                    "job_lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "job_updated_at": now
+                },
+                "$inc": {"job_attempts": 1}
+            },
+            sort=[("job_created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if record is None:
+            return None
+
+        return IngestJob(**record)
+
+    async def renew_lease(self, job_id: PyObjectId, worker_id: str, lease_seconds: float):
+        # False once another worker reclaimed the job, the caller must stop working on it
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            {
+                "_id": job_id,
+                "job_lease_owner": worker_id,
+                "job_status": IngestJobStatusEnum.RUNNING.value
+            },
+            {"$set": {
+                "job_lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "job_updated_at": now
+            }}
+        )
+        return result.matched_count == 1
+
+    async def is_lease_held(self, job_id: PyObjectId, worker_id: str):
+        record = await self.collection.find_one(
+            {
+                "_id": job_id,
+                "job_lease_owner": worker_id,
+                "job_status": IngestJobStatusEnum.RUNNING.value,
+                "job_lease_expires_at": {"$gt": datetime.utcnow()}
+            },
+            {"_id": 1}
+        )
+        return record is not None
+
+    async def complete_job(self, job_id: PyObjectId, worker_id: str, chunks_count: int):
+        result = await self.collection.update_one(
+            {"_id": job_id, "job_lease_owner": worker_id},
+            {"$set": {
+                "job_status": IngestJobStatusEnum.COMPLETED.value,
+                "job_lease_owner": None,
+                "job_lease_expires_at": None,
+                "job_chunks_count": chunks_count,
+                "job_error": None,
+                "job_updated_at": datetime.utcnow()
+            }}
+        )
+        return result.matched_count == 1
+
+    async def fail_job(self, job_id: PyObjectId, worker_id: str, error: str, do_retry: bool):
+        result = await self.collection.update_one(
+            {"_id": job_id, "job_lease_owner": worker_id},
+            {"$set": {
+                "job_status": IngestJobStatusEnum.PENDING.value if do_retry else IngestJobStatusEnum.FAILED.value,
+                "job_lease_owner": None,
+                "job_lease_expires_at": None,
+                "job_error": error,
+                "job_updated_at": datetime.utcnow()
+            }}
+        )
+        return result.matched_count == 1
+
+    async def fail_expired_jobs(self, max_attempts: int):
+        # expired leases that used up their attempts would otherwise stay running forever
+        now = datetime.utcnow()
+        result = await self.collection.update_many(
+            {
+                "job_status": IngestJobStatusEnum.RUNNING.value,
+                "job_lease_expires_at": {"$lt": now},
+                "job_attempts": {"$gte": max_attempts}
+            },
+            {"$set": {
+                "job_status": IngestJobStatusEnum.FAILED.value,
+                "job_lease_owner": None,
+                "job_lease_expires_at": None,
+                "job_error": "lease expired",
+                "job_updated_at": now
+            }}
+        )
+        return result.modified_count
+
+    async def get_project_job_counts(self, job_project_id: PyObjectId):
+        records = await self.collection.aggregate([
+            {"$match": {"job_project_id": job_project_id}},
+            {"$group": {
+                "_id": "$job_status",
+                "count": {"$sum": 1},
+                "chunks_count": {"$sum": "$job_chunks_count"}
+            }}
+        ]).to_list(length=None)
+
+        return {
+            record["_id"]: {"count": record["count"], "chunks_count": record["chunks_count"]}
+            for record in records
+        }
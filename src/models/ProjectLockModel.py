@@ -0,0 +1,92 @@
+from .BaseDataModel import BaseDataModel
+from .db_schemas import ProjectLock
+from .enums.DataBaseEnum import DataBaseEnum
+from .fields import PyObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+
+
+class ProjectLockModel(BaseDataModel):
+
+    def __init__(self, db_client: object):
+        super().__init__(db_client)
+        self.collection = self.db_client[DataBaseEnum.COLLECTION_PROJECT_LOCK_NAME.value]
+
+    @classmethod
+    async def create_instance(cls, db_client: object):
+        instance = cls(db_client)
+        await instance.init_collection()
+        return instance
+
+    async def init_collection(self):
+        # create_index is a no-op for existing indexes, collections created without them
+        # get them too; the upserts here rely on the unique ones
+        indexes = ProjectLock.get_indexes()
+        for index in indexes:
+            await self.collection.create_index(
+                index["key"],
+                name=index["name"],
+                unique=index["unique"]
+            )
+
+    async def acquire_lock(
+            self, lock_project_id: str, owner: str, operation: str, key: str, lease_seconds: float
+    ):
+        # returns (True, lock) when acquired, (False, current lock) when someone else holds it
+        now = datetime.utcnow()
+        try:
+            record = await self.collection.find_one_and_update(
+                {
+                    "lock_project_id": lock_project_id,
+                    "$or": [
+                        {"lock_owner": None},
+                        {"lock_expires_at": {"$lt": now}}
+                    ]
+                },
+                {"$set": {
+                    "lock_owner": owner,
+                    "lock_token": PyObjectId(),
+                    "lock_operation": operation,
+                    "lock_key": key,
+                    "lock_expires_at": now + timedelta(seconds=lease_seconds),
+                    "lock_result": None,
+                    "lock_acquired_at": now,
+                    "lock_released_at": None
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True, ProjectLock(**record)
+        except DuplicateKeyError:
+            # the upsert lost to the unique index: the lock exists and is held
+            record = await self.collection.find_one({"lock_project_id": lock_project_id})
+            if record is None:
+                return False, None
+            return False, ProjectLock(**record)
+
+    async def get_lock(self, lock_project_id: str):
+        record = await self.collection.find_one({"lock_project_id": lock_project_id})
+        if record is None:
+            return None
+        return ProjectLock(**record)
+
+    async def renew_lock(self, lock_project_id: str, token: PyObjectId, lease_seconds: float):
+        result = await self.collection.update_one(
+            {"lock_project_id": lock_project_id, "lock_token": token, "lock_owner": {"$ne": None}},
+            {"$set": {"lock_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)}}
+        )
+        return result.matched_count == 1
+
+    async def release_lock(self, lock_project_id: str, token: PyObjectId, result: dict = None):
+        now = datetime.utcnow()
+        update_result = await self.collection.update_one(
+            {"lock_project_id": lock_project_id, "lock_token": token},
+            {"$set": {
+                "lock_owner": None,
+                "lock_expires_at": None,
+                "lock_result": result,
+                "lock_released_at": now
+            }}
+        )
+        return update_result.matched_count == 1
@@ -1,6 +1,7 @@
 from .BaseDataModel import BaseDataModel
 from .db_schemas import Project
 from .enums.DataBaseEnum import DataBaseEnum
+from .fields import PyObjectId
 
 
 class ProjectModel(BaseDataModel):
@@ -46,6 +47,29 @@ class ProjectModel(BaseDataModel):
 
         return Project(**record)
 
+    async def get_project_by_object_id(self, id: PyObjectId):
+        record = await self.collection.find_one({"_id": id})
+        if record is None:
+            return None
+
+        return Project(**record)
+
+    async def get_projects_by_ids(self, project_ids: list):
+        records = await self.collection.find({
+            "project_id": {"$in": project_ids}
+        }).to_list(length=None)
+
+        return [
+            Project(**record)
+            for record in records
+        ]
+
+    async def bump_index_version(self, project_id: PyObjectId):
+        _ = await self.collection.update_one(
+            {"_id": project_id},
+            {"$inc": {"project_index_version": 1}}
+        )
+
 # getting all projects
 # **note: we should use pagination, so if the results were too much it won't crash
     async def get_all_projects(self, page: int = 1, page_size: int = 10):
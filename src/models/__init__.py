@@ -1,2 +1,9 @@
 from .enums.ResponseEnums import ResponseSignal
 from .enums.ProcessingEnum import ProcessingEnum
+from .enums.SplitterEnum import SplitterEnum, LengthUnitEnum
+from .enums.SearchFieldEnum import SearchFieldEnum
+from .enums.IndexingRunEnum import IndexingRunStatusEnum
+from .enums.EmbeddingDtypeEnum import EmbeddingDtypeEnum
+from .enums.PriorityEnum import PriorityEnum
+from .enums.IngestJobEnum import IngestJobStatusEnum
+from .enums.ProjectOperationEnum import ProjectOperationEnum
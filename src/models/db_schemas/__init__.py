@@ -1,3 +1,8 @@
 from .project import Project
 from .data_chunk import DataChunk
 from .asset import Asset
+from .retrieved_document import RetrievedDocument, CollectionInfo
+from .indexing_run import IndexingRun
+from .chunk_embedding import ChunkEmbedding
+from .ingest_job import IngestJob
+from .project_lock import ProjectLock
@@ -18,7 +18,10 @@ class Asset(BaseModel):
     asset_type: str = Field(..., min_length=1)
     asset_name: str = Field(..., min_length=1)
     asset_size: int = Field(ge=0, default=None)
+    asset_hash: Optional[str] = Field(default=None)
     asset_config: dict = Field(default=None)
+    asset_metadata: dict = Field(default=None)
+    asset_chunked_at: Optional[datetime] = Field(default=None)
     asset_pushed_at: datetime = Field(default=datetime.utcnow)
 
     @classmethod
@@ -38,5 +41,15 @@ class Asset(BaseModel):
                 ],
                 "name": "asset_project_id_name_index_1",
                 "unique": True
+            },
+            {
+                "key": [
+                    ("asset_project_id", 1),  # 1 is for ascending
+                    ("asset_hash", 1)
+                ],
+                "name": "asset_project_id_hash_index_1",
+                "unique": True,
+                # assets uploaded before hashing was added have no hash, $exists would still index nulls
+                "partial_filter": {"asset_hash": {"$type": "string"}}
             }
         ]
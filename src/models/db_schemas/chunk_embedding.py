@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
+from models.fields import PyObjectId
+
+
+class ChunkEmbedding(BaseModel):
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        populate_by_name=True,
+        json_encoders={
+            PyObjectId: lambda x: str(x)
+        }
+    )
+
+    id: Optional[PyObjectId] = Field(None, alias="_id")
+    embedding_chunk_id: PyObjectId
+    embedding_project_id: PyObjectId
+    embedding_model_id: str = Field(..., min_length=1)
+    embedding_dtype: str = Field(..., min_length=1)
+    # raw little-endian float32/float16 values
+    embedding_vector: bytes
+
+    @classmethod
+    def get_indexes(cls):
+        return [
+            {
+                "key": [
+                    ("embedding_chunk_id", 1),  # 1 is for ascending
+                    ("embedding_model_id", 1)
+                ],
+                "name": "embedding_chunk_id_model_id_index_1",
+                "unique": True
+            },
+            {
+                "key": [
+                    ("embedding_project_id", 1)
+                ],
+                "name": "embedding_project_id_index_1",
+                "unique": False
+            }
+        ]
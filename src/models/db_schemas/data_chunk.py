@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Optional, List
 from models.fields import PyObjectId
 
 
@@ -18,6 +18,9 @@ class DataChunk(BaseModel):
     chunk_order: int = Field(..., gt=0)
     chunk_project_id: PyObjectId
     chunk_asset_id: PyObjectId
+    # a near duplicate has no vector of its own, it is found through the point of its canonical chunk
+    chunk_canonical_id: Optional[PyObjectId] = None
+    chunk_lsh_bands: Optional[List[int]] = None
 
     @classmethod
     def get_indexes(cls):
@@ -28,5 +31,35 @@ class DataChunk(BaseModel):
                 ],
                 "name": "chunk_project_id_index_1",
                 "unique": False
+            },
+            {
+                "key": [
+                    ("chunk_project_id", 1),  # 1 is for ascending
+                    ("_id", 1)
+                ],
+                "name": "chunk_project_id_id_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("chunk_asset_id", 1)  # 1 is for ascending
+                ],
+                "name": "chunk_asset_id_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("chunk_project_id", 1),  # 1 is for ascending
+                    ("chunk_lsh_bands", 1)
+                ],
+                "name": "chunk_project_id_lsh_bands_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("chunk_canonical_id", 1)  # 1 is for ascending
+                ],
+                "name": "chunk_canonical_id_index_1",
+                "unique": False
             }
         ]
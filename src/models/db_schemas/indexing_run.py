@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
+from models.fields import PyObjectId
+from datetime import datetime
+
+
+class IndexingRun(BaseModel):
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        populate_by_name=True,
+        json_encoders={
+            PyObjectId: lambda x: str(x)
+        }
+    )
+
+    id: Optional[PyObjectId] = Field(None, alias="_id")
+    run_project_id: PyObjectId
+    run_status: str = Field(..., min_length=1)
+    run_do_reset: int = Field(default=0)
+    # last chunk whose vector is committed, chunks are indexed in _id order
+    run_last_chunk_id: Optional[PyObjectId] = Field(default=None)
+    run_indexed_count: int = Field(ge=0, default=0)
+    run_error: Optional[str] = Field(default=None)
+    run_created_at: datetime = Field(default_factory=datetime.utcnow)
+    run_updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @classmethod
+    def get_indexes(cls):
+        return [
+            {
+                "key": [
+                    ("run_project_id", 1),  # 1 is for ascending
+                    ("run_created_at", -1)
+                ],
+                "name": "run_project_id_created_at_index_1",
+                "unique": False
+            }
+        ]
@@ -0,0 +1,80 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
+from models.fields import PyObjectId
+from models.enums.IngestJobEnum import IngestJobStatusEnum
+from datetime import datetime
+
+
+class IngestJob(BaseModel):
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        populate_by_name=True,
+        json_encoders={
+            PyObjectId: lambda x: str(x)
+        }
+    )
+
+    id: Optional[PyObjectId] = Field(None, alias="_id")
+    job_project_id: PyObjectId
+    job_asset_id: PyObjectId
+    job_status: str = Field(..., min_length=1)
+    job_chunk_size: int = Field(gt=0, default=100)
+    job_overlap_size: int = Field(ge=0, default=20)
+    job_splitter: Optional[str] = Field(default=None)
+    job_length_unit: Optional[str] = Field(default=None)
+    job_do_index: int = Field(default=1)
+    # a running job belongs to its lease owner until the lease expires without a heartbeat
+    job_lease_owner: Optional[str] = Field(default=None)
+    job_lease_expires_at: Optional[datetime] = Field(default=None)
+    job_attempts: int = Field(ge=0, default=0)
+    job_chunks_count: int = Field(ge=0, default=0)
+    job_error: Optional[str] = Field(default=None)
+    job_created_at: datetime = Field(default_factory=datetime.utcnow)
+    job_updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @classmethod
+    def get_indexes(cls):
+        return [
+            {
+                "key": [
+                    ("job_status", 1),  # 1 is for ascending
+                    ("job_created_at", 1)
+                ],
+                "name": "job_status_created_at_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("job_status", 1),  # 1 is for ascending
+                    ("job_lease_expires_at", 1)
+                ],
+                "name": "job_status_lease_expires_at_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("job_project_id", 1),  # 1 is for ascending
+                    ("job_status", 1)
+                ],
+                "name": "job_project_id_status_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("job_asset_id", 1)  # 1 is for ascending
+                ],
+                "name": "job_asset_id_index_1",
+                "unique": False
+            },
+            {
+                "key": [
+                    ("job_asset_id", 1)  # 1 is for ascending
+                ],
+                "name": "job_asset_id_active_index_1",
+                "unique": True,
+                # at most one queued or running job per asset
+                "partial_filter": {"job_status": {"$in": [
+                    IngestJobStatusEnum.PENDING.value, IngestJobStatusEnum.RUNNING.value
+                ]}}
+            }
+        ]
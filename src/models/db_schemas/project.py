@@ -14,6 +14,8 @@ class Project(BaseModel):
 
     id: Optional[PyObjectId] = Field(None, alias="_id")
     project_id: str = Field(..., min_length=1)
+    # bumped whenever the project's vector index changes
+    project_index_version: int = Field(default=0)
 
     @field_validator('project_id')
     @classmethod
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
+from models.fields import PyObjectId
+from datetime import datetime
+
+
+class ProjectLock(BaseModel):
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        populate_by_name=True,
+        json_encoders={
+            PyObjectId: lambda x: str(x)
+        }
+    )
+
+    id: Optional[PyObjectId] = Field(None, alias="_id")
+    lock_project_id: str = Field(..., min_length=1)
+    # owner is None once released, the last operation and its result stay for late joiners
+    lock_owner: Optional[str] = Field(default=None)
+    lock_token: Optional[PyObjectId] = Field(default=None)
+    lock_operation: Optional[str] = Field(default=None)
+    lock_key: Optional[str] = Field(default=None)
+    lock_expires_at: Optional[datetime] = Field(default=None)
+    lock_result: Optional[dict] = Field(default=None)
+    lock_acquired_at: Optional[datetime] = Field(default=None)
+    lock_released_at: Optional[datetime] = Field(default=None)
+
+    @classmethod
+    def get_indexes(cls):
+        return [
+            {
+                "key": [
+                    ("lock_project_id", 1)  # 1 is for ascending
+                ],
+                "name": "lock_project_id_index_1",
+                "unique": True
+            }
+        ]
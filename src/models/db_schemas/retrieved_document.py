@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional, Union, List
+
+
+class RetrievedDocument(BaseModel):
+    id: Union[int, str]
+    score: float
+    text: Optional[str] = None
+    metadata: Optional[dict] = None
+    chunk_id: Optional[str] = None
+    project_id: Optional[str] = None
+    normalized_score: Optional[float] = None
+    duplicates: Optional[List[dict]] = None
+    duplicates_count: Optional[int] = None
+
+
+class CollectionInfo(BaseModel):
+    status: str
+    points_count: Optional[int] = None
+    indexed_vectors_count: Optional[int] = None
+    segments_count: Optional[int] = None
+    vector_size: Optional[int] = None
+    distance: Optional[str] = None
+    project_points_count: Optional[int] = None
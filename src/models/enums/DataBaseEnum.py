@@ -6,3 +6,7 @@ class DataBaseEnum(Enum):
     COLLECTION_PROJECT_NAME = "projects"
     COLLECTION_CHUNK_NAME = "chunks"
     COLLECTION_ASSET_NAME = "assets"
+    COLLECTION_INDEXING_RUN_NAME = "indexing_runs"
+    COLLECTION_EMBEDDING_NAME = "embeddings"
+    COLLECTION_INGEST_JOB_NAME = "ingest_jobs"
+    COLLECTION_PROJECT_LOCK_NAME = "project_locks"
@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class EmbeddingDtypeEnum(Enum):
+    FLOAT32 = "float32"
+    FLOAT16 = "float16"
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class IndexingRunStatusEnum(Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
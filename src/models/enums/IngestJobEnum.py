@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class IngestJobStatusEnum(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
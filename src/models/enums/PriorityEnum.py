@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class PriorityEnum(Enum):
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class ProjectOperationEnum(Enum):
+    PROCESS = "process"
+    ENQUEUE = "enqueue"
+    PUSH = "push"
+    RESUME = "resume"
+    REBUILD = "rebuild"
+    INGEST = "ingest"
+    IMPORT = "import"
@@ -8,14 +8,29 @@ class ResponseSignal(Enum):
     FILE_SIZE_EXCEEDED = "File size exceeded!"
     FILE_UPLOAD_SUCCESS = "File upload success!"
     FILE_UPLOAD_FAILED = "File upload failed"
+    FILE_ALREADY_UPLOADED = "File already uploaded"
+    FILE_ENCRYPTED_OR_UNSUPPORTED = "File is encrypted or uses an unsupported compression"
     PROCESSING_FAILED = "File processing failed"
     PROCESSING_SUCCESS = "File processing success"
+    PROCESSING_OPTION_NOT_SUPPORTED = "unsupported splitter or length unit"
     NO_FILES_ERROR = "no files founded"
     FILE_ID_ERROR = "no file found with this id"
     PROJECT_NOT_FOUND_ERROR = "project not found"
     INSERT_INTO_VECTORDB_ERROR = "insert into vectordb error"
     INSERT_INTO_VECTORDB_SUCCESS = "insert into vectordb success"
+    INDEXING_RUN_NOT_FOUND = "no indexing run found for this project"
+    INDEXING_RUN_ALREADY_COMPLETED = "indexing run already completed"
     VECTORDB_COLLECTION_RETRIEVED = "vectordb collection retrieved"
     VECTORDB_COLLECTION_RETRIEVAL_ERROR = "error while retrieving vectordb collection"
     VECTOR_SEARCH_ERROR = "vector_search_error"
     VECTOR_SEARCH_SUCCESS = "vector_search_success"
+    PROVIDER_UNAVAILABLE = "embedding provider unavailable"
+    RAG_ANSWER_ERROR = "rag_answer_error"
+    RAG_ANSWER_SUCCESS = "rag_answer_success"
+    ADMISSION_REJECTED = "server busy, retry later"
+    INGEST_JOBS_ENQUEUED = "ingest jobs enqueued"
+    INGEST_JOBS_RETRIEVED = "ingest jobs retrieved"
+    INGEST_JOBS_ACTIVE = "project has queued or running ingest jobs, reset it once they finish"
+    STORED_EMBEDDINGS_MISSING = "stored embeddings missing for the current model, push the project instead"
+    PROJECT_OPERATION_IN_PROGRESS = "another operation is running on this project, retry later"
+    PROJECT_LEASE_LOST = "the project lock was lost and the operation was stopped, retry later"
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class SearchFieldEnum(Enum):
+    TEXT = "text"
+    METADATA = "metadata"
+    CHUNK_ID = "chunk_id"
+    PROJECT_ID = "project_id"
+    DUPLICATES = "duplicates"
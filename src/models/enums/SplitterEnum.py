@@ -0,0 +1,11 @@
+from enum import Enum
+
+
+class SplitterEnum(Enum):
+    LANGCHAIN = "langchain"
+    NATIVE = "native"
+
+
+class LengthUnitEnum(Enum):
+    CHARACTER = "character"
+    TOKEN = "token"
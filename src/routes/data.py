@@ -1,16 +1,24 @@
 from fastapi import FastAPI, APIRouter, Depends, UploadFile, status, Request
+from typing import List
 from fastapi.responses import JSONResponse
 from helpers.config import Settings, get_settings
-from controllers import DataController, ProjectController, ProcessController
-from models import ResponseSignal
+from helpers.admission import admission
+from helpers.single_flight import run_single_flight
+from controllers import DataController, ProjectController, IngestController, NLPController
+from models import ResponseSignal, PriorityEnum, IngestJobStatusEnum, ProjectOperationEnum
 import os
-import aiofiles
+import asyncio
 import logging
-from .schemas import ProcessRequest
+import tarfile
+import zipfile
+from pymongo.errors import DuplicateKeyError
+from .schemas import ProcessRequest, IngestRequest
 from models.ProjectModel import ProjectModel
 from models.ChunkModel import ChunkModel
 from models.AssetModel import AssetModel
-from models.db_schemas import DataChunk, Asset
+from models.EmbeddingModel import EmbeddingModel
+from models.IngestJobModel import IngestJobModel
+from models.db_schemas import Asset, IngestJob
 from models.enums.AssetTypeEnum import AssetTypeEnum
 
 logger = logging.getLogger('uvicorn.error')
@@ -21,7 +29,7 @@ data_router = APIRouter(
 )
 
 
-@data_router.post("/upload/{project_id}")
+@data_router.post("/upload/{project_id}", dependencies=[Depends(admission(PriorityEnum.BULK.value))])
 async def upload_data(
     request: Request, project_id: str, file: UploadFile,
     app_settings: Settings = Depends(get_settings)
@@ -42,16 +50,20 @@ async def upload_data(
             }
         )
 
-    file_path, file_id = DataController().generate_unique_filepath(
+    data_controller = DataController()
+    file_path, file_id = data_controller.generate_unique_filepath(
         original_file_name=file.filename,
         project_id=project_id
     )
+    tmp_file_path = data_controller.get_tmp_file_path(file_path)
     try:
-        async with aiofiles.open(file_path, mode='wb') as f:
-            while chunk := await file.read(app_settings.FILE_DEFAULT_CHUNK_SIZE):
-                await f.write(chunk)
+        file_hash = await data_controller.write_file_stream(
+            stream=file, file_path=tmp_file_path
+        )
     except Exception as e:
         logger.error(f'Error while uploading file: {e}')
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={
@@ -64,14 +76,47 @@ async def upload_data(
         db_client=request.app.db_client
     )
 
+    # re-uploading the same content short-circuits to the existing asset
+    asset_record = await asset_model.get_asset_by_hash(
+        asset_project_id=project.id, asset_hash=file_hash
+    )
+    if asset_record is not None:
+        os.remove(tmp_file_path)
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.FILE_ALREADY_UPLOADED.value,
+                "file_id": str(asset_record.id)
+            }
+        )
+
+    data_controller.store_file_by_hash(
+        tmp_file_path=tmp_file_path,
+        file_hash=file_hash,
+        file_path=file_path
+    )
+
     asset_resource = Asset(
         asset_project_id=project.id,
         asset_type=AssetTypeEnum.FILE.value,
         asset_name=file_id,
         asset_size=os.path.getsize(file_path),
+        asset_hash=file_hash,
     )
 
-    asset_record = await asset_model.create_asset(asset=asset_resource)
+    try:
+        asset_record = await asset_model.create_asset(asset=asset_resource)
+    except DuplicateKeyError:
+        # a concurrent upload of the same content won the race
+        os.remove(file_path)
+        asset_record = await asset_model.get_asset_by_hash(
+            asset_project_id=project.id, asset_hash=file_hash
+        )
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.FILE_ALREADY_UPLOADED.value,
+                "file_id": str(asset_record.id)
+            }
+        )
 
     return JSONResponse(
         content={
@@ -81,8 +126,192 @@ async def upload_data(
     )
 
 
-@data_router.post('/process/{project_id}')
+@data_router.post("/upload/batch/{project_id}", dependencies=[Depends(admission(PriorityEnum.BULK.value))])
+async def upload_batch_data(
+    request: Request, project_id: str, files: List[UploadFile],
+    app_settings: Settings = Depends(get_settings)
+):
+
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+    project = await project_model.get_project_or_create_one(project_id=project_id)
+
+    data_controller = DataController()
+    max_size = app_settings.FILE_MAX_SIZE * 1048576  # CONVERT MB TO BYTES
+
+    file_results = []
+    write_groups = []
+
+    for file in files:
+        if data_controller.is_archive_file(file=file):
+            is_valid, result = data_controller.validate_archive_file(file=file)
+            if not is_valid:
+                file_results.append({
+                    "file_name": file.filename,
+                    "signal": result
+                })
+                continue
+
+            try:
+                members, is_sequential = await asyncio.to_thread(
+                    data_controller.get_archive_members, file=file
+                )
+            except (zipfile.BadZipFile, tarfile.TarError) as e:
+                logger.error(f'Error while reading archive {file.filename}: {e}')
+                file_results.append({
+                    "file_name": file.filename,
+                    "signal": ResponseSignal.FILE_UPLOAD_FAILED.value
+                })
+                continue
+        else:
+            members = [(file.filename, file.content_type, file.size, file)]
+            is_sequential = False
+
+        valid_members = []
+        for file_name, content_type, size, stream in members:
+            if stream is None:
+                file_results.append({
+                    "file_name": file_name,
+                    "signal": ResponseSignal.FILE_ENCRYPTED_OR_UNSUPPORTED.value
+                })
+                continue
+
+            is_valid, result = data_controller.validate_file(
+                content_type=content_type, size=size
+            )
+            if not is_valid:
+                file_results.append({
+                    "file_name": file_name,
+                    "signal": result
+                })
+                continue
+            valid_members.append((file_name, stream))
+
+        if is_sequential:
+            write_groups.append(valid_members)
+        else:
+            write_groups.extend([member] for member in valid_members)
+
+    semaphore = asyncio.Semaphore(app_settings.FILE_UPLOAD_CONCURRENCY)
+
+    async def write_group(members: list):
+        async with semaphore:
+            return await data_controller.write_project_files(
+                members=members, project_id=project_id, max_size=max_size
+            )
+
+    written_files = [
+        written_file
+        for group in await asyncio.gather(*[
+            write_group(members) for members in write_groups
+        ])
+        for written_file in group
+    ]
+
+    asset_model = await AssetModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    existing_assets = await asset_model.get_assets_by_hashes(
+        asset_project_id=project.id,
+        asset_hashes=list({
+            file_hash for _, _, _, file_hash in written_files if file_hash
+        })
+    )
+
+    new_assets = {}
+    pending_results = []
+    for file_name, file_path, file_id, file_hash in written_files:
+        if file_hash is None:
+            file_results.append({
+                "file_name": file_name,
+                "signal": ResponseSignal.FILE_UPLOAD_FAILED.value
+            })
+            continue
+
+        if file_hash in existing_assets or file_hash in new_assets:
+            os.remove(data_controller.get_tmp_file_path(file_path))
+            pending_results.append((file_name, file_hash, ResponseSignal.FILE_ALREADY_UPLOADED.value))
+            continue
+
+        data_controller.store_file_by_hash(
+            tmp_file_path=data_controller.get_tmp_file_path(file_path),
+            file_hash=file_hash,
+            file_path=file_path
+        )
+        new_assets[file_hash] = Asset(
+            asset_project_id=project.id,
+            asset_type=AssetTypeEnum.FILE.value,
+            asset_name=file_id,
+            asset_size=os.path.getsize(file_path),
+            asset_hash=file_hash,
+        )
+        pending_results.append((file_name, file_hash, ResponseSignal.FILE_UPLOAD_SUCCESS.value))
+
+    inserted_assets = await asset_model.insert_many_assets(
+        assets=list(new_assets.values())
+    )
+    inserted_hashes = {asset.asset_hash for asset in inserted_assets}
+
+    # assets that lost an insert race to a concurrent upload of the same content
+    lost_hashes = [
+        file_hash for file_hash in new_assets
+        if file_hash not in inserted_hashes
+    ]
+    for file_hash in lost_hashes:
+        os.remove(os.path.join(
+            ProjectController().get_project_path(project_id=project_id),
+            new_assets[file_hash].asset_name
+        ))
+    if lost_hashes:
+        existing_assets.update(await asset_model.get_assets_by_hashes(
+            asset_project_id=project.id, asset_hashes=lost_hashes
+        ))
+
+    for file_name, file_hash, signal in pending_results:
+        if file_hash in inserted_hashes and signal == ResponseSignal.FILE_UPLOAD_SUCCESS.value:
+            asset_record = new_assets[file_hash]
+        else:
+            asset_record = existing_assets.get(file_hash, new_assets.get(file_hash))
+            signal = ResponseSignal.FILE_ALREADY_UPLOADED.value
+
+        file_results.append({
+            "file_name": file_name,
+            "signal": signal,
+            "file_id": str(asset_record.id) if asset_record and asset_record.id else None
+        })
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.FILE_UPLOAD_SUCCESS.value,
+            "uploaded_files": len(inserted_assets),
+            "files": file_results
+        }
+    )
+
+
+@data_router.post('/process/{project_id}', dependencies=[Depends(admission(PriorityEnum.BULK.value))])
 async def process_endpoint(request: Request, project_id: str, process_request: ProcessRequest):
+    unsupported_options = process_request.get_unsupported_options()
+    if unsupported_options:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.PROCESSING_OPTION_NOT_SUPPORTED.value,
+                "options": unsupported_options
+            }
+        )
+
+    # a reset can't run under a push of the same project, a repeated request joins the running one
+    return await run_single_flight(
+        request=request, project_id=project_id, operation=ProjectOperationEnum.PROCESS.value,
+        handler=lambda: process_project(request, project_id, process_request),
+        params=process_request.model_dump()
+    )
+
+
+async def process_project(request: Request, project_id: str, process_request: ProcessRequest):
     try:
         chunk_size = process_request.chunk_size
         overlap_size = process_request.overlap_size
@@ -99,36 +328,19 @@ async def process_endpoint(request: Request, project_id: str, process_request: P
             db_client=request.app.db_client
         )
 
-        project_files_ids = {}
-        if process_request.file_id:
-            asset_record = await asset_model.get_asset_record(
-                asset_project_id=project.id,
-                asset_name=process_request.file_id
-            )
-
-            if asset_record is None:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content={
-                        "signal": ResponseSignal.FILE_ID_ERROR.value
-                    }
-                )
-
-            project_files_ids = {
-                asset_record.id: asset_record.asset_name
-            }
-        else:
+        project_assets = await get_process_assets(
+            asset_model=asset_model, project=project, file_id=process_request.file_id
+        )
 
-            project_files = await asset_model.get_all_project_assets(
-                asset_project_id=project.id,
-                asset_type=AssetTypeEnum.FILE.value
+        if project_assets is None:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "signal": ResponseSignal.FILE_ID_ERROR.value
+                }
             )
-            project_files_ids = {
-                record.id: record.asset_name
-                for record in project_files
-            }
 
-        if len(project_files_ids) == 0:
+        if len(project_assets) == 0:
             return JSONResponse(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 content={
@@ -136,8 +348,6 @@ async def process_endpoint(request: Request, project_id: str, process_request: P
                 }
             )
 
-        process_controller = ProcessController(project_id=project_id)
-
         no_records = 0
         no_files = 0
 
@@ -146,26 +356,39 @@ async def process_endpoint(request: Request, project_id: str, process_request: P
         )
 
         if do_reset == 1:
-            _ = await chunk_model.delete_chunks_by_project_id(
-                project_id=project.id
-            )
+            # workers would finish their jobs against chunks the reset deleted
+            if await has_active_ingest_jobs(db_client=request.app.db_client, project=project):
+                return JSONResponse(
+                    status_code=status.HTTP_409_CONFLICT,
+                    content={
+                        "signal": ResponseSignal.INGEST_JOBS_ACTIVE.value
+                    }
+                )
 
-        for asset_id, file_id in project_files_ids.items():
+            _ = await reset_project_chunks(
+                db_client=request.app.db_client, project_model=project_model,
+                chunk_model=chunk_model, project=project
+            )
 
-            file_content = process_controller.get_file_content(file_id=file_id)
+        ingest_controller = IngestController(
+            project=project, asset_model=asset_model, chunk_model=chunk_model
+        )
 
-            if file_content is None:
-                logger.error(f"Error while processing file {file_id}")
-                continue
+        for asset in project_assets:
 
-            file_chunks = process_controller.process_file_content(
-                file_content=file_content,
-                file_id=file_id,
+            file_chunks_records = await ingest_controller.chunk_asset(
+                asset=asset,
                 chunk_size=chunk_size,
-                overlap_size=overlap_size
+                overlap_size=overlap_size,
+                splitter=process_request.splitter,
+                length_unit=process_request.length_unit
             )
 
-            if file_chunks is None or len(file_chunks) == 0:
+            if file_chunks_records is None:
+                logger.error(f"Error while processing file {asset.asset_name}")
+                continue
+
+            if len(file_chunks_records) == 0:
                 return JSONResponse(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     content={
@@ -173,19 +396,7 @@ async def process_endpoint(request: Request, project_id: str, process_request: P
                     }
                 )
 
-            file_chunks_records = [
-                DataChunk(
-                    chunk_text=chunk.page_content,
-                    chunk_metadata=chunk.metadata,
-                    chunk_order=i+1,
-                    chunk_project_id=project.id,
-                    chunk_asset_id=asset_id)
-                for i, chunk in enumerate(file_chunks)
-            ]
-
-            no_records += await chunk_model.insert_many_chunks(
-                chunks=file_chunks_records
-            )
+            no_records += len(file_chunks_records)
             no_files += 1
         return JSONResponse(
             content={
@@ -201,3 +412,175 @@ async def process_endpoint(request: Request, project_id: str, process_request: P
                 "signal": ResponseSignal.PROCESSING_FAILED.value
             }
         )
+
+
+@data_router.post('/process/enqueue/{project_id}', dependencies=[Depends(admission(PriorityEnum.BULK.value))])
+async def enqueue_process_endpoint(request: Request, project_id: str, ingest_request: IngestRequest):
+    unsupported_options = ingest_request.get_unsupported_options()
+    if unsupported_options:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.PROCESSING_OPTION_NOT_SUPPORTED.value,
+                "options": unsupported_options
+            }
+        )
+
+    return await run_single_flight(
+        request=request, project_id=project_id, operation=ProjectOperationEnum.ENQUEUE.value,
+        handler=lambda: enqueue_project_assets(request, project_id, ingest_request),
+        params=ingest_request.model_dump()
+    )
+
+
+async def enqueue_project_assets(request: Request, project_id: str, ingest_request: IngestRequest):
+    # the api only queues the assets, ingest workers (worker.py) parse, chunk, embed and index them
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+    )
+
+    asset_model = await AssetModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project_assets = await get_process_assets(
+        asset_model=asset_model, project=project, file_id=ingest_request.file_id
+    )
+
+    if project_assets is None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.FILE_ID_ERROR.value
+            }
+        )
+
+    if len(project_assets) == 0:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.NO_FILES_ERROR.value
+            }
+        )
+
+    if ingest_request.do_reset == 1:
+        # the reset would delete what queued and running jobs write, and their assets would be
+        # skipped as already queued
+        if await has_active_ingest_jobs(db_client=request.app.db_client, project=project):
+            return JSONResponse(
+                status_code=status.HTTP_409_CONFLICT,
+                content={
+                    "signal": ResponseSignal.INGEST_JOBS_ACTIVE.value
+                }
+            )
+
+        chunk_model = await ChunkModel.create_instance(
+            db_client=request.app.db_client
+        )
+        nlp_controller = NLPController(
+            vectordb_client=request.app.vectordb_client,
+            embedding_client=request.app.embedding_client,
+            generation_client=request.app.generation_client
+        )
+        _ = await reset_project_chunks(
+            db_client=request.app.db_client, project_model=project_model,
+            chunk_model=chunk_model, project=project, nlp_controller=nlp_controller
+        )
+
+    ingest_job_model = await IngestJobModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    jobs = await ingest_job_model.enqueue_jobs(jobs=[
+        IngestJob(
+            job_project_id=project.id,
+            job_asset_id=asset.id,
+            job_status=IngestJobStatusEnum.PENDING.value,
+            job_chunk_size=ingest_request.chunk_size,
+            job_overlap_size=ingest_request.overlap_size,
+            job_splitter=ingest_request.splitter,
+            job_length_unit=ingest_request.length_unit,
+            job_do_index=ingest_request.do_index
+        )
+        for asset in project_assets
+    ])
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "signal": ResponseSignal.INGEST_JOBS_ENQUEUED.value,
+            "enqueued_jobs": len(jobs),
+            "already_queued": len(project_assets) - len(jobs)
+        }
+    )
+
+
+@data_router.get('/process/jobs/{project_id}')
+async def process_jobs_status(request: Request, project_id: str):
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+    )
+
+    ingest_job_model = await IngestJobModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.INGEST_JOBS_RETRIEVED.value,
+            "jobs": await ingest_job_model.get_project_job_counts(job_project_id=project.id)
+        }
+    )
+
+
+async def get_process_assets(asset_model: AssetModel, project, file_id: str = None):
+    # None when the requested file doesn't exist
+    if file_id:
+        asset_record = await asset_model.get_asset_record(
+            asset_project_id=project.id,
+            asset_name=file_id
+        )
+        if asset_record is None:
+            return None
+        return [asset_record]
+
+    return await asset_model.get_all_project_assets(
+        asset_project_id=project.id,
+        asset_type=AssetTypeEnum.FILE.value
+    )
+
+
+async def has_active_ingest_jobs(db_client, project):
+    ingest_job_model = await IngestJobModel.create_instance(db_client=db_client)
+    return await ingest_job_model.count_active_jobs(job_project_id=project.id) > 0
+
+
+async def reset_project_chunks(db_client, project_model: ProjectModel, chunk_model: ChunkModel, project, nlp_controller: NLPController = None):
+    deleted_count = await chunk_model.delete_chunks_by_project_id(
+        project_id=project.id
+    )
+    # the assets have to be chunked again
+    asset_model = await AssetModel.create_instance(
+        db_client=db_client
+    )
+    _ = await asset_model.reset_project_assets_chunked(
+        asset_project_id=project.id
+    )
+    # the vectors belonged to the deleted chunk ids
+    embedding_model = await EmbeddingModel.create_instance(
+        db_client=db_client
+    )
+    _ = await embedding_model.delete_embeddings_by_project_id(
+        project_id=project.id
+    )
+    if nlp_controller is not None:
+        _ = await asyncio.to_thread(nlp_controller.reset_vector_db_collection, project=project)
+    # answers cached for the project cite chunks that no longer exist
+    _ = await project_model.bump_index_version(project_id=project.id)
+    return deleted_count
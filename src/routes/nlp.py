@@ -1,10 +1,19 @@
-from fastapi import FastAPI, APIRouter, status, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Depends, status, Request
+from fastapi.responses import JSONResponse, Response
 from models.ProjectModel import ProjectModel
 from models.ChunkModel import ChunkModel
-from .schemas import PushRequest, SearchRequest
+from models.IndexingRunModel import IndexingRunModel
+from models.EmbeddingModel import EmbeddingModel
+from models.IngestJobModel import IngestJobModel
+from models.db_schemas import IndexingRun
+from .schemas import PushRequest, SearchRequest, AnswerRequest, BatchSearchRequest, FederatedSearchRequest
+from .schemas import SearchResponse, BatchSearchResponse, FederatedSearchResponse
 from controllers import NLPController
-from models import ResponseSignal
+from models import ResponseSignal, IndexingRunStatusEnum, PriorityEnum, ProjectOperationEnum
+from helpers.config import get_settings
+from helpers.admission import admission
+from helpers.single_flight import run_single_flight
+from stores.llm.LLMScheduler import LLMScheduler
 import logging
 
 logger = logging.getLogger("uvicorn.error")
@@ -15,8 +24,17 @@ nlp_router = APIRouter(
 )
 
 
-@nlp_router.post("/index/push/{project_id}")
+@nlp_router.post("/index/push/{project_id}", dependencies=[Depends(admission(PriorityEnum.BULK.value))])
 async def index_project(request: Request, project_id: str, push_request: PushRequest):
+    # a repeated push joins the running one, other operations on the project wait or get 409
+    return await run_single_flight(
+        request=request, project_id=project_id, operation=ProjectOperationEnum.PUSH.value,
+        handler=lambda: push_project_index(request, project_id, push_request),
+        params=push_request.model_dump()
+    )
+
+
+async def push_project_index(request: Request, project_id: str, push_request: PushRequest):
 
     project_model = await ProjectModel.create_instance(
         db_client=request.app.db_client
@@ -26,6 +44,14 @@ async def index_project(request: Request, project_id: str, push_request: PushReq
         db_client=request.app.db_client
     )
 
+    indexing_run_model = await IndexingRunModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    embedding_model = await EmbeddingModel.create_instance(
+        db_client=request.app.db_client
+    )
+
     project = await project_model.get_project_or_create_one(
         project_id=project_id
     )
@@ -38,52 +64,222 @@ async def index_project(request: Request, project_id: str, push_request: PushReq
             }
         )
 
+    if push_request.do_reset == 1:
+        # ingest workers don't hold the project lock, the reset would drop the vectors they write
+        ingest_job_model = await IngestJobModel.create_instance(
+            db_client=request.app.db_client
+        )
+        if await ingest_job_model.count_active_jobs(job_project_id=project.id) > 0:
+            return JSONResponse(
+                status_code=status.HTTP_409_CONFLICT,
+                content={
+                    "signal": ResponseSignal.INGEST_JOBS_ACTIVE.value
+                }
+            )
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        embedding_client=request.app.embedding_client,
+        generation_client=request.app.generation_client
+    )
+
+    run = await indexing_run_model.create_run(
+        run=IndexingRun(
+            run_project_id=project.id,
+            run_status=IndexingRunStatusEnum.RUNNING.value,
+            run_do_reset=push_request.do_reset
+        )
+    )
+
+    run = await nlp_controller.index_project_chunks(
+        project=project,
+        run=run,
+        chunk_model=chunk_model,
+        indexing_run_model=indexing_run_model,
+        embedding_model=embedding_model
+    )
+
+    # even a failed run may have changed the index, cached answers are dropped
+    _ = await project_model.bump_index_version(project_id=project.id)
+
+    return build_indexing_run_response(run, inserted_item_count=run.run_indexed_count)
+
+
+@nlp_router.post("/index/resume/{project_id}", dependencies=[Depends(admission(PriorityEnum.BULK.value))])
+async def resume_index_project(request: Request, project_id: str):
+    return await run_single_flight(
+        request=request, project_id=project_id, operation=ProjectOperationEnum.RESUME.value,
+        handler=lambda: resume_project_index(request, project_id),
+        params=None
+    )
+
+
+async def resume_project_index(request: Request, project_id: str):
+
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    chunk_model = await ChunkModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    indexing_run_model = await IndexingRunModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    embedding_model = await EmbeddingModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+    )
+
+    run = await indexing_run_model.get_latest_run(run_project_id=project.id)
+
+    if run is None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.INDEXING_RUN_NOT_FOUND.value
+            }
+        )
+
+    if run.run_status == IndexingRunStatusEnum.COMPLETED.value:
+        return JSONResponse(
+            content={
+                "signal": ResponseSignal.INDEXING_RUN_ALREADY_COMPLETED.value,
+                "run_id": str(run.id),
+                "indexed_count": run.run_indexed_count
+            }
+        )
+
     nlp_controller = NLPController(
         vectordb_client=request.app.vectordb_client,
         embedding_client=request.app.embedding_client,
         generation_client=request.app.generation_client
     )
 
-    has_records = True
-    page_no = 1
-    inserted_item_count = 0
-    idx = 0
+    _ = await indexing_run_model.update_status(
+        run_id=run.id, status=IndexingRunStatusEnum.RUNNING.value
+    )
+
+    # failed and interrupted runs continue after their last committed chunk
+    indexed_before = run.run_indexed_count
+    run = await nlp_controller.index_project_chunks(
+        project=project,
+        run=run,
+        chunk_model=chunk_model,
+        indexing_run_model=indexing_run_model,
+        embedding_model=embedding_model
+    )
+
+    _ = await project_model.bump_index_version(project_id=project.id)
 
-    while has_records:
-        page_chunks = await chunk_model.get_project_chunks(
-            project_id=project.id, page_no=page_no
+    return build_indexing_run_response(
+        run, inserted_item_count=run.run_indexed_count - indexed_before
+    )
+
+
+@nlp_router.post("/index/rebuild/{project_id}", dependencies=[Depends(admission(PriorityEnum.BULK.value))])
+async def rebuild_index_project(request: Request, project_id: str):
+    return await run_single_flight(
+        request=request, project_id=project_id, operation=ProjectOperationEnum.REBUILD.value,
+        handler=lambda: rebuild_project_index(request, project_id),
+        params=None
+    )
+
+
+async def rebuild_project_index(request: Request, project_id: str):
+
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    chunk_model = await ChunkModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    embedding_model = await EmbeddingModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+    )
+
+    # the rebuild drops the collection, ingest workers would write into it meanwhile
+    ingest_job_model = await IngestJobModel.create_instance(
+        db_client=request.app.db_client
+    )
+    if await ingest_job_model.count_active_jobs(job_project_id=project.id) > 0:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={
+                "signal": ResponseSignal.INGEST_JOBS_ACTIVE.value
+            }
         )
-        if len(page_chunks):
-            page_no += 1
 
-        if not page_chunks or len(page_chunks) == 0:
-            has_records = False
-            break
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        embedding_client=request.app.embedding_client,
+        generation_client=request.app.generation_client
+    )
+
+    is_rebuilt, rebuilt_count, missing_count = await nlp_controller.rebuild_vector_db_collection(
+        project=project,
+        chunk_model=chunk_model,
+        embedding_model=embedding_model
+    )
+
+    if not is_rebuilt and rebuilt_count == 0 and missing_count > 0:
+        # refused before touching the index: those chunks need a regular push
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.STORED_EMBEDDINGS_MISSING.value,
+                "missing embeddings count": missing_count
+            }
+        )
 
-        chunk_ids = list(range(idx, idx+len(page_chunks)))
-        idx += len(page_chunks)
+    _ = await project_model.bump_index_version(project_id=project.id)
 
-        is_inserted = nlp_controller.index_into_vector_db(
-            project=project,
-            chunks=page_chunks,
-            do_reset=push_request.do_reset,
-            chunk_ids=chunk_ids
+    if not is_rebuilt:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value,
+                "inserted item count": rebuilt_count
+            }
         )
 
-        if not is_inserted:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={
-                    "signal": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value
-                }
-            )
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.INSERT_INTO_VECTORDB_SUCCESS.value,
+            "inserted item count": rebuilt_count,
+            "missing embeddings count": missing_count
+        }
+    )
+
 
-        inserted_item_count += len(page_chunks)
+def build_indexing_run_response(run: IndexingRun, inserted_item_count: int):
+    if run.run_status != IndexingRunStatusEnum.COMPLETED.value:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value,
+                "run_id": str(run.id),
+                "indexed_count": run.run_indexed_count
+            }
+        )
 
     return JSONResponse(
         content={
             "signal": ResponseSignal.INSERT_INTO_VECTORDB_SUCCESS.value,
-            "inserted item count": inserted_item_count
+            "inserted item count": inserted_item_count,
+            "run_id": str(run.id),
+            "indexed_count": run.run_indexed_count
         }
     )
 
@@ -120,12 +316,90 @@ async def info_project(request: Request, project_id: str):
     return JSONResponse(
         content={
             "signal": ResponseSignal.VECTORDB_COLLECTION_RETRIEVED.value,
-            "collection info": collection_info
+            "collection info": collection_info.model_dump(exclude_none=True)
         }
     )
 
 
-@nlp_router.post("/index/search/{project_id}")
+@nlp_router.post("/index/search/federated", dependencies=[Depends(admission(PriorityEnum.INTERACTIVE.value))])
+async def search_projects_federated(
+    request: Request, federated_search_request: FederatedSearchRequest
+):
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    projects = await project_model.get_projects_by_ids(
+        project_ids=federated_search_request.project_ids
+    )
+
+    if len(projects) == 0:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "signal": ResponseSignal.PROJECT_NOT_FOUND_ERROR.value
+            }
+        )
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        embedding_client=request.app.embedding_client,
+        generation_client=request.app.generation_client,
+        query_batcher=request.app.query_batcher,
+        chunk_cache=request.app.chunk_cache
+    )
+
+    chunk_model = await ChunkModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    deadline_ms = federated_search_request.deadline_ms
+    if not deadline_ms:
+        deadline_ms = get_settings().FEDERATED_SEARCH_DEADLINE_MS
+
+    result_fields = nlp_controller.get_result_fields(federated_search_request.fields)
+
+    results, skipped_projects = await nlp_controller.search_vector_db_collections_federated(
+        projects=projects,
+        text=federated_search_request.text,
+        limit=federated_search_request.limit,
+        deadline=deadline_ms / 1000.0,
+        chunk_model=chunk_model,
+        result_fields=result_fields,
+        request_deadline=nlp_controller.get_request_deadline()
+    )
+
+    if results is False:
+        return build_search_error_response(nlp_controller)
+
+    found_project_ids = {project.project_id for project in projects}
+    skipped_projects += [
+        project_id
+        for project_id in federated_search_request.project_ids
+        if project_id not in found_project_ids
+    ]
+
+    response = FederatedSearchResponse.model_construct(
+        signal=ResponseSignal.VECTOR_SEARCH_SUCCESS.value,
+        results=results,
+        skipped_projects=skipped_projects
+    )
+
+    # serialized once, straight from the models
+    return Response(
+        content=response.model_dump_json(
+            include={
+                "signal": True,
+                "skipped_projects": True,
+                "results": {"__all__": result_fields | {"project_id", "normalized_score"}}
+            },
+            exclude_none=True
+        ),
+        media_type="application/json"
+    )
+
+
+@nlp_router.post("/index/search/{project_id}", dependencies=[Depends(admission(PriorityEnum.INTERACTIVE.value))])
 async def search_project(
     request: Request, project_id: str,
     search_request: SearchRequest
@@ -141,26 +415,176 @@ async def search_project(
     nlp_controller = NLPController(
         vectordb_client=request.app.vectordb_client,
         embedding_client=request.app.embedding_client,
-        generation_client=request.app.generation_client
+        generation_client=request.app.generation_client,
+        query_batcher=request.app.query_batcher,
+        chunk_cache=request.app.chunk_cache
+    )
+
+    chunk_model = await ChunkModel.create_instance(
+        db_client=request.app.db_client
     )
 
-    results = nlp_controller.search_vector_db_collection(
+    result_fields = nlp_controller.get_result_fields(search_request.fields)
+
+    results = await nlp_controller.search_vector_db_collection(
         project=project,
         text=search_request.text,
-        limit=search_request.limit
+        limit=search_request.limit,
+        chunk_model=chunk_model,
+        result_fields=result_fields,
+        deadline=nlp_controller.get_request_deadline()
     )
 
     if not results:
+        return build_search_error_response(nlp_controller)
+
+    response = SearchResponse.model_construct(
+        signal=ResponseSignal.VECTOR_SEARCH_SUCCESS.value,
+        results=results
+    )
+
+    # serialized once, straight from the models
+    return Response(
+        content=response.model_dump_json(
+            include={"signal": True, "results": {"__all__": result_fields}},
+            exclude_none=True
+        ),
+        media_type="application/json"
+    )
+
+
+@nlp_router.post("/index/search/batch/{project_id}", dependencies=[Depends(admission(PriorityEnum.INTERACTIVE.value))])
+async def search_project_batch(
+    request: Request, project_id: str,
+    batch_search_request: BatchSearchRequest
+):
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+    )
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        embedding_client=request.app.embedding_client,
+        generation_client=request.app.generation_client,
+        query_batcher=request.app.query_batcher,
+        chunk_cache=request.app.chunk_cache
+    )
+
+    chunk_model = await ChunkModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    result_fields = nlp_controller.get_result_fields(batch_search_request.fields)
+
+    results = await nlp_controller.search_vector_db_collection_batch(
+        project=project,
+        queries=batch_search_request.queries,
+        chunk_model=chunk_model,
+        result_fields=result_fields,
+        deadline=nlp_controller.get_request_deadline()
+    )
+
+    if results is False:
+        return build_search_error_response(nlp_controller)
+
+    response = BatchSearchResponse.model_construct(
+        signal=ResponseSignal.VECTOR_SEARCH_SUCCESS.value,
+        results=results
+    )
+
+    # serialized once, straight from the models
+    return Response(
+        content=response.model_dump_json(
+            include={"signal": True, "results": {"__all__": {"__all__": result_fields}}},
+            exclude_none=True
+        ),
+        media_type="application/json"
+    )
+
+
+@nlp_router.post("/index/answer/{project_id}", dependencies=[Depends(admission(PriorityEnum.INTERACTIVE.value))])
+async def answer_rag(request: Request, project_id: str, answer_request: AnswerRequest):
+
+    project_model = await ProjectModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    project = await project_model.get_project_or_create_one(
+        project_id=project_id
+    )
+
+    nlp_controller = NLPController(
+        vectordb_client=request.app.vectordb_client,
+        embedding_client=request.app.embedding_client,
+        generation_client=request.app.generation_client,
+        query_batcher=request.app.query_batcher,
+        chunk_cache=request.app.chunk_cache,
+        answer_cache=request.app.answer_cache
+    )
+
+    chunk_model = await ChunkModel.create_instance(
+        db_client=request.app.db_client
+    )
+
+    answer, chunk_ids, is_cached = await nlp_controller.answer_rag_question(
+        project=project,
+        query=answer_request.text,
+        limit=answer_request.limit,
+        chunk_model=chunk_model,
+        deadline=nlp_controller.get_request_deadline()
+    )
+
+    if not answer:
+        if nlp_controller.is_embedding_unavailable():
+            return build_search_error_response(nlp_controller)
+
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={
-                "signal": ResponseSignal.VECTOR_SEARCH_ERROR.value
+                "signal": ResponseSignal.RAG_ANSWER_ERROR.value
+            }
+        )
+
+    return JSONResponse(
+        content={
+            "signal": ResponseSignal.RAG_ANSWER_SUCCESS.value,
+            "answer": answer,
+            "chunk_ids": chunk_ids,
+            "cached": is_cached
+        }
+    )
+
+
+@nlp_router.get("/providers/status")
+async def providers_status(request: Request):
+    return JSONResponse(
+        content={
+            "providers": LLMScheduler.get_all_status(),
+            "admission": {
+                name: pool.get_status()
+                for name, pool in request.app.admission_pools.items()
+            }
+        }
+    )
+
+
+def build_search_error_response(nlp_controller: NLPController):
+    # an open circuit means the provider is down, not that the request was wrong
+    if nlp_controller.is_embedding_unavailable():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "signal": ResponseSignal.PROVIDER_UNAVAILABLE.value
             }
         )
 
     return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
         content={
-            "signal": ResponseSignal.VECTOR_SEARCH_SUCCESS.value,
-            "results": results
+            "signal": ResponseSignal.VECTOR_SEARCH_ERROR.value
         }
     )
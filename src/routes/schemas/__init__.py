@@ -1,2 +1,3 @@
-from .data import ProcessRequest
-from .nlp import PushRequest, SearchRequest
+from .data import ProcessRequest, IngestRequest
+from .nlp import PushRequest, SearchRequest, AnswerRequest, SearchQuery, BatchSearchRequest, FederatedSearchRequest
+from .nlp import SearchResponse, BatchSearchResponse, FederatedSearchResponse
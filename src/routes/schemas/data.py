@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from models import SplitterEnum, LengthUnitEnum
 
 
 class ProcessRequest(BaseModel):
@@ -7,3 +8,21 @@ class ProcessRequest(BaseModel):
     chunk_size: Optional[int] = 100
     overlap_size: Optional[int] = 20
     do_reset: Optional[int] = 0
+    splitter: Optional[str] = None
+    length_unit: Optional[str] = None
+
+    def get_unsupported_options(self):
+        # the splitter falls back to its defaults on unknown values, so the routes reject them first
+        options = {
+            "splitter": (self.splitter, SplitterEnum),
+            "length_unit": (self.length_unit, LengthUnitEnum)
+        }
+        return [
+            name for name, (value, enum) in options.items()
+            if value is not None and value not in [member.value for member in enum]
+        ]
+
+
+class IngestRequest(ProcessRequest):
+    # workers embed and index the chunks right away unless this is 0
+    do_index: Optional[int] = 1
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from models import SearchFieldEnum
+from models.db_schemas import RetrievedDocument
 
 
 class PushRequest(BaseModel):
@@ -8,4 +10,45 @@ class PushRequest(BaseModel):
 
 class SearchRequest(BaseModel):
     text: str
-    limit: Optional[int] = 30
+    limit: int = Field(30, gt=0)
+    fields: Optional[List[SearchFieldEnum]] = None
+
+
+class AnswerRequest(BaseModel):
+    text: str
+    limit: int = Field(5, gt=0)
+
+
+class SearchQuery(BaseModel):
+    text: str
+    limit: int = Field(30, gt=0)
+    filter: Optional[dict] = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchQuery] = Field(..., min_length=1)
+    fields: Optional[List[SearchFieldEnum]] = None
+
+
+class FederatedSearchRequest(BaseModel):
+    project_ids: List[str] = Field(..., min_length=1)
+    text: str
+    limit: int = Field(30, gt=0)
+    deadline_ms: Optional[int] = None
+    fields: Optional[List[SearchFieldEnum]] = None
+
+
+class SearchResponse(BaseModel):
+    signal: str
+    results: List[RetrievedDocument]
+
+
+class BatchSearchResponse(BaseModel):
+    signal: str
+    results: List[List[RetrievedDocument]]
+
+
+class FederatedSearchResponse(BaseModel):
+    signal: str
+    results: List[RetrievedDocument]
+    skipped_projects: List[str]
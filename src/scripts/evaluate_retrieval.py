@@ -0,0 +1,318 @@
+# Compares vector index configurations on one or more processed projects.
+# Ground truth is an exact brute-force search over the same embeddings, so recall@k measures
+# what the approximate index loses; MRR@k uses the labelled query set, so projects processed
+# with different chunk sizes can be compared too.
+#
+# Queries file, one JSON object per line:
+#   {"text": "Where was he born?", "answers": ["Funchal"], "relevant_chunk_ids": ["..."]}
+# a hit is relevant when its chunk id is listed or its text contains one of the answers.
+#
+# Configs file, a JSON list of QdrantDBProvider settings (omitted: DEFAULT_CONFIGS):
+#   [{"name": "m16-ef64", "hnsw_m": 16, "search_hnsw_ef": 64}, {"name": "sq8", "quantization": "scalar"}]
+#
+# HNSW and quantization only take effect on a Qdrant server (VECTOR_DB_URL); the embedded
+# database always searches exhaustively.
+# Run from src/ with a configured .env:
+#   python -m scripts.evaluate_retrieval --project-id p500 --project-id p1000 --queries queries.jsonl -k 10
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+from helpers.config import get_settings
+from models.ProjectModel import ProjectModel
+from models.ChunkModel import ChunkModel
+from stores.llm.LLMProviderFactory import LLMProviderFactory
+from stores.llm.LLM_Enums import DocumentTypeEnum
+from stores.vectordb.providers import load_provider
+from stores.vectordb.VectorDBEnums import DistanceMethodEnums
+
+DEFAULT_CONFIGS = [
+    {"name": "exact", "search_exact": True},
+    {"name": "hnsw-default"},
+    {"name": "hnsw-m8-ef32", "hnsw_m": 8, "search_hnsw_ef": 32},
+    {"name": "hnsw-m32-ef128", "hnsw_m": 32, "search_hnsw_ef": 128},
+    {"name": "scalar-int8", "quantization": "scalar"},
+    {"name": "binary", "quantization": "binary"},
+]
+
+EMBEDDING_BATCH_SIZE = 64
+UPSERT_BATCH_SIZE = 500
+
+
+async def load_project_chunks(chunk_model, project, page_size: int = 1000):
+    chunks = []
+    page_no = 1
+    while True:
+        page = await chunk_model.get_project_chunks(
+            project_id=project.id, page_no=page_no, page_size=page_size
+        )
+        if not page:
+            break
+        chunks.extend(page)
+        page_no += 1
+    return chunks
+
+
+def embed_texts(embedding_client, texts: list, document_type: str):
+    vectors = []
+    for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch = embedding_client.embed_batch(
+            texts=texts[i:i + EMBEDDING_BATCH_SIZE], document_type=document_type
+        )
+        if not batch:
+            raise RuntimeError("Embedding failed, check the embedding backend settings")
+        vectors.extend(batch)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def load_chunk_vectors(embedding_client, project_id: str, chunks: list, cache_dir: str):
+    # embedding a project is the slow part, keep it between runs
+    cache_path = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = os.path.join(cache_dir, f"{project_id}.npz")
+
+    chunk_ids = np.asarray([str(chunk.id) for chunk in chunks])
+    if cache_path and os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if np.array_equal(cached["chunk_ids"], chunk_ids):
+            return cached["vectors"]
+
+    vectors = embed_texts(
+        embedding_client, [chunk.chunk_text for chunk in chunks],
+        DocumentTypeEnum.DOCUMENT.value
+    )
+    if cache_path:
+        np.savez(cache_path, chunk_ids=chunk_ids, vectors=vectors)
+    return vectors
+
+
+def brute_force_search(chunk_vectors, query_vectors, k: int, distance_method: str):
+    if distance_method == DistanceMethodEnums.COSINE.value:
+        chunk_vectors = chunk_vectors / np.linalg.norm(chunk_vectors, axis=1, keepdims=True)
+        query_vectors = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    latencies = []
+    top_k = []
+    for query_vector in query_vectors:
+        started_at = time.perf_counter()
+        scores = chunk_vectors @ query_vector
+        k_ = min(k, len(scores))
+        candidates = np.argpartition(-scores, k_ - 1)[:k_]
+        top_k.append(candidates[np.argsort(-scores[candidates])].tolist())
+        latencies.append(time.perf_counter() - started_at)
+
+    return top_k, latencies
+
+
+def is_relevant(query: dict, chunk) -> bool:
+    if str(chunk.id) in query.get("relevant_chunk_ids", []):
+        return True
+    text = chunk.chunk_text.lower()
+    return any(answer.lower() in text for answer in query.get("answers", []))
+
+
+def compute_metrics(results: list, ground_truth: list, latencies: list, queries: list, chunks: list, k: int):
+    recalls = [
+        len(set(result) & set(truth)) / len(truth)
+        for result, truth in zip(results, ground_truth)
+        if truth
+    ]
+
+    reciprocal_ranks = []
+    for query, result in zip(queries, results):
+        if not query.get("answers") and not query.get("relevant_chunk_ids"):
+            continue
+        rank = next(
+            (i + 1 for i, idx in enumerate(result[:k]) if is_relevant(query, chunks[idx])),
+            None
+        )
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        "recall": float(np.mean(recalls)) if recalls else float("nan"),
+        "mrr": float(np.mean(reciprocal_ranks)) if reciprocal_ranks else float("nan"),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def wait_for_index(vectordb_client, collection_name: str, timeout: float = 600.0):
+    started_at = time.monotonic()
+    while time.monotonic() - started_at < timeout:
+        info = vectordb_client.get_collection_info(collection_name=collection_name)
+        if info and info.status == "green":
+            return
+        time.sleep(0.5)
+
+
+def evaluate_config(settings, config: dict, db_path: str, collection_name: str,
+                    chunk_vectors, query_vectors, k: int, warmup: int = 5):
+    provider_config = {key: value for key, value in config.items() if key != "name"}
+    provider_config.setdefault("distance_method", settings.VECTOR_DB_DISTANCE_METHOD)
+
+    QdrantDBProvider = load_provider(settings.VECTOR_DB_BACKEND)
+    vectordb_client = QdrantDBProvider(db_path=db_path, db_url=settings.VECTOR_DB_URL, **provider_config)
+    vectordb_client.connect()
+
+    try:
+        _ = vectordb_client.create_collection(
+            collection_name=collection_name,
+            embedding_size=chunk_vectors.shape[1],
+            do_reset=True
+        )
+        # point id i is row i of chunk_vectors, so hits compare directly with the ground truth
+        for i in range(0, len(chunk_vectors), UPSERT_BATCH_SIZE):
+            batch_vectors = chunk_vectors[i:i + UPSERT_BATCH_SIZE]
+            is_inserted = vectordb_client.upsert_points(
+                collection_name=collection_name,
+                record_ids=list(range(i, i + len(batch_vectors))),
+                vectors=batch_vectors.tolist(),
+                payloads=[{}] * len(batch_vectors)
+            )
+            if not is_inserted:
+                raise RuntimeError(f"Failed to index {collection_name}")
+        wait_for_index(vectordb_client, collection_name)
+
+        query_lists = query_vectors.tolist()
+        for query_vector in query_lists[:warmup]:
+            _ = vectordb_client.search_by_vector(collection_name=collection_name, vector=query_vector, limit=k)
+
+        results = []
+        latencies = []
+        for query_vector in query_lists:
+            started_at = time.perf_counter()
+            hits = vectordb_client.search_by_vector(
+                collection_name=collection_name, vector=query_vector, limit=k
+            )
+            latencies.append(time.perf_counter() - started_at)
+            results.append([int(hit.id) for hit in hits])
+
+        return results, latencies, provider_config["distance_method"]
+    finally:
+        _ = vectordb_client.delete_collection(collection_name=collection_name)
+        vectordb_client.disconnect()
+
+
+def print_table(rows: list, k: int):
+    headers = ["project", "chunks", "config", f"recall@{k}", f"MRR@{k}", "p50 ms", "p99 ms"]
+    lines = [
+        [
+            row["project"], str(row["chunks"]), row["config"],
+            f"{row['recall']:.4f}", f"{row['mrr']:.4f}",
+            f"{row['p50_ms']:.2f}", f"{row['p99_ms']:.2f}"
+        ]
+        for row in rows
+    ]
+    widths = [max(len(header), *(len(line[i]) for line in lines)) for i, header in enumerate(headers)]
+    print("  ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    print("  ".join("-" * width for width in widths))
+    for line in lines:
+        print("  ".join(value.ljust(width) for value, width in zip(line, widths)))
+
+
+async def run(args):
+    settings = get_settings()
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = json.load(f)
+
+    embedding_client = LLMProviderFactory(settings).create(provider=settings.EMBEDDING_BACKEND)
+    embedding_client.set_embedding_model(
+        model_id=settings.EMBEDDING_MODEL_ID,
+        embedding_size=settings.EMBEDDING_MODEL_SIZE
+    )
+
+    query_vectors = embed_texts(
+        embedding_client, [query["text"] for query in queries], DocumentTypeEnum.QUERY.value
+    )
+
+    mongo_conn = AsyncIOMotorClient(settings.MONGODB_URL)
+    db_client = mongo_conn[settings.MONGODB_DATABASE]
+    project_model = await ProjectModel.create_instance(db_client=db_client)
+    chunk_model = await ChunkModel.create_instance(db_client=db_client)
+
+    db_path = tempfile.mkdtemp(prefix="evaluate_retrieval_")
+    rows = []
+    try:
+        for project_id in args.project_id:
+            project = await project_model.get_project_or_create_one(project_id=project_id)
+            chunks = await load_project_chunks(chunk_model, project)
+            if not chunks:
+                print(f"{project_id}: no chunks, run /data/process first")
+                continue
+
+            chunk_vectors = load_chunk_vectors(embedding_client, project_id, chunks, args.embeddings_cache)
+            ground_truths = {}
+
+            for config in configs:
+                results, latencies, distance_method = evaluate_config(
+                    settings, config, db_path,
+                    collection_name=f"evaluate_{project_id}",
+                    chunk_vectors=chunk_vectors, query_vectors=query_vectors, k=args.k
+                )
+
+                if distance_method not in ground_truths:
+                    ground_truths[distance_method] = brute_force_search(
+                        chunk_vectors, query_vectors, args.k, distance_method
+                    )
+                    truth, truth_latencies = ground_truths[distance_method]
+                    rows.append({
+                        "project": project_id, "chunks": len(chunks),
+                        "config": f"brute-force ({distance_method})",
+                        **compute_metrics(truth, truth, truth_latencies, queries, chunks, args.k)
+                    })
+
+                rows.append({
+                    "project": project_id, "chunks": len(chunks), "config": config.get("name", "config"),
+                    **compute_metrics(
+                        results, ground_truths[distance_method][0], latencies, queries, chunks, args.k
+                    )
+                })
+    finally:
+        mongo_conn.close()
+        shutil.rmtree(db_path, ignore_errors=True)
+
+    print_table(rows, args.k)
+
+    if args.min_recall is not None:
+        candidates = [
+            row for row in rows
+            if not row["config"].startswith("brute-force") and row["recall"] >= args.min_recall
+        ]
+        if candidates:
+            best = min(candidates, key=lambda row: row["p99_ms"])
+            print(f"\nfastest configuration with recall@{args.k} >= {args.min_recall}: "
+                  f"{best['config']} on {best['project']} (p99 {best['p99_ms']:.2f} ms)")
+        else:
+            print(f"\nno configuration reaches recall@{args.k} >= {args.min_recall}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project-id", action="append", required=True,
+                        help="repeat to compare projects processed with different chunk sizes")
+    parser.add_argument("--queries", required=True)
+    parser.add_argument("--configs", default=None)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--min-recall", type=float, default=None)
+    parser.add_argument("--embeddings-cache", default=None,
+                        help="directory keeping chunk embeddings between runs")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+# Imports a directory tree of documents into a project without going through the API: files are
+# hashed and copied into the project, parsed and split in a process pool, bulk-written to mongo,
+# then embedded in batches and indexed.
+# Every step picks up where an interrupted run stopped: files already imported (same content hash)
+# are skipped, assets whose chunks were all written are not parsed again, and indexing continues
+# from the project's indexing run checkpoint. Re-run the same command to resume.
+#
+# Run from src/ with a configured .env:
+#   python -m scripts.ingest --project-id p1 --input /data/archive --processes 8
+import argparse
+import asyncio
+import hashlib
+import mimetypes
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from motor.motor_asyncio import AsyncIOMotorClient
+from helpers.config import get_settings
+from helpers.single_flight import SingleFlight, ProjectBusyError, ProjectLeaseLostError
+from controllers import DataController, ProcessController, ProjectController, IngestController, NLPController
+from models import IndexingRunStatusEnum, ProjectOperationEnum, SplitterEnum, LengthUnitEnum
+from models.ProjectModel import ProjectModel
+from models.ChunkModel import ChunkModel
+from models.AssetModel import AssetModel
+from models.EmbeddingModel import EmbeddingModel
+from models.IndexingRunModel import IndexingRunModel
+from models.ProjectLockModel import ProjectLockModel
+from models.db_schemas import Asset, IndexingRun
+from models.enums.AssetTypeEnum import AssetTypeEnum
+from stores.llm.LLMProviderFactory import LLMProviderFactory
+from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
+
+
+def init_pool_process(keep_parsed: bool):
+    # a one-off import would fill the parsed text cache and scan it on every write
+    if not keep_parsed:
+        os.environ["PARSED_TEXT_CACHE_MAX_SIZE"] = "0"
+
+
+def hash_file(path: str):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def parse_asset(project_id: str, file_id: str, asset_id: str, file_hash: str, args: dict):
+    return ProcessController(project_id=project_id).parse_file(
+        file_id=file_id,
+        asset_id=asset_id,
+        file_hash=file_hash,
+        chunk_size=args["chunk_size"],
+        overlap_size=args["overlap_size"],
+        splitter=args["splitter"],
+        length_unit=args["length_unit"]
+    )
+
+
+def collect_files(input_dir: str, data_controller: DataController):
+    files, rejected = [], 0
+    for root, dirs, names in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            is_valid, _ = data_controller.validate_file(
+                content_type=mimetypes.guess_type(path)[0], size=os.path.getsize(path)
+            )
+            if is_valid:
+                files.append(path)
+            else:
+                rejected += 1
+    return files, rejected
+
+
+async def import_files(args, project, asset_model: AssetModel, pool: ProcessPoolExecutor):
+    data_controller = DataController()
+    files, rejected = collect_files(args.input, data_controller)
+    print(f"found {len(files)} files ({rejected} rejected by type or size)")
+
+    loop = asyncio.get_running_loop()
+    hashes = await loop.run_in_executor(None, lambda: list(pool.map(hash_file, files, chunksize=16)))
+
+    existing_hashes = set()
+    for i in range(0, len(hashes), args.batch_size):
+        existing_hashes.update(await asset_model.get_assets_by_hashes(
+            asset_project_id=project.id, asset_hashes=hashes[i:i+args.batch_size]
+        ))
+
+    imported_count = 0
+    new_assets = {}
+    for path, file_hash in zip(files, hashes):
+        if file_hash in existing_hashes or file_hash in new_assets:
+            continue
+
+        file_path, file_id = data_controller.generate_unique_filepath(
+            original_file_name=os.path.basename(path), project_id=project.project_id
+        )
+        tmp_file_path = data_controller.get_tmp_file_path(file_path)
+        shutil.copyfile(path, tmp_file_path)
+        data_controller.store_file_by_hash(
+            tmp_file_path=tmp_file_path, file_hash=file_hash, file_path=file_path
+        )
+        new_assets[file_hash] = Asset(
+            asset_project_id=project.id,
+            asset_type=AssetTypeEnum.FILE.value,
+            asset_name=file_id,
+            asset_size=os.path.getsize(file_path),
+            asset_hash=file_hash
+        )
+
+        if len(new_assets) >= args.batch_size:
+            imported_count += await insert_assets(asset_model, project, list(new_assets.values()))
+            existing_hashes.update(new_assets)
+            new_assets = {}
+        print(f"imported {imported_count + len(new_assets)} new files", end="\r")
+
+    imported_count += await insert_assets(asset_model, project, list(new_assets.values()))
+    print(f"imported {imported_count} new files, {len(files) - imported_count} duplicates or already in the project")
+
+
+async def insert_assets(asset_model: AssetModel, project, assets: list):
+    inserted_assets = await asset_model.insert_many_assets(assets=assets)
+    inserted_ids = {id(asset) for asset in inserted_assets}
+
+    # content uploaded through the api while the import ran
+    project_path = ProjectController().get_project_path(project_id=project.project_id)
+    for asset in assets:
+        if id(asset) not in inserted_ids:
+            os.remove(os.path.join(project_path, asset.asset_name))
+
+    return len(inserted_assets)
+
+
+async def chunk_assets(args, project, asset_model: AssetModel, ingest_controller: IngestController,
+                       pool: ProcessPoolExecutor):
+    assets = await asset_model.get_unprocessed_project_assets(asset_project_id=project.id)
+    asset_ids = [asset.id for asset in assets]
+
+    chunked_asset_ids = await ingest_controller.chunk_model.get_chunked_asset_ids(asset_ids=asset_ids)
+    # chunks of assets an interrupted run was writing when it stopped
+    partial_asset_ids = chunked_asset_ids & await asset_model.get_chunking_asset_ids(asset_ids=asset_ids)
+    # the rest were chunked before completion was recorded on the asset
+    complete_asset_ids = chunked_asset_ids - partial_asset_ids
+    _ = await asset_model.mark_assets_chunked(asset_ids=list(complete_asset_ids))
+    assets = [asset for asset in assets if asset.id not in complete_asset_ids]
+
+    for asset in assets:
+        if asset.id in partial_asset_ids:
+            _ = await ingest_controller.clear_asset(asset=asset)
+
+    print(f"{len(assets)} assets to parse")
+    loop = asyncio.get_running_loop()
+    parse_args = {
+        "chunk_size": args.chunk_size,
+        "overlap_size": args.overlap_size,
+        "splitter": args.splitter,
+        "length_unit": args.length_unit
+    }
+
+    records, assets_metadata = [], {}
+    parsed_count, failed_count, chunks_count = 0, 0, 0
+    pending = set()
+    started_at = time.perf_counter()
+
+    async def flush():
+        nonlocal records, assets_metadata, chunks_count
+        # chunks first, the asset metadata marks them complete
+        _ = await asset_model.mark_assets_chunking(asset_ids=list(assets_metadata))
+        _ = await ingest_controller.chunk_model.insert_chunk_records(records=records, batch_size=args.batch_size)
+        _ = await asset_model.update_assets_metadata(assets_metadata=assets_metadata)
+        chunks_count += len(records)
+        records, assets_metadata = [], {}
+
+    async def parse(asset: Asset):
+        try:
+            return asset, await loop.run_in_executor(
+                pool, parse_asset, project.project_id, asset.asset_name, str(asset.id), asset.asset_hash, parse_args
+            )
+        except Exception as e:
+            print(f"\nerror while parsing {asset.asset_name}: {e}")
+            return asset, None
+
+    assets_iter = iter(assets)
+    while True:
+        # a bounded window of files in flight keeps every process busy without parsing ahead of mongo
+        while len(pending) < args.processes * 2:
+            asset = next(assets_iter, None)
+            if asset is None:
+                break
+            pending.add(asyncio.ensure_future(parse(asset)))
+        if not pending:
+            break
+
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            asset, parsed_file = task.result()
+            if parsed_file is None or len(parsed_file[1]) == 0:
+                failed_count += 1
+                continue
+
+            asset_metadata, chunk_texts, chunks_metadata = parsed_file
+            records.extend(ingest_controller.chunk_model.encode_chunk_batch(
+                chunk_texts=chunk_texts,
+                chunks_metadata=chunks_metadata,
+                chunk_project_id=project.id,
+                chunk_asset_id=asset.id
+            ))
+            assets_metadata[asset.id] = asset_metadata
+            parsed_count += 1
+
+        if len(records) >= args.batch_size:
+            await flush()
+
+        elapsed = time.perf_counter() - started_at
+        print(f"parsed {parsed_count + failed_count}/{len(assets)} assets, {chunks_count + len(records)} chunks "
+              f"({(parsed_count + failed_count) / elapsed:.1f} files/s)", end="\r")
+
+    await flush()
+    print(f"\nparsed {parsed_count} assets into {chunks_count} chunks, {failed_count} unreadable or empty")
+
+
+async def index_chunks(args, project, chunk_model: ChunkModel, embedding_model: EmbeddingModel,
+                       indexing_run_model: IndexingRunModel, nlp_controller: NLPController):
+    run = await indexing_run_model.get_latest_run(run_project_id=project.id)
+
+    if run is not None and run.run_status != IndexingRunStatusEnum.COMPLETED.value:
+        print(f"resuming indexing run {run.id} after {run.run_indexed_count} chunks")
+        _ = await indexing_run_model.update_status(run_id=run.id, status=IndexingRunStatusEnum.RUNNING.value)
+    else:
+        # chunks up to the last completed run are indexed already, new chunks have later ids
+        run = await indexing_run_model.create_run(run=IndexingRun(
+            run_project_id=project.id,
+            run_status=IndexingRunStatusEnum.RUNNING.value,
+            run_last_chunk_id=run.run_last_chunk_id if run is not None else None,
+            run_indexed_count=run.run_indexed_count if run is not None else 0
+        ))
+
+    indexed_before = run.run_indexed_count
+    started_at = time.perf_counter()
+
+    async def report_progress():
+        while True:
+            await asyncio.sleep(2)
+            latest_run = await indexing_run_model.get_latest_run(run_project_id=project.id)
+            indexed_count = latest_run.run_indexed_count - indexed_before
+            print(f"indexed {indexed_count} chunks "
+                  f"({indexed_count / (time.perf_counter() - started_at):.0f} chunks/s)", end="\r")
+
+    progress = asyncio.ensure_future(report_progress())
+    try:
+        run = await nlp_controller.index_project_chunks(
+            project=project,
+            run=run,
+            chunk_model=chunk_model,
+            indexing_run_model=indexing_run_model,
+            embedding_model=embedding_model,
+            page_size=args.index_batch_size
+        )
+    finally:
+        progress.cancel()
+
+    print(f"\nindexed {run.run_indexed_count - indexed_before} chunks, run {run.id} {run.run_status}"
+          + (f": {run.run_error}, re-run to resume" if run.run_error else ""))
+
+
+async def run(args):
+    settings = get_settings()
+    mongo_conn = AsyncIOMotorClient(settings.MONGODB_URL)
+    db_client = mongo_conn[settings.MONGODB_DATABASE]
+
+    embedding_client = LLMProviderFactory(settings).create(provider=settings.EMBEDDING_BACKEND)
+    embedding_client.set_embedding_model(
+        model_id=settings.EMBEDDING_MODEL_ID,
+        embedding_size=settings.EMBEDDING_MODEL_SIZE
+    )
+    vectordb_client = VectorDBProviderFactory(settings).create(provider=settings.VECTOR_DB_BACKEND)
+    vectordb_client.connect()
+
+    nlp_controller = NLPController(
+        vectordb_client=vectordb_client,
+        generation_client=None,
+        embedding_client=embedding_client
+    )
+    if args.embed_batch_size:
+        nlp_controller.document_batch_size = args.embed_batch_size
+
+    pool = ProcessPoolExecutor(
+        max_workers=args.processes, initializer=init_pool_process, initargs=(args.keep_parsed,)
+    )
+
+    try:
+        project_model = await ProjectModel.create_instance(db_client=db_client)
+        asset_model = await AssetModel.create_instance(db_client=db_client)
+        chunk_model = await ChunkModel.create_instance(db_client=db_client)
+        embedding_model = await EmbeddingModel.create_instance(db_client=db_client)
+        indexing_run_model = await IndexingRunModel.create_instance(db_client=db_client)
+
+        project = await project_model.get_project_or_create_one(project_id=args.project_id)
+        ingest_controller = IngestController(
+            project=project,
+            asset_model=asset_model,
+            chunk_model=chunk_model,
+            embedding_model=embedding_model,
+            nlp_controller=nlp_controller
+        )
+
+        async def ingest():
+            await import_files(args, project, asset_model, pool)
+            await chunk_assets(args, project, asset_model, ingest_controller, pool)
+            if not args.no_index:
+                await index_chunks(args, project, chunk_model, embedding_model, indexing_run_model, nlp_controller)
+                # running servers drop answers they cached for the project
+                _ = await project_model.bump_index_version(project_id=project.id)
+
+        # holds the project lock the servers use, so no process/push of the project runs next to the import
+        single_flight = SingleFlight(
+            lock_model=await ProjectLockModel.create_instance(db_client=db_client),
+            lease_seconds=settings.SINGLE_FLIGHT_LEASE_SECONDS,
+            heartbeat_seconds=settings.SINGLE_FLIGHT_HEARTBEAT_SECONDS,
+            wait_timeout_ms=settings.SINGLE_FLIGHT_WAIT_TIMEOUT_MS,
+            poll_interval_ms=settings.SINGLE_FLIGHT_POLL_INTERVAL_MS
+        )
+
+        started_at = time.perf_counter()
+        try:
+            await single_flight.run(
+                project_id=args.project_id, operation=ProjectOperationEnum.INGEST.value,
+                func=ingest, params={"run": single_flight.owner}
+            )
+        except ProjectBusyError as e:
+            print(f"{e}, try again later")
+            return
+        except ProjectLeaseLostError as e:
+            print(f"{e}, run the same command again to resume")
+            return
+        print(f"done in {time.perf_counter() - started_at:.1f}s")
+    finally:
+        pool.shutdown()
+        vectordb_client.disconnect()
+        mongo_conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project-id", required=True)
+    parser.add_argument("--input", required=True, help="directory to import, walked recursively")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--overlap-size", type=int, default=20)
+    parser.add_argument("--splitter", default=None, choices=[splitter.value for splitter in SplitterEnum])
+    parser.add_argument("--length-unit", default=None, choices=[unit.value for unit in LengthUnitEnum])
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="assets and chunks per mongo bulk write")
+    parser.add_argument("--index-batch-size", type=int, default=500,
+                        help="chunks per indexing checkpoint")
+    parser.add_argument("--embed-batch-size", type=int, default=None,
+                        help="chunks per embedding call, defaults to EMBEDDING_DOCUMENT_BATCH_SIZE")
+    parser.add_argument("--keep-parsed", action="store_true",
+                        help="fill the parsed text cache, so later re-chunking skips parsing")
+    parser.add_argument("--no-index", action="store_true", help="stop after writing the chunks")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input):
+        raise SystemExit(f"{args.input} is not a directory")
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# Moves vectors between the two tenancy layouts without re-embedding anything.
+#   --to shared:      every collection_<project_id> is copied into the shared collection,
+#                     tagged with its project_id
+#   --to collection:  the shared collection is split back into one collection per project
+# Set VECTOR_DB_TENANCY_MODE to the target mode once the migration finished.
+# Run from src/ with a configured .env:  python -m scripts.migrate_tenancy --to shared
+import argparse
+import uuid
+from helpers.config import get_settings
+from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
+from stores.vectordb.VectorDBEnums import TenancyModeEnums
+
+COLLECTION_PREFIX = "collection_"
+
+
+def get_shared_record_id(project_id: str, record_id):
+    # uuid ids are derived from chunk ids and already unique, int ids restart in every project
+    if isinstance(record_id, int):
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{project_id}:{record_id}"))
+    return record_id
+
+
+def copy_points(vectordb_client, source: str, target: str, batch_size: int, filter: dict = None, project_id: str = None):
+    copied = 0
+    for points in vectordb_client.scroll(
+        collection_name=source, batch_size=batch_size, filter=filter
+    ):
+        payloads = [dict(point.payload or {}) for point in points]
+        if project_id is None:
+            record_ids = [point.id for point in points]
+            for payload in payloads:
+                payload.pop("project_id", None)
+        else:
+            record_ids = [get_shared_record_id(project_id, point.id) for point in points]
+            for payload in payloads:
+                payload["project_id"] = project_id
+
+        is_upserted = vectordb_client.upsert_points(
+            collection_name=target,
+            record_ids=record_ids,
+            vectors=[point.vector for point in points],
+            payloads=payloads
+        )
+        if not is_upserted:
+            raise RuntimeError(f"Failed to copy points from {source} into {target}")
+        copied += len(points)
+    return copied
+
+
+def migrate_to_shared(vectordb_client, settings, batch_size: int, delete_source: bool):
+    shared_name = settings.VECTOR_DB_SHARED_COLLECTION_NAME
+    _ = vectordb_client.create_collection(
+        collection_name=shared_name,
+        embedding_size=settings.EMBEDDING_MODEL_SIZE,
+        tenant_field="project_id"
+    )
+
+    for collection in vectordb_client.list_all_connection().collections:
+        collection_name = collection.name
+        if collection_name == shared_name or not collection_name.startswith(COLLECTION_PREFIX):
+            continue
+
+        project_id = collection_name[len(COLLECTION_PREFIX):]
+        copied = copy_points(
+            vectordb_client, source=collection_name, target=shared_name,
+            batch_size=batch_size, project_id=project_id
+        )
+        print(f"{collection_name}: {copied} points -> {shared_name}")
+
+        if delete_source:
+            _ = vectordb_client.delete_collection(collection_name=collection_name)
+
+
+def migrate_to_collection(vectordb_client, settings, batch_size: int, delete_source: bool):
+    shared_name = settings.VECTOR_DB_SHARED_COLLECTION_NAME
+    if not vectordb_client.is_collection_existed(collection_name=shared_name):
+        print(f"{shared_name} does not exist, nothing to migrate")
+        return
+
+    project_ids = set()
+    for points in vectordb_client.scroll(
+        collection_name=shared_name, batch_size=batch_size, with_vectors=False
+    ):
+        project_ids.update(
+            point.payload["project_id"] for point in points
+            if point.payload and point.payload.get("project_id")
+        )
+
+    for project_id in sorted(project_ids):
+        collection_name = f"{COLLECTION_PREFIX}{project_id}"
+        _ = vectordb_client.create_collection(
+            collection_name=collection_name,
+            embedding_size=settings.EMBEDDING_MODEL_SIZE
+        )
+        copied = copy_points(
+            vectordb_client, source=shared_name, target=collection_name,
+            batch_size=batch_size, filter={"project_id": project_id}
+        )
+        print(f"{shared_name}: {copied} points -> {collection_name}")
+
+    if delete_source:
+        _ = vectordb_client.delete_collection(collection_name=shared_name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--to", required=True, choices=[e.value for e in TenancyModeEnums])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--delete-source", action="store_true")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    vectordb_client = VectorDBProviderFactory(settings).create(
+        provider=settings.VECTOR_DB_BACKEND
+    )
+    vectordb_client.connect()
+
+    try:
+        if args.to == TenancyModeEnums.SHARED.value:
+            migrate_to_shared(vectordb_client, settings, args.batch_size, args.delete_source)
+        else:
+            migrate_to_collection(vectordb_client, settings, args.batch_size, args.delete_source)
+    finally:
+        vectordb_client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
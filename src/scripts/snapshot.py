@@ -0,0 +1,484 @@
+# Exports a project (assets, chunks and their vectors) into a columnar snapshot directory and
+# imports it into any environment without parsing or embedding anything again.
+#
+#   manifest.json            format version, embedding model, vector dtype/size, counts
+#   assets.json              asset records (chunks point at them by position)
+#   chunk_asset_index.npy    int32, asset position of every chunk
+#   chunk_order.npy          int32
+#   chunk_text.bin           utf-8 texts back to back, sliced by chunk_text_offsets.npy (int64, n + 1)
+#   chunk_metadata.bin       json metadata back to back, sliced by chunk_metadata_offsets.npy
+#   chunk_has_vector.npy     bool, chunks pushed before embeddings were stored have no vector
+#   chunk_canonical_index.npy  int32, position of the canonical chunk of a near-duplicate, -1 otherwise
+#   chunk_lsh_bands.bin      int64 band keys back to back, sliced by chunk_lsh_bands_offsets.npy,
+#                            empty for chunks that never went through the dedup check
+#   vectors.npy              (n, size) float32/float16, memory-mapped on both ends
+#   files/                   the uploaded files, with --with-files
+#
+# Run from src/ with a configured .env:
+#   python -m scripts.snapshot export --project-id p1 --output snapshots/p1 --with-files
+#   python -m scripts.snapshot import --input snapshots/p1 --project-id p1copy
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+import numpy as np
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne
+from helpers.config import get_settings
+from helpers.single_flight import SingleFlight, ProjectBusyError, ProjectLeaseLostError
+from controllers import NLPController, ProjectController
+from models.ProjectModel import ProjectModel
+from models.ChunkModel import ChunkModel
+from models.AssetModel import AssetModel
+from models.EmbeddingModel import EmbeddingModel
+from models.ProjectLockModel import ProjectLockModel
+from models.db_schemas import DataChunk, ChunkEmbedding
+from models.enums.DataBaseEnum import DataBaseEnum
+from models.enums.ProjectOperationEnum import ProjectOperationEnum
+from stores.llm.LLMProviderFactory import LLMProviderFactory
+from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
+
+FORMAT_VERSION = 1
+
+
+class SnapshotImportError(Exception):
+    pass
+
+
+def create_nlp_controller(settings, vectordb_client=None):
+    # the embedding client only supplies the model id and vector size, it is never called
+    embedding_client = LLMProviderFactory(settings).create(provider=settings.EMBEDDING_BACKEND)
+    embedding_client.set_embedding_model(
+        model_id=settings.EMBEDDING_MODEL_ID,
+        embedding_size=settings.EMBEDDING_MODEL_SIZE
+    )
+    return NLPController(
+        vectordb_client=vectordb_client,
+        generation_client=None,
+        embedding_client=embedding_client
+    )
+
+
+class OffsetColumnWriter:
+
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+        self.offsets = [0]
+
+    def append(self, value: bytes):
+        self.file.write(value)
+        self.offsets.append(self.offsets[-1] + len(value))
+
+    def close(self, offsets_path: str):
+        self.file.close()
+        np.save(offsets_path, np.asarray(self.offsets, dtype=np.int64))
+
+
+class OffsetColumnReader:
+
+    def __init__(self, path: str, offsets_path: str):
+        self.data = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else b""
+        self.offsets = np.load(offsets_path)
+
+    def get(self, i: int) -> bytes:
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]])
+
+
+async def export_project(args, settings, db_client):
+    project_model = await ProjectModel.create_instance(db_client=db_client)
+    chunk_model = await ChunkModel.create_instance(db_client=db_client)
+    embedding_model = await EmbeddingModel.create_instance(db_client=db_client)
+    nlp_controller = create_nlp_controller(settings)
+    model_id = nlp_controller.get_embedding_model_id()
+    vector_dtype = np.dtype(args.dtype or settings.EMBEDDING_STORE_DTYPE)
+    vector_size = settings.EMBEDDING_MODEL_SIZE
+
+    project = await project_model.get_project_or_create_one(project_id=args.project_id)
+    os.makedirs(args.output, exist_ok=True)
+
+    assets = await db_client[DataBaseEnum.COLLECTION_ASSET_NAME.value].find(
+        {"asset_project_id": project.id}
+    ).sort("_id", 1).to_list(length=None)
+    asset_positions = {asset["_id"]: i for i, asset in enumerate(assets)}
+
+    with open(os.path.join(args.output, "assets.json"), "w", encoding="utf-8") as f:
+        json.dump([
+            {
+                key: value.isoformat() if isinstance(value, datetime) else value
+                for key, value in asset.items()
+                if key not in ("_id", "asset_project_id")
+            }
+            for asset in assets
+        ], f, default=str)
+
+    if args.with_files:
+        project_path = ProjectController().get_project_path(project_id=project.project_id)
+        files_dir = os.path.join(args.output, "files")
+        os.makedirs(files_dir, exist_ok=True)
+        for asset in assets:
+            file_path = os.path.join(project_path, asset["asset_name"])
+            if os.path.exists(file_path):
+                shutil.copyfile(file_path, os.path.join(files_dir, asset["asset_name"]))
+
+    # the count is an upper bound, chunks are read in _id order and the tail trimmed below
+    chunk_capacity = await chunk_model.collection.count_documents({"chunk_project_id": project.id})
+    vectors = np.lib.format.open_memmap(
+        os.path.join(args.output, "vectors.npy"), mode="w+",
+        dtype=vector_dtype, shape=(chunk_capacity, vector_size)
+    )
+    asset_indexes = np.zeros(chunk_capacity, dtype=np.int32)
+    orders = np.zeros(chunk_capacity, dtype=np.int32)
+    has_vector = np.zeros(chunk_capacity, dtype=bool)
+    canonical_indexes = np.full(chunk_capacity, -1, dtype=np.int32)
+    texts = OffsetColumnWriter(os.path.join(args.output, "chunk_text.bin"))
+    metadata = OffsetColumnWriter(os.path.join(args.output, "chunk_metadata.bin"))
+    lsh_bands = OffsetColumnWriter(os.path.join(args.output, "chunk_lsh_bands.bin"))
+    # canonical chunks come before their duplicates in _id order, so their position is known already
+    chunk_positions = {}
+
+    count = 0
+    last_chunk_id = None
+    while count < chunk_capacity:
+        query = {"chunk_project_id": project.id}
+        if last_chunk_id is not None:
+            query["_id"] = {"$gt": last_chunk_id}
+        records = await chunk_model.collection.find(query).sort("_id", 1).limit(
+            min(args.batch_size, chunk_capacity - count)
+        ).to_list(length=None)
+        if not records:
+            break
+
+        stored_vectors = await embedding_model.get_embedding_arrays_by_chunk_ids(
+            chunk_ids=[record["_id"] for record in records], model_id=model_id
+        )
+
+        for record in records:
+            asset_indexes[count] = asset_positions.get(record["chunk_asset_id"], -1)
+            orders[count] = record["chunk_order"]
+            texts.append(chunk_model.decode_text(record["chunk_text"]).encode("utf-8"))
+            metadata.append(json.dumps(
+                record.get("chunk_metadata") or {}, separators=(",", ":"), default=str
+            ).encode("utf-8"))
+            lsh_bands.append(np.asarray(record.get("chunk_lsh_bands") or [], dtype="<i8").tobytes())
+            canonical_indexes[count] = chunk_positions.get(record.get("chunk_canonical_id"), -1)
+            chunk_positions[record["_id"]] = count
+
+            vector = stored_vectors.get(record["_id"])
+            if vector is not None:
+                vectors[count] = vector
+                has_vector[count] = True
+            count += 1
+
+        last_chunk_id = records[-1]["_id"]
+        print(f"exported {count}/{chunk_capacity} chunks", end="\r")
+
+    vectors.flush()
+    del vectors
+    if count < chunk_capacity:
+        # chunks deleted while exporting: rewrite the vectors file without the empty tail
+        trimmed = np.load(os.path.join(args.output, "vectors.npy"), mmap_mode="r")[:count]
+        np.save(os.path.join(args.output, "vectors.trimmed.npy"), trimmed)
+        del trimmed
+        os.replace(
+            os.path.join(args.output, "vectors.trimmed.npy"),
+            os.path.join(args.output, "vectors.npy")
+        )
+
+    np.save(os.path.join(args.output, "chunk_asset_index.npy"), asset_indexes[:count])
+    np.save(os.path.join(args.output, "chunk_order.npy"), orders[:count])
+    np.save(os.path.join(args.output, "chunk_has_vector.npy"), has_vector[:count])
+    np.save(os.path.join(args.output, "chunk_canonical_index.npy"), canonical_indexes[:count])
+    texts.close(os.path.join(args.output, "chunk_text_offsets.npy"))
+    metadata.close(os.path.join(args.output, "chunk_metadata_offsets.npy"))
+    lsh_bands.close(os.path.join(args.output, "chunk_lsh_bands_offsets.npy"))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "project_id": project.project_id,
+        "embedding_model_id": model_id,
+        "vector_dtype": vector_dtype.name,
+        "vector_size": vector_size,
+        "chunk_count": count,
+        "vector_count": int(has_vector[:count].sum()),
+        "asset_count": len(assets),
+        "with_files": bool(args.with_files),
+        "exported_at": datetime.utcnow().isoformat()
+    }
+    with open(os.path.join(args.output, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"\nexported {count} chunks ({manifest['vector_count']} with vectors) "
+          f"and {len(assets)} assets to {args.output}")
+
+
+async def import_project(args, settings, db_client):
+    with open(os.path.join(args.input, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise SystemExit(f"unsupported snapshot format {manifest['format_version']}")
+
+    vectordb_client = VectorDBProviderFactory(settings).create(provider=settings.VECTOR_DB_BACKEND)
+    vectordb_client.connect()
+    nlp_controller = create_nlp_controller(settings, vectordb_client=vectordb_client)
+    model_id = nlp_controller.get_embedding_model_id()
+
+    # vectors of another model live in another space than the queries embedded here
+    if manifest["embedding_model_id"] != model_id or manifest["vector_size"] != settings.EMBEDDING_MODEL_SIZE:
+        if not args.force:
+            raise SystemExit(
+                f"snapshot vectors come from {manifest['embedding_model_id']} "
+                f"({manifest['vector_size']}d), this environment embeds with {model_id} "
+                f"({settings.EMBEDDING_MODEL_SIZE}d); pass --force to import the chunks anyway"
+            )
+        index_vectors = False
+    else:
+        index_vectors = True
+
+    project_model = await ProjectModel.create_instance(db_client=db_client)
+    chunk_model = await ChunkModel.create_instance(db_client=db_client)
+    asset_model = await AssetModel.create_instance(db_client=db_client)
+    embedding_model = await EmbeddingModel.create_instance(db_client=db_client)
+
+    project_id = args.project_id or manifest["project_id"]
+
+    async def import_snapshot():
+        project = await project_model.get_project_or_create_one(project_id=project_id)
+
+        if await chunk_model.collection.count_documents({"chunk_project_id": project.id}, limit=1):
+            raise SnapshotImportError(f"project {project_id} already has chunks, import into an empty project")
+
+        started_at = time.perf_counter()
+
+        # fresh ids, so a snapshot can be imported next to the project it came from
+        with open(os.path.join(args.input, "assets.json"), encoding="utf-8") as f:
+            assets = json.load(f)
+        asset_ids = [ObjectId() for _ in assets]
+        asset_metadata = [asset.get("asset_metadata") or {} for asset in assets]
+        if assets:
+            _ = await asset_model.collection.insert_many([
+                {
+                    **asset,
+                    "_id": asset_id,
+                    "asset_project_id": project.id,
+                    "asset_pushed_at": datetime.fromisoformat(asset["asset_pushed_at"])
+                    if isinstance(asset.get("asset_pushed_at"), str) else datetime.utcnow(),
+                    **({"asset_chunked_at": datetime.fromisoformat(asset["asset_chunked_at"])}
+                       if isinstance(asset.get("asset_chunked_at"), str) else {})
+                }
+                for asset, asset_id in zip(assets, asset_ids)
+            ], ordered=False)
+
+        files_dir = os.path.join(args.input, "files")
+        if manifest.get("with_files") and os.path.isdir(files_dir):
+            project_path = ProjectController().get_project_path(project_id=project.project_id)
+            for file_name in os.listdir(files_dir):
+                shutil.copyfile(os.path.join(files_dir, file_name), os.path.join(project_path, file_name))
+
+        count = manifest["chunk_count"]
+        vectors = np.load(os.path.join(args.input, "vectors.npy"), mmap_mode="r")
+        asset_indexes = np.load(os.path.join(args.input, "chunk_asset_index.npy"))
+        orders = np.load(os.path.join(args.input, "chunk_order.npy"))
+        has_vector = np.load(os.path.join(args.input, "chunk_has_vector.npy"))
+        texts = OffsetColumnReader(
+            os.path.join(args.input, "chunk_text.bin"), os.path.join(args.input, "chunk_text_offsets.npy")
+        )
+        metadata = OffsetColumnReader(
+            os.path.join(args.input, "chunk_metadata.bin"), os.path.join(args.input, "chunk_metadata_offsets.npy")
+        )
+        # snapshots written before the dedup columns existed import without dedup state
+        if os.path.exists(os.path.join(args.input, "chunk_canonical_index.npy")):
+            canonical_indexes = np.load(os.path.join(args.input, "chunk_canonical_index.npy"))
+            lsh_bands = OffsetColumnReader(
+                os.path.join(args.input, "chunk_lsh_bands.bin"), os.path.join(args.input, "chunk_lsh_bands_offsets.npy")
+            )
+        else:
+            canonical_indexes = np.full(count, -1, dtype=np.int32)
+            lsh_bands = None
+        # generated up front and in order, duplicates point at the new id of an earlier chunk
+        chunk_ids = [ObjectId() for _ in range(count)]
+
+        # chunks whose asset was deleted while exporting have nothing to belong to here
+        skipped = asset_indexes[:count] < 0
+        skipped_count = int(skipped.sum())
+        if skipped_count:
+            print(f"warning: skipping {skipped_count} chunks whose asset is not in the snapshot")
+        # duplicates of a skipped chunk become regular chunks, as when a canonical chunk is deleted
+        detached = (canonical_indexes[:count] >= 0) & skipped[np.maximum(canonical_indexes[:count], 0)]
+        canonical_indexes[:count][detached] = -1
+
+        if index_vectors:
+            _ = nlp_controller.reset_vector_db_collection(project=project)
+
+        indexed_count = 0
+        written_count = 0
+        try:
+            for start in range(0, count, args.batch_size):
+                end = min(start + args.batch_size, count)
+                written_count = end
+
+                positions = start + np.flatnonzero(~skipped[start:end])
+                if len(positions) == 0:
+                    continue
+
+                chunks = []
+                for i in positions:
+                    asset_index = int(asset_indexes[i])
+                    chunk_metadata = json.loads(metadata.get(i))
+                    canonical_index = int(canonical_indexes[i])
+                    bands = np.frombuffer(lsh_bands.get(i), dtype="<i8").tolist() \
+                        if lsh_bands is not None and not detached[i] else []
+                    chunks.append(DataChunk.model_construct(
+                        id=chunk_ids[i],
+                        chunk_text=texts.get(i).decode("utf-8"),
+                        chunk_metadata=chunk_metadata,
+                        chunk_order=int(orders[i]),
+                        chunk_project_id=project.id,
+                        chunk_asset_id=asset_ids[asset_index],
+                        chunk_canonical_id=chunk_ids[canonical_index] if canonical_index >= 0 else None,
+                        chunk_lsh_bands=bands or None
+                    ))
+
+                _ = await chunk_model.collection.bulk_write([
+                    InsertOne(chunk_model.encode_record({
+                        "_id": chunk.id,
+                        "chunk_text": chunk.chunk_text,
+                        "chunk_metadata": chunk.chunk_metadata,
+                        "chunk_order": chunk.chunk_order,
+                        "chunk_project_id": chunk.chunk_project_id,
+                        "chunk_asset_id": chunk.chunk_asset_id,
+                        **({"chunk_lsh_bands": chunk.chunk_lsh_bands} if chunk.chunk_lsh_bands else {}),
+                        **({"chunk_canonical_id": chunk.chunk_canonical_id} if chunk.chunk_canonical_id else {})
+                    }))
+                    for chunk in chunks
+                ], ordered=False)
+
+                batch_has_vector = has_vector[positions]
+                if index_vectors and batch_has_vector.any():
+                    batch_vectors = vectors[positions]
+                    rows = np.flatnonzero(batch_has_vector)
+
+                    _ = await embedding_model.collection.bulk_write([
+                        InsertOne(ChunkEmbedding(
+                            embedding_chunk_id=chunks[row].id,
+                            embedding_project_id=project.id,
+                            embedding_model_id=model_id,
+                            embedding_dtype=manifest["vector_dtype"],
+                            embedding_vector=np.ascontiguousarray(
+                                batch_vectors[row], dtype=np.dtype(manifest["vector_dtype"]).newbyteorder("<")
+                            ).tobytes()
+                        ).model_dump(by_alias=True, exclude={"id"}))
+                        for row in rows
+                    ], ordered=False)
+
+                    # payloads carry the full metadata, as a regular push would write them
+                    for row in rows:
+                        asset_index = int(asset_indexes[positions[row]])
+                        if asset_metadata[asset_index]:
+                            chunks[row].chunk_metadata = {**asset_metadata[asset_index], **chunks[row].chunk_metadata}
+
+                    is_inserted = nlp_controller.insert_into_vector_db(
+                        project=project,
+                        chunks=[chunks[row] for row in rows],
+                        vectors=batch_vectors[rows].astype(np.float32).tolist()
+                    )
+                    if not is_inserted:
+                        raise SnapshotImportError(
+                            f"vector store rejected chunks {start}-{end}; the partial import was removed, "
+                            f"re-run it after fixing the vector store"
+                        )
+                    indexed_count += len(rows)
+
+                print(f"imported {end}/{count} chunks", end="\r")
+        except BaseException:
+            # leave the project as empty as it was, so the import can simply be run again; only what
+            # this import wrote is removed, after a lost lease another operation may run on the project
+            print("\nimport failed, removing the partially imported data")
+            for start in range(0, written_count, args.batch_size):
+                batch_chunk_ids = chunk_ids[start:start + args.batch_size]
+                _ = await chunk_model.collection.delete_many({"_id": {"$in": batch_chunk_ids}})
+                _ = await embedding_model.delete_embeddings_by_chunk_ids(chunk_ids=batch_chunk_ids)
+                if index_vectors:
+                    _ = nlp_controller.delete_vector_db_chunks(project=project, chunk_ids=batch_chunk_ids)
+            _ = await asset_model.collection.delete_many({"_id": {"$in": asset_ids}})
+            raise
+
+        # running servers drop answers they cached for the project
+        _ = await project_model.bump_index_version(project_id=project.id)
+
+        elapsed = time.perf_counter() - started_at
+        # near-duplicates share the point of their canonical chunk and never get a vector of their own
+        duplicate_count = int(((canonical_indexes[:count] >= 0) & ~skipped).sum())
+        imported_count = count - skipped_count
+        print(f"\nimported {imported_count} chunks ({indexed_count} indexed, {duplicate_count} near-duplicates) "
+              f"and {len(assets)} assets into {project.project_id} in {elapsed:.1f}s")
+        if indexed_count + duplicate_count < imported_count:
+            print(f"{imported_count - indexed_count - duplicate_count} chunks have no vector, "
+                  f"push the project to embed them")
+
+    # holds the project lock the servers use, so no process/push of the project runs next to the import
+    single_flight = SingleFlight(
+        lock_model=await ProjectLockModel.create_instance(db_client=db_client),
+        lease_seconds=settings.SINGLE_FLIGHT_LEASE_SECONDS,
+        heartbeat_seconds=settings.SINGLE_FLIGHT_HEARTBEAT_SECONDS,
+        wait_timeout_ms=settings.SINGLE_FLIGHT_WAIT_TIMEOUT_MS,
+        poll_interval_ms=settings.SINGLE_FLIGHT_POLL_INTERVAL_MS
+    )
+
+    try:
+        await single_flight.run(
+            project_id=project_id, operation=ProjectOperationEnum.IMPORT.value,
+            func=import_snapshot, params={"run": single_flight.owner}
+        )
+    except SnapshotImportError as e:
+        raise SystemExit(str(e))
+    except ProjectBusyError as e:
+        raise SystemExit(f"{e}, try again later")
+    except ProjectLeaseLostError as e:
+        raise SystemExit(f"{e}, the partial import was removed, run the same command again")
+    finally:
+        vectordb_client.disconnect()
+
+
+async def run(args):
+    settings = get_settings()
+    mongo_conn = AsyncIOMotorClient(settings.MONGODB_URL)
+    db_client = mongo_conn[settings.MONGODB_DATABASE]
+
+    try:
+        if args.command == "export":
+            await export_project(args, settings, db_client)
+        else:
+            await import_project(args, settings, db_client)
+    finally:
+        mongo_conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("--project-id", required=True)
+    export_parser.add_argument("--output", required=True)
+    export_parser.add_argument("--dtype", choices=["float32", "float16"], default=None)
+    export_parser.add_argument("--with-files", action="store_true")
+    export_parser.add_argument("--batch-size", type=int, default=5000)
+
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("--input", required=True)
+    import_parser.add_argument("--project-id", default=None,
+                               help="target project, defaults to the exported one")
+    import_parser.add_argument("--force", action="store_true",
+                               help="import chunks even if the vectors come from another model")
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
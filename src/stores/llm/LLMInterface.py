@@ -24,7 +24,18 @@ class LLMInterface(ABC):
     def embed_text(
             self,
             text: str,
-            document_type: str = None):
+            document_type: str = None,
+            deadline: float = None,
+            priority: str = None):
+        pass
+
+    @abstractmethod
+    def embed_batch(
+            self,
+            texts: list,
+            document_type: str = None,
+            deadline: float = None,
+            priority: str = None):
         pass
 
     @abstractmethod
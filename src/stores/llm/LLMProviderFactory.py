@@ -1,27 +1,47 @@
 from .LLM_Enums import LLMEnums
-from .providers import OpenAIProvider, CoHereProvider
+from .LLMScheduler import LLMScheduler
+from .providers import load_provider
 
 
 class LLMProviderFactory:
     def __init__(self, config: dict):
         self.config = config
 
+    def get_scheduler(self, provider: str):
+        return LLMScheduler.for_provider(
+            provider,
+            requests_per_minute=self.config.LLM_SCHEDULER_REQUESTS_PER_MINUTE,
+            tokens_per_minute=self.config.LLM_SCHEDULER_TOKENS_PER_MINUTE,
+            max_concurrency=self.config.LLM_SCHEDULER_MAX_CONCURRENCY,
+            max_retries=self.config.LLM_SCHEDULER_MAX_RETRIES,
+            latency_target=self.config.LLM_SCHEDULER_LATENCY_TARGET,
+            circuit_failure_threshold=self.config.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            circuit_reset_timeout=self.config.LLM_CIRCUIT_RESET_TIMEOUT,
+            interactive_reserve=self.config.LLM_SCHEDULER_INTERACTIVE_RESERVE
+        )
+
     def create(self, provider: str):
         if provider == LLMEnums.OPENAI.value:
+            OpenAIProvider = load_provider(provider)
             return OpenAIProvider(
                 api_key=self.config.OPENAI_API_KEY,
                 api_url=self.config.OPENAI_API_URL,
                 default_input_max_characters=self.config.INPUT_DEFAULT_MAX_CHARACTERS,
                 default_generation_max_characters=self.config.GENERATION_DEFAULT_MAX_TOKENS,
                 default_generation_temperature=self.config.GENERATION_DEFAULT_TEMPERATURE,
+                request_timeout=self.config.LLM_REQUEST_TIMEOUT,
+                scheduler=self.get_scheduler(provider)
             )
 
         if provider == LLMEnums.COHERE.value:
+            CoHereProvider = load_provider(provider)
             return CoHereProvider(
                 api_key=self.config.COHERE_API_KEY,
                 default_input_max_characters=self.config.INPUT_DEFAULT_MAX_CHARACTERS,
                 default_generation_max_characters=self.config.GENERATION_DEFAULT_MAX_TOKENS,
                 default_generation_temperature=self.config.GENERATION_DEFAULT_TEMPERATURE,
+                request_timeout=self.config.LLM_REQUEST_TIMEOUT,
+                scheduler=self.get_scheduler(provider)
             )
 
         return None
@@ -0,0 +1,410 @@
+from models.enums.PriorityEnum import PriorityEnum
+import logging
+import math
+import random
+import threading
+import time
+
+
+class DeadlineExceededError(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+
+    def __init__(self, rate_per_minute: int = None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(rate_per_minute) if rate_per_minute else None
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.capacity / 60.0
+        )
+        self.updated_at = now
+
+    def reserve(self, amount: float = 1):
+        # returns how long the caller has to wait before its reservation is covered
+        if not self.capacity:
+            return 0.0
+
+        with self.lock:
+            self.refill()
+
+            # a single request larger than the whole bucket still has to go through
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+
+            return -self.tokens / (self.capacity / 60.0)
+
+    def try_reserve(self, amount: float = 1, reserve_ratio: float = 0.0):
+        # takes amount only when it is available above the reserved share, checked and taken
+        # under one lock; otherwise nothing is taken and the wait until it would be is returned
+        if not self.capacity:
+            return 0.0
+
+        with self.lock:
+            self.refill()
+            amount = min(amount, self.capacity)
+            floor = min(self.capacity * reserve_ratio, self.capacity - amount)
+            if self.tokens - amount >= floor:
+                self.tokens -= amount
+                return 0.0
+
+            return (amount + floor - self.tokens) / (self.capacity / 60.0)
+
+    def refund(self, amount: float = 1):
+        if not self.capacity:
+            return
+
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+
+class AdaptiveConcurrencyLimiter:
+
+    def __init__(
+            self, max_limit: int, min_limit: int = 1,
+            latency_target: float = None,
+            decrease_factor: float = 0.5,
+            latency_decrease_factor: float = 0.9,
+            interactive_reserve: float = 0.0
+    ):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.latency_decrease_factor = latency_decrease_factor
+        self.interactive_reserve = interactive_reserve
+        self.in_flight = 0
+        self.interactive_waiting = 0
+        self.condition = threading.Condition()
+
+    def get_bulk_limit(self):
+        # slots only interactive calls may take, none while the limit is down to one
+        limit = int(self.limit)
+        reserved = math.ceil(limit * self.interactive_reserve) if limit > 1 else 0
+        return max(1, limit - reserved)
+
+    def acquire(self, timeout: float = None, priority: str = PriorityEnum.INTERACTIVE.value):
+        with self.condition:
+            if priority == PriorityEnum.BULK.value:
+                # bulk calls also step aside while an interactive call is waiting
+                is_acquired = self.condition.wait_for(
+                    lambda: self.interactive_waiting == 0 and self.in_flight < self.get_bulk_limit(),
+                    timeout=timeout
+                )
+            else:
+                self.interactive_waiting += 1
+                try:
+                    is_acquired = self.condition.wait_for(
+                        lambda: self.in_flight < int(self.limit), timeout=timeout
+                    )
+                finally:
+                    self.interactive_waiting -= 1
+                    self.condition.notify_all()
+
+            if not is_acquired:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, throttled: bool = False):
+        with self.condition:
+            self.in_flight -= 1
+
+            if throttled:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            elif self.latency_target and latency > self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.latency_decrease_factor)
+            else:
+                # additive increase: roughly +1 slot once a full window of calls succeeded
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+            self.condition.notify_all()
+
+
+class CircuitBreaker:
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+
+            # half open: a single probe call decides whether the provider is back
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            self.probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        # the probe never reached the provider, let the next call try instead
+        with self.lock:
+            self.probe_in_flight = False
+
+    def is_open(self):
+        with self.lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def get_status(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "open_for_seconds": round(time.monotonic() - self.opened_at, 3) if self.opened_at else None
+            }
+
+
+class LLMScheduler:
+
+    RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+    _schedulers = {}
+    _schedulers_lock = threading.Lock()
+
+    def __init__(
+            self, provider: str,
+            requests_per_minute: int = None,
+            tokens_per_minute: int = None,
+            max_concurrency: int = 8,
+            max_retries: int = 5,
+            latency_target: float = None,
+            backoff_base: float = 0.5,
+            backoff_max: float = 30.0,
+            circuit_failure_threshold: int = 5,
+            circuit_reset_timeout: float = 30.0,
+            interactive_reserve: float = 0.25
+    ):
+        self.provider = provider
+        self.requests_bucket = TokenBucket(rate_per_minute=requests_per_minute)
+        self.tokens_bucket = TokenBucket(rate_per_minute=tokens_per_minute)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            max_limit=max_concurrency,
+            latency_target=latency_target,
+            interactive_reserve=interactive_reserve
+        )
+        self.interactive_reserve = interactive_reserve
+        self.breaker = CircuitBreaker(
+            failure_threshold=circuit_failure_threshold,
+            reset_timeout=circuit_reset_timeout
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def for_provider(cls, provider: str, **config):
+        # one scheduler per provider, shared by every client created for it
+        with cls._schedulers_lock:
+            if provider not in cls._schedulers:
+                cls._schedulers[provider] = cls(provider=provider, **config)
+            return cls._schedulers[provider]
+
+    @classmethod
+    def get_all_status(cls):
+        with cls._schedulers_lock:
+            schedulers = list(cls._schedulers.values())
+        return [scheduler.get_status() for scheduler in schedulers]
+
+    def get_status(self):
+        return {
+            "provider": self.provider,
+            "circuit": self.breaker.get_status(),
+            "concurrency_limit": int(self.limiter.limit),
+            "bulk_concurrency_limit": self.limiter.get_bulk_limit(),
+            "in_flight": self.limiter.in_flight
+        }
+
+    @staticmethod
+    def estimate_tokens(texts: list):
+        # ~4 characters per token is close enough for rate budgeting
+        return max(1, sum(len(text) for text in texts if text) // 4)
+
+    def get_status_code(self, error: Exception):
+        status_code = getattr(error, "status_code", None)
+        if status_code is None:
+            response = getattr(error, "response", None)
+            status_code = getattr(response, "status_code", None)
+        return status_code
+
+    def get_retry_after(self, error: Exception):
+        headers = getattr(error, "headers", None)
+        if headers is None:
+            response = getattr(error, "response", None)
+            headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+
+        retry_after = headers.get("retry-after") or headers.get("Retry-After")
+        if retry_after is None:
+            return None
+
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            return None
+
+    def is_retryable(self, error: Exception):
+        status_code = self.get_status_code(error)
+        if status_code is not None:
+            return status_code in self.RETRYABLE_STATUS_CODES
+
+        error_name = type(error).__name__
+        return "Timeout" in error_name or "Connection" in error_name
+
+    def get_backoff(self, attempt: int, error: Exception):
+        retry_after = self.get_retry_after(error)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+
+        # full jitter keeps concurrent callers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get_remaining(self, deadline: float):
+        if deadline is None:
+            return None
+        return deadline - time.monotonic()
+
+    def reserve_bulk_budget(self, tokens: int, deadline: float = None):
+        # bulk calls only spend the rate budget above the interactive reserve; concurrent
+        # bulk calls cannot all pass one check, each takes its share as it passes
+        while True:
+            wait = self.requests_bucket.try_reserve(1, reserve_ratio=self.interactive_reserve)
+            if wait <= 0:
+                wait = self.tokens_bucket.try_reserve(tokens, reserve_ratio=self.interactive_reserve)
+                if wait <= 0:
+                    return
+                # both budgets are taken or neither
+                self.requests_bucket.refund(1)
+
+            remaining = self.get_remaining(deadline)
+            if remaining is not None and wait >= remaining:
+                raise DeadlineExceededError(f"{self.provider} bulk call would start after its deadline")
+            time.sleep(wait)
+
+    def submit(
+            self, func, *args, tokens: int = 1, deadline: float = None,
+            priority: str = PriorityEnum.INTERACTIVE.value, **kwargs
+    ):
+        # deadline is a time.monotonic() instant; func then receives timeout=<seconds left>
+        attempt = 0
+        while True:
+            is_bulk = priority == PriorityEnum.BULK.value
+            if is_bulk:
+                self.reserve_bulk_budget(tokens, deadline)
+
+            if not self.breaker.allow():
+                if is_bulk:
+                    self.requests_bucket.refund(1)
+                    self.tokens_bucket.refund(tokens)
+                raise CircuitOpenError(f"{self.provider} circuit is open, failing fast")
+
+            # bulk calls already hold their budget
+            wait = 0.0 if is_bulk else max(
+                self.requests_bucket.reserve(1),
+                self.tokens_bucket.reserve(tokens)
+            )
+            remaining = self.get_remaining(deadline)
+            if remaining is not None and wait >= remaining:
+                self.breaker.release_probe()
+                raise DeadlineExceededError(f"{self.provider} call would start after its deadline")
+            if wait > 0:
+                time.sleep(wait)
+
+            remaining = self.get_remaining(deadline)
+            if not self.limiter.acquire(
+                timeout=max(0.0, remaining) if remaining is not None else None,
+                priority=priority
+            ):
+                self.breaker.release_probe()
+                raise DeadlineExceededError(f"{self.provider} concurrency wait exceeded the deadline")
+
+            started_at = time.monotonic()
+            throttled = False
+            try:
+                remaining = self.get_remaining(deadline)
+                if remaining is not None:
+                    if remaining <= 0:
+                        raise DeadlineExceededError(f"{self.provider} call deadline exceeded")
+                    kwargs["timeout"] = remaining
+                result = func(*args, **kwargs)
+                self.breaker.record_success()
+                return result
+            except DeadlineExceededError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                status_code = self.get_status_code(e)
+                throttled = status_code == 429
+                is_retryable = self.is_retryable(e)
+
+                # timeouts and server errors count against the provider; bad requests and throttling
+                # neither count nor reset the failures, only free a half-open probe
+                if is_retryable and not throttled:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release_probe()
+
+                if attempt >= self.max_retries or not is_retryable:
+                    raise
+
+                delay = self.get_backoff(attempt, e)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+
+                self.logger.warning(
+                    f"{self.provider} call failed ({e}), retry {attempt + 1} in {delay:.2f}s")
+            finally:
+                self.limiter.release(
+                    latency=time.monotonic() - started_at,
+                    throttled=throttled
+                )
+
+            time.sleep(delay)
+            attempt += 1
@@ -13,9 +13,10 @@ class OpenAIEnums(Enum):
 
 
 class CoHereEnums(Enum):
-    SYSTEM = "SYSTEM"
-    USER = "USER"
-    ASSISTANT = "CHATBOT"
+    # ClientV2 chat roles
+    SYSTEM = "system"
+    USER = "user"
+    ASSISTANT = "assistant"
 
     DOCUMENT = "search_document"
     QUERY = "search_query"
@@ -0,0 +1,126 @@
+from .LLM_Enums import DocumentTypeEnum
+from collections import deque
+import asyncio
+import logging
+import time
+
+
+class QueryEmbeddingBatcher:
+
+    HEDGE_PERCENTILE = 0.95
+    HEDGE_MIN_SAMPLES = 20
+
+    def __init__(
+            self, embedding_client, max_batch_size: int = 32, max_wait_ms: float = 5,
+            hedge_enabled: bool = False, hedge_min_delay_ms: float = 50
+    ):
+        self.embedding_client = embedding_client
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay = max(0.0, hedge_min_delay_ms) / 1000.0
+
+        self.pending = []
+        self.flush_handle = None
+        self.running_batches = set()
+        self.latencies = deque(maxlen=200)
+
+        self.logger = logging.getLogger(__name__)
+
+    async def embed(self, text: str, deadline: float = None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((text, future, deadline))
+
+        if len(self.pending) >= self.max_batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_wait, self.flush)
+
+        if deadline is None:
+            return await future
+
+        # the caller gives up at its own deadline, the batch keeps serving the others
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(future), timeout=max(0.0, deadline - time.monotonic())
+            )
+        except asyncio.TimeoutError:
+            self.logger.error("Query embedding missed the request deadline")
+            return None
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self.run_batch(batch))
+        self.running_batches.add(task)
+        task.add_done_callback(self.running_batches.discard)
+
+    def get_hedge_delay(self):
+        if len(self.latencies) < self.HEDGE_MIN_SAMPLES:
+            return None
+        latencies = sorted(self.latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * self.HEDGE_PERCENTILE))]
+        return max(self.hedge_min_delay, p95)
+
+    def can_hedge(self):
+        scheduler = getattr(self.embedding_client, "scheduler", None)
+        # a duplicate call into an open circuit would only fail fast as well
+        return self.hedge_enabled and not (scheduler and scheduler.breaker.is_open())
+
+    async def call_embed_batch(self, texts: list, deadline: float):
+        started_at = time.monotonic()
+        vectors = await asyncio.to_thread(
+            self.embedding_client.embed_batch,
+            texts=texts,
+            document_type=DocumentTypeEnum.QUERY.value,
+            deadline=deadline
+        )
+        if vectors:
+            self.latencies.append(time.monotonic() - started_at)
+        return vectors
+
+    async def run_hedged(self, texts: list, deadline: float):
+        attempts = {asyncio.ensure_future(self.call_embed_batch(texts, deadline))}
+
+        hedge_delay = self.get_hedge_delay()
+        if hedge_delay is not None and self.can_hedge():
+            done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+            if not done:
+                # slower than p95: a duplicate call usually lands on a faster replica
+                attempts.add(asyncio.ensure_future(self.call_embed_batch(texts, deadline)))
+
+        # first successful answer wins, the other call finishes in its thread and is dropped
+        while attempts:
+            done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None and attempt.result():
+                    return attempt.result()
+
+        return None
+
+    async def run_batch(self, batch: list):
+        # identical queries in the same window share one slot in the provider call
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+
+        # the call may run as long as the most patient caller is still waiting
+        deadlines = [deadline for _, _, deadline in batch]
+        deadline = None if None in deadlines else max(deadlines)
+
+        try:
+            vectors = await self.run_hedged(texts, deadline)
+        except Exception as e:
+            self.logger.error(f"Error while embedding query batch: {e}")
+            vectors = None
+
+        text_vectors = dict(zip(texts, vectors)) if vectors else {}
+
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(text_vectors.get(text))
@@ -1,16 +1,23 @@
 from ..LLMInterface import LLMInterface
-from ..LLM_Enums import CoHereEnums, DocumentTypeEnum
+from ..LLM_Enums import LLMEnums, CoHereEnums, DocumentTypeEnum
+from ..LLMScheduler import LLMScheduler
+from models.enums.PriorityEnum import PriorityEnum
 import cohere
 import logging
+import math
 
 
 class CoHereProvider(LLMInterface):
 
+    MAX_BATCH_SIZE = 96
+
     def __init__(
             self, api_key: str,
             default_input_max_characters: int = 1000,
             default_generation_max_characters: int = 1000,
-            default_generation_temperature: float = 0.1
+            default_generation_temperature: float = 0.1,
+            request_timeout: float = 60.0,
+            scheduler: LLMScheduler = None
     ):
 
         self.api_key = api_key
@@ -24,7 +31,11 @@ class CoHereProvider(LLMInterface):
         self.embedding_model_id = None
         self.embedding_size = None
 
-        self.client = cohere.ClientV2(api_key=self.api_key)
+        self.client = cohere.ClientV2(api_key=self.api_key, timeout=request_timeout)
+        self.scheduler = scheduler if scheduler else LLMScheduler.for_provider(
+            LLMEnums.COHERE.value
+        )
+        self.enums = CoHereEnums
 
         self.logger = logging.getLogger(__name__)
 
@@ -54,12 +65,20 @@ class CoHereProvider(LLMInterface):
         chat_history.append(self.construct_prompt(
             prompt=prompt, role=CoHereEnums.USER.value))
 
-        response = self.client.chat(
-            model=self.generation_model_id,
-            messages=chat_history,
-            max_tokens=max_output_token,
-            temperature=temperature
-        )
+        try:
+            response = self.scheduler.submit(
+                self.client.chat,
+                model=self.generation_model_id,
+                messages=chat_history,
+                max_tokens=max_output_token,
+                temperature=temperature,
+                tokens=LLMScheduler.estimate_tokens(
+                    [message["content"] for message in chat_history]
+                ) + (max_output_token or 0)
+            )
+        except Exception as e:
+            self.logger.error(f"Error while generating text with CoHere: {e}")
+            return None
 
         if not response or not response.message or not response.message.content or len(response.message.content) == 0:
             self.logger.error("Error while generating text with CoHere")
@@ -67,7 +86,16 @@ class CoHereProvider(LLMInterface):
 
         return response.message.content[0].text
 
-    def embed_text(self, text: str, document_type: str = None):
+    def call_embed(self, timeout: float = None, **kwargs):
+        # the scheduler passes the time left before the deadline, cohere takes it per request
+        if timeout is not None:
+            kwargs["request_options"] = {"timeout_in_seconds": max(1, math.ceil(timeout))}
+        return self.client.embed(**kwargs)
+
+    def embed_text(
+            self, text: str, document_type: str = None, deadline: float = None,
+            priority: str = PriorityEnum.INTERACTIVE.value
+    ):
 
         if not self.client:
             self.logger.error("CoHere client was not set")
@@ -81,12 +109,21 @@ class CoHereProvider(LLMInterface):
         if document_type == DocumentTypeEnum.QUERY.value:
             input_type = CoHereEnums.QUERY.value
 
-        response = self.client.embed(
-            model=self.embedding_model_id,
-            texts=[self.process_text(text)],
-            input_type=input_type,
-            embedding_types=['float']
-        )
+        texts = [self.process_text(text)]
+        try:
+            response = self.scheduler.submit(
+                self.call_embed,
+                model=self.embedding_model_id,
+                texts=texts,
+                input_type=input_type,
+                embedding_types=['float'],
+                tokens=LLMScheduler.estimate_tokens(texts),
+                deadline=deadline,
+                priority=priority
+            )
+        except Exception as e:
+            self.logger.error(f"Error while embedding text with CoHere: {e}")
+            return None
 
         if not response or not response.embeddings or not response.embeddings.float:
             self.logger.error("Error while embedding text with CoHere")
@@ -94,6 +131,54 @@ class CoHereProvider(LLMInterface):
 
         return response.embeddings.float[0]
 
+    def embed_batch(
+            self, texts: list, document_type: str = None, deadline: float = None,
+            priority: str = PriorityEnum.INTERACTIVE.value
+    ):
+
+        if not self.client:
+            self.logger.error("CoHere client was not set")
+            return None
+
+        if not self.embedding_model_id:
+            self.logger.error("Embedding model CoHere was not set")
+            return None
+
+        input_type = CoHereEnums.DOCUMENT.value
+        if document_type == DocumentTypeEnum.QUERY.value:
+            input_type = CoHereEnums.QUERY.value
+
+        vectors = []
+        # the embed endpoint takes at most MAX_BATCH_SIZE texts per call
+        for i in range(0, len(texts), self.MAX_BATCH_SIZE):
+            batch_texts = [
+                self.process_text(text)
+                for text in texts[i:i+self.MAX_BATCH_SIZE]
+            ]
+            try:
+                response = self.scheduler.submit(
+                    self.call_embed,
+                    model=self.embedding_model_id,
+                    texts=batch_texts,
+                    input_type=input_type,
+                    embedding_types=['float'],
+                    tokens=LLMScheduler.estimate_tokens(batch_texts),
+                    deadline=deadline,
+                    priority=priority
+                )
+            except Exception as e:
+                self.logger.error(f"Error while embedding batch with CoHere: {e}")
+                return None
+
+            if not response or not response.embeddings or not response.embeddings.float \
+                    or len(response.embeddings.float) != len(batch_texts):
+                self.logger.error("Error while embedding batch with CoHere")
+                return None
+
+            vectors.extend(response.embeddings.float)
+
+        return vectors
+
     def construct_prompt(self, prompt: str, role: str):
         return {
             "role": role,
@@ -1,5 +1,7 @@
 from ..LLMInterface import LLMInterface
-from ..LLM_Enums import OpenAIEnums
+from ..LLM_Enums import LLMEnums, OpenAIEnums
+from ..LLMScheduler import LLMScheduler
+from models.enums.PriorityEnum import PriorityEnum
 from openai import OpenAI
 import logging
 
@@ -10,7 +12,9 @@ class OpenAIProvider(LLMInterface):
             self, api_key: str, api_url: str = None,
             default_input_max_characters: int = 1000,
             default_generation_max_characters: int = 1000,
-            default_generation_temperature: float = 0.1
+            default_generation_temperature: float = 0.1,
+            request_timeout: float = 60.0,
+            scheduler: LLMScheduler = None
     ):
         self.api_key = api_key
         self.api_url = api_url
@@ -24,10 +28,17 @@ class OpenAIProvider(LLMInterface):
         self.embedding_model_id = None
         self.embedding_size = None
 
+        # retries are owned by the scheduler, not the SDK
         self.client = OpenAI(
             api_key=self.api_key,
-            api_url=self.api_url
+            base_url=self.api_url if self.api_url else None,
+            timeout=request_timeout,
+            max_retries=0
         )
+        self.scheduler = scheduler if scheduler else LLMScheduler.for_provider(
+            LLMEnums.OPENAI.value
+        )
+        self.enums = OpenAIEnums
         self.logger = logging.getLogger(__name__)
 
     def set_generation_model(self, model_id: str):
@@ -56,20 +67,31 @@ class OpenAIProvider(LLMInterface):
         chat_history.append(self.construct_prompt(
             prompt=prompt, role=OpenAIEnums.USER.value))
 
-        response = self.client.chat.completions.create(
-            model=self.generation_model_id,
-            messages=chat_history,
-            max_tokens=max_output_token,
-            temperature=temperature
-        )
+        try:
+            response = self.scheduler.submit(
+                self.client.chat.completions.create,
+                model=self.generation_model_id,
+                messages=chat_history,
+                max_tokens=max_output_token,
+                temperature=temperature,
+                tokens=LLMScheduler.estimate_tokens(
+                    [message["content"] for message in chat_history]
+                ) + (max_output_token or 0)
+            )
+        except Exception as e:
+            self.logger.error(f"Error while generating text with OpenAI: {e}")
+            return None
 
         if not response or not response.choices or len(response.choices) == 0 or not response.choices[0].message:
             self.logger.error("Error while generating text with OpenAI")
             return None
 
-        return response.choices[0].message["content"]
+        return response.choices[0].message.content
 
-    def embed_text(self, text: str, document_type: str = None):
+    def embed_text(
+            self, text: str, document_type: str = None, deadline: float = None,
+            priority: str = PriorityEnum.INTERACTIVE.value
+    ):
 
         if not self.client:
             self.logger.error("OpenAI client was not set")
@@ -79,10 +101,18 @@ class OpenAIProvider(LLMInterface):
             self.logger.error("Embedding model OpenAI was not set")
             return None
 
-        response = self.client.embeddings.create(
-            model=self.embedding_model_id,
-            input=text
-        )
+        try:
+            response = self.scheduler.submit(
+                self.client.embeddings.create,
+                model=self.embedding_model_id,
+                input=text,
+                tokens=LLMScheduler.estimate_tokens([text]),
+                deadline=deadline,
+                priority=priority
+            )
+        except Exception as e:
+            self.logger.error(f"Error while embedding text with OpenAI: {e}")
+            return None
 
         if not response or not response.data or len(response.data) == 0 or not response.data[0].embedding:
             self.logger.error("Error while embedding text with OpenAI")
@@ -90,6 +120,41 @@ class OpenAIProvider(LLMInterface):
 
         return response.data[0].embedding
 
+    def embed_batch(
+            self, texts: list, document_type: str = None, deadline: float = None,
+            priority: str = PriorityEnum.INTERACTIVE.value
+    ):
+
+        if not self.client:
+            self.logger.error("OpenAI client was not set")
+            return None
+
+        if not self.embedding_model_id:
+            self.logger.error("Embedding model OpenAI was not set")
+            return None
+
+        try:
+            response = self.scheduler.submit(
+                self.client.embeddings.create,
+                model=self.embedding_model_id,
+                input=texts,
+                tokens=LLMScheduler.estimate_tokens(texts),
+                deadline=deadline,
+                priority=priority
+            )
+        except Exception as e:
+            self.logger.error(f"Error while embedding batch with OpenAI: {e}")
+            return None
+
+        if not response or not response.data or len(response.data) != len(texts):
+            self.logger.error("Error while embedding batch with OpenAI")
+            return None
+
+        return [
+            record.embedding
+            for record in sorted(response.data, key=lambda record: record.index)
+        ]
+
     def construct_prompt(self, prompt: str, role: str):
         return {
             "role": role,
@@ -1,2 +1,26 @@
-from .OpenAIProvider import OpenAIProvider
-from .CoHereProvider import CoHereProvider
+from ..LLM_Enums import LLMEnums
+import importlib
+
+# provider modules are only imported once the factory selects them
+PROVIDER_CLASSES = {
+    LLMEnums.OPENAI.value: ("OpenAIProvider", "OpenAIProvider"),
+    LLMEnums.COHERE.value: ("CoHereProvider", "CoHereProvider"),
+}
+
+
+def load_provider(provider: str):
+    if provider not in PROVIDER_CLASSES:
+        return None
+
+    module_name, class_name = PROVIDER_CLASSES[provider]
+    module = importlib.import_module(f".{module_name}", __name__)
+    # importing the submodule binds its name on this package, point it back at the class
+    globals()[class_name] = getattr(module, class_name)
+    return globals()[class_name]
+
+
+def __getattr__(name: str):
+    for provider, (_, class_name) in PROVIDER_CLASSES.items():
+        if name == class_name:
+            return load_provider(provider)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
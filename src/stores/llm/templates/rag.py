@@ -0,0 +1,20 @@
+from string import Template
+
+system_prompt = "\n".join([
+    "You are an assistant that answers the user's question from the provided documents only.",
+    "If the documents do not contain the answer, say that you could not find it.",
+    "Answer in the language of the question, briefly and precisely.",
+])
+
+document_prompt = Template("\n".join([
+    "## Document No: $doc_num",
+    "### Content: $chunk_text",
+]))
+
+footer_prompt = Template("\n".join([
+    "Based only on the above documents, please answer the question.",
+    "## Question:",
+    "$query",
+    "",
+    "## Answer:",
+]))
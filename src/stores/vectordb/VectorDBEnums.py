@@ -8,3 +8,18 @@ class VectorDBEnums(Enum):
 class DistanceMethodEnums(Enum):
     COSINE = "cosine"
     DOT = "dot"
+
+
+class PayloadModeEnums(Enum):
+    FULL = "full"
+    IDS = "ids"
+
+
+class TenancyModeEnums(Enum):
+    COLLECTION = "collection"
+    SHARED = "shared"
+
+
+class QuantizationEnums(Enum):
+    SCALAR = "scalar"
+    BINARY = "binary"
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List
+from models.db_schemas import RetrievedDocument, CollectionInfo
 
 
 class VectorDBInterface(ABC):
@@ -21,7 +22,7 @@ class VectorDBInterface(ABC):
         pass
 
     @abstractmethod
-    def get_collection_info(self, collection_name: str) -> dict:
+    def get_collection_info(self, collection_name: str) -> CollectionInfo:
         pass
 
     @abstractmethod
@@ -32,7 +33,8 @@ class VectorDBInterface(ABC):
     def create_collection(
             self, collection_name: str,
             embedding_size: int,
-            do_reset: bool = False
+            do_reset: bool = False,
+            tenant_field: str = None
     ):
         pass
 
@@ -40,7 +42,8 @@ class VectorDBInterface(ABC):
     def insert_one(
             self, collection_name: str, text: str, vector: list,
             metadata: dict = None,
-            record_id: str = None
+            record_id: str = None,
+            extra_payload: dict = None
     ):
         pass
 
@@ -48,12 +51,47 @@ class VectorDBInterface(ABC):
     def insert_many(
             self, collection_name: str, texts: list,
             vectors: list, metadata: list = None,
-            record_ids: list = None, batch_size: int = 50
+            record_ids: list = None, batch_size: int = 50,
+            extra_payloads: list = None
     ):
         pass
 
     @abstractmethod
     def search_by_vector(
-        self, collection_name: str, vector: list, limit: int
+        self, collection_name: str, vector: list, limit: int,
+        filter: dict = None, timeout: float = None
+    ) -> List[RetrievedDocument]:
+        pass
+
+    @abstractmethod
+    def search_batch(
+        self, collection_name: str, vectors: list, limits: list,
+        filters: list = None
+    ) -> List[List[RetrievedDocument]]:
+        pass
+
+    @abstractmethod
+    def normalize_score(self, score: float) -> float:
+        pass
+
+    @abstractmethod
+    def delete_by_filter(self, collection_name: str, filter: dict):
+        pass
+
+    @abstractmethod
+    def count(self, collection_name: str, filter: dict = None) -> int:
+        pass
+
+    @abstractmethod
+    def scroll(
+        self, collection_name: str, batch_size: int = 256,
+        filter: dict = None, with_vectors: bool = True
+    ):
+        pass
+
+    @abstractmethod
+    def upsert_points(
+        self, collection_name: str, record_ids: list,
+        vectors: list, payloads: list
     ):
         pass
@@ -1,4 +1,4 @@
-from .providers import QdrantDBProvider
+from .providers import load_provider
 from .VectorDBEnums import VectorDBEnums
 from controllers.BaseController import BaseController
 
@@ -14,8 +14,17 @@ class VectorDBProviderFactory:
             db_path = self.base_controller.get_database_path(
                 db_name=self.config.VECTOR_DB_PATH
             )
+            QdrantDBProvider = load_provider(provider)
             return QdrantDBProvider(
                 db_path=db_path,
-                distance_method=self.config.VECTOR_DB_DISTANCE_METHOD
+                distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
+                payload_mode=self.config.VECTOR_DB_PAYLOAD_MODE,
+                payload_indexed_fields=self.config.VECTOR_DB_PAYLOAD_INDEXED_FIELDS,
+                db_url=self.config.VECTOR_DB_URL,
+                hnsw_m=self.config.VECTOR_DB_HNSW_M,
+                hnsw_ef_construct=self.config.VECTOR_DB_HNSW_EF_CONSTRUCT,
+                search_hnsw_ef=self.config.VECTOR_DB_SEARCH_HNSW_EF,
+                quantization=self.config.VECTOR_DB_QUANTIZATION,
+                bulk_max_wait_ms=self.config.VECTOR_DB_BULK_MAX_WAIT_MS
             )
         return None
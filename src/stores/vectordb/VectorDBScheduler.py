@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+import threading
+
+
+class VectorDBScheduler:
+
+    def __init__(self, bulk_max_wait_ms: float = 500):
+        # searches share the store, a bulk write runs alone and only once no search is waiting;
+        # after bulk_max_wait_ms it stops letting new searches in so ingestion can't starve
+        self.bulk_max_wait = max(0.0, bulk_max_wait_ms) / 1000.0
+        self.interactive_active = 0
+        self.interactive_waiting = 0
+        self.bulk_active = False
+        self.bulk_overdue = 0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def interactive(self, timeout: float = None):
+        with self.condition:
+            self.interactive_waiting += 1
+            try:
+                is_admitted = self.condition.wait_for(
+                    lambda: not self.bulk_active and self.bulk_overdue == 0, timeout=timeout
+                )
+            finally:
+                self.interactive_waiting -= 1
+            if not is_admitted:
+                # a bulk write may be waiting for this search to leave
+                self.condition.notify_all()
+                raise TimeoutError("search timed out waiting for a bulk write")
+            self.interactive_active += 1
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.interactive_active -= 1
+                self.condition.notify_all()
+
+    @contextmanager
+    def bulk(self):
+        with self.condition:
+            is_idle = self.condition.wait_for(
+                lambda: not self.bulk_active and self.interactive_active == 0
+                and self.interactive_waiting == 0,
+                timeout=self.bulk_max_wait
+            )
+            if not is_idle:
+                self.bulk_overdue += 1
+                try:
+                    self.condition.wait_for(
+                        lambda: not self.bulk_active and self.interactive_active == 0
+                    )
+                finally:
+                    self.bulk_overdue -= 1
+            self.bulk_active = True
+
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.bulk_active = False
+                self.condition.notify_all()
@@ -1,16 +1,41 @@
 from qdrant_client import models, QdrantClient
 from ..VectorDBInterface import VectorDBInterface
+from ..VectorDBScheduler import VectorDBScheduler
 import logging
-from ..VectorDBEnums import DistanceMethodEnums
+from ..VectorDBEnums import DistanceMethodEnums, PayloadModeEnums, QuantizationEnums
+from models.db_schemas import RetrievedDocument, CollectionInfo
 from typing import List
+import math
+import time
 
 
 class QdrantDBProvider(VectorDBInterface):
 
-    def __init__(self, db_path: str, distance_method: str):
+    def __init__(
+            self, db_path: str, distance_method: str,
+            payload_mode: str = PayloadModeEnums.FULL.value,
+            payload_indexed_fields: list = None,
+            db_url: str = None,
+            hnsw_m: int = None,
+            hnsw_ef_construct: int = None,
+            search_hnsw_ef: int = None,
+            quantization: str = None,
+            search_exact: bool = False,
+            bulk_max_wait_ms: float = 500
+    ):
         self.client = None
         self.db_path = db_path
+        self.db_url = db_url
         self.distance_method = None
+        self.payload_mode = payload_mode
+        self.payload_indexed_fields = payload_indexed_fields or []
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.search_hnsw_ef = search_hnsw_ef
+        self.quantization = quantization
+        self.search_exact = search_exact
+        # only the raw client calls go through the scheduler, so provider methods can nest
+        self.scheduler = VectorDBScheduler(bulk_max_wait_ms=bulk_max_wait_ms)
 
         if distance_method == DistanceMethodEnums.COSINE.value:
             self.distance_method = models.Distance.COSINE
@@ -20,8 +45,65 @@ class QdrantDBProvider(VectorDBInterface):
 
         self.logger = logging.getLogger(__name__)
 
+    def build_payload(self, text: str, metadata: dict = None, extra_payload: dict = None):
+        if self.payload_mode == PayloadModeEnums.IDS.value:
+            # text and metadata are hydrated from mongo at search time,
+            # only the fields used for filtering stay in the vector store
+            payload = {}
+            indexed_metadata = {
+                key: metadata[key]
+                for key in self.payload_indexed_fields
+                if metadata and key in metadata
+            }
+            if indexed_metadata:
+                payload["metadata"] = indexed_metadata
+        else:
+            payload = {
+                "text": text,
+                "metadata": metadata
+            }
+
+        if extra_payload:
+            payload.update(extra_payload)
+
+        return payload
+
+    def get_quantization_config(self):
+        if self.quantization == QuantizationEnums.SCALAR.value:
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8, always_ram=True
+                )
+            )
+
+        if self.quantization == QuantizationEnums.BINARY.value:
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=True)
+            )
+
+        return None
+
+    def get_search_params(self):
+        if self.search_hnsw_ef is None and not self.search_exact and not self.quantization:
+            return None
+
+        quantization_params = None
+        if self.quantization:
+            # candidates are found on quantized vectors, then rescored with the originals
+            quantization_params = models.QuantizationSearchParams(rescore=True)
+
+        return models.SearchParams(
+            hnsw_ef=self.search_hnsw_ef,
+            exact=self.search_exact,
+            quantization=quantization_params
+        )
+
     def connect(self):
-        self.client = QdrantClient(path=self.db_path)
+        if self.db_url:
+            self.client = QdrantClient(url=self.db_url)
+        else:
+            # embedded mode searches exhaustively, HNSW and quantization only apply on a server
+            self.client = QdrantClient(path=self.db_path)
 
     def disconnect(self):
         self.client = None
@@ -32,28 +114,74 @@ class QdrantDBProvider(VectorDBInterface):
     def list_all_connection(self) -> List:
         return self.client.get_collections()
 
-    def get_collection_info(self, collection_name: str) -> dict:
-        return self.client.get_collection(collection_name=collection_name)
+    def get_collection_info(self, collection_name: str) -> CollectionInfo:
+        if not self.is_collection_existed(collection_name=collection_name):
+            return None
+
+        info = self.client.get_collection(collection_name=collection_name)
+        vectors_config = info.config.params.vectors
+        return CollectionInfo(
+            status=str(info.status.value),
+            points_count=info.points_count,
+            indexed_vectors_count=info.indexed_vectors_count,
+            segments_count=info.segments_count,
+            vector_size=getattr(vectors_config, "size", None),
+            distance=getattr(getattr(vectors_config, "distance", None), "value", None)
+        )
 
     def delete_collection(self, collection_name: str):
         if self.is_collection_existed(collection_name=collection_name):
-            return self.client.delete_collection(collection_name=collection_name)
+            with self.scheduler.bulk():
+                return self.client.delete_collection(collection_name=collection_name)
 
     def create_collection(
             self, collection_name: str,
             embedding_size: int,
-            do_reset: bool = False
+            do_reset: bool = False,
+            tenant_field: str = None
     ):
         if do_reset:
             _ = self.delete_collection(collection_name=collection_name)
 
         if not self.is_collection_existed(collection_name=collection_name):
-            _ = self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=models.VectorParams(
-                    size=embedding_size, distance=self.distance_method
+            hnsw_config = None
+            if tenant_field:
+                # every search is scoped to one tenant: build per-tenant graphs only
+                hnsw_config = models.HnswConfigDiff(
+                    payload_m=self.hnsw_m or 16, m=0, ef_construct=self.hnsw_ef_construct
                 )
-            )
+            elif self.hnsw_m is not None or self.hnsw_ef_construct is not None:
+                hnsw_config = models.HnswConfigDiff(
+                    m=self.hnsw_m, ef_construct=self.hnsw_ef_construct
+                )
+
+            with self.scheduler.bulk():
+                # ingest workers index the same project in parallel, only one of them creates it
+                if self.is_collection_existed(collection_name=collection_name):
+                    return False
+                try:
+                    _ = self.client.create_collection(
+                        collection_name=collection_name,
+                        vectors_config=models.VectorParams(
+                            size=embedding_size, distance=self.distance_method
+                        ),
+                        hnsw_config=hnsw_config,
+                        quantization_config=self.get_quantization_config()
+                    )
+                except Exception:
+                    if self.is_collection_existed(collection_name=collection_name):
+                        return False
+                    raise
+
+                if tenant_field:
+                    _ = self.client.create_payload_index(
+                        collection_name=collection_name,
+                        field_name=tenant_field,
+                        field_schema=models.KeywordIndexParams(
+                            type=models.KeywordIndexType.KEYWORD,
+                            is_tenant=True
+                        )
+                    )
             return True
 
         return False
@@ -61,7 +189,8 @@ class QdrantDBProvider(VectorDBInterface):
     def insert_one(
             self, collection_name: str, text: str, vector: list,
             metadata: dict = None,
-            record_id: str = None
+            record_id: str = None,
+            extra_payload: dict = None
     ):
         if not self.is_collection_existed(collection_name=collection_name):
             self.logger.error(
@@ -69,17 +198,17 @@ class QdrantDBProvider(VectorDBInterface):
             return False
 
         try:
-            _ = self.client.upload_records(
-                collection_name=collection_name,
-                records=models.Record(
-                    id=[record_id],
-                    vector=vector,
-                    payload={
-                        "text": text,
-                        "metadata": metadata
-                    }
+            with self.scheduler.bulk():
+                _ = self.client.upload_records(
+                    collection_name=collection_name,
+                    records=models.Record(
+                        id=[record_id],
+                        vector=vector,
+                        payload=self.build_payload(
+                            text=text, metadata=metadata, extra_payload=extra_payload
+                        )
+                    )
                 )
-            )
         except Exception as e:
             self.logger.error(f"Error while inserting record: {e}")
             return False
@@ -89,13 +218,17 @@ class QdrantDBProvider(VectorDBInterface):
     def insert_many(
             self, collection_name: str, texts: list,
             vectors: list, metadata: list = None,
-            record_ids: list = None, batch_size: int = 50
+            record_ids: list = None, batch_size: int = 50,
+            extra_payloads: list = None
     ):
         if metadata is None:
             metadata = [None] * len(texts)
 
+        if extra_payloads is None:
+            extra_payloads = [None] * len(texts)
+
         if record_ids is None:
-            record_ids = List(range(0, len(texts)))
+            record_ids = list(range(0, len(texts)))
 
         for i in range(0, len(texts), batch_size):
             batch_end = i + batch_size
@@ -104,24 +237,28 @@ class QdrantDBProvider(VectorDBInterface):
             batch_vectors = vectors[i:batch_end]
             batch_metadata = metadata[i:batch_end]
             batch_record_ids = record_ids[i:batch_end]
+            batch_extra_payloads = extra_payloads[i:batch_end]
 
             batch_records = [
                 models.Record(
                     id=batch_record_ids[x],
                     vector=batch_vectors[x],
-                    payload={
-                        "text": batch_texts[x],
-                        "metadata": batch_metadata[x]
-                    }
+                    payload=self.build_payload(
+                        text=batch_texts[x],
+                        metadata=batch_metadata[x],
+                        extra_payload=batch_extra_payloads[x]
+                    )
                 )
                 for x in range(len(batch_texts))
             ]
 
             try:
-                _ = self.client.upload_records(
-                    collection_name=collection_name,
-                    records=batch_records
-                )
+                # one batch at a time: searches waiting in between go first
+                with self.scheduler.bulk():
+                    _ = self.client.upload_records(
+                        collection_name=collection_name,
+                        records=batch_records
+                    )
             except Exception as e:
                 self.logger.error(f"Error while inserting batch: {e}")
                 return False
@@ -129,10 +266,145 @@ class QdrantDBProvider(VectorDBInterface):
         return True
 
     def search_by_vector(
-        self, collection_name: str, vector: list, limit: int
-    ):
-        return self.client.search(
-            collection_name=collection_name,
-            query_vector=vector,
-            limit=limit
+        self, collection_name: str, vector: list, limit: int,
+        filter: dict = None, timeout: float = None
+    ) -> List[RetrievedDocument]:
+        # timeout bounds the wait behind bulk writes and the search on the server,
+        # so a search its caller gave up on does not keep running
+        started_at = time.monotonic()
+        with self.scheduler.interactive(timeout=timeout):
+            options = {}
+            if timeout is not None:
+                # qdrant takes whole seconds
+                options["timeout"] = max(1, math.ceil(timeout - (time.monotonic() - started_at)))
+            points = self.client.search(
+                collection_name=collection_name,
+                query_vector=vector,
+                query_filter=self.build_filter(filter),
+                limit=limit,
+                search_params=self.get_search_params(),
+                **options
+            )
+        return [self.to_retrieved_document(point) for point in points]
+
+    def to_retrieved_document(self, point) -> RetrievedDocument:
+        # points come from our own collections, skip re-validating them
+        payload = point.payload or {}
+        return RetrievedDocument.model_construct(
+            id=point.id,
+            score=point.score,
+            text=payload.get("text"),
+            metadata=payload.get("metadata"),
+            chunk_id=payload.get("chunk_id"),
+            project_id=payload.get("project_id")
         )
+
+    def build_filter(self, filter: dict = None):
+        # {"metadata.page": 3} matches a value, {"metadata.page": [3, 4]} matches any of them
+        if not filter:
+            return None
+
+        conditions = []
+        for key, value in filter.items():
+            if isinstance(value, list):
+                match = models.MatchAny(any=value)
+            else:
+                match = models.MatchValue(value=value)
+            conditions.append(models.FieldCondition(key=key, match=match))
+
+        return models.Filter(must=conditions)
+
+    def search_batch(
+        self, collection_name: str, vectors: list, limits: list,
+        filters: list = None
+    ) -> List[List[RetrievedDocument]]:
+        if filters is None:
+            filters = [None] * len(vectors)
+
+        try:
+            with self.scheduler.interactive():
+                results = self.client.search_batch(
+                    collection_name=collection_name,
+                    requests=[
+                        models.SearchRequest(
+                            vector=vector,
+                            limit=limit,
+                            filter=self.build_filter(filter),
+                            params=self.get_search_params(),
+                            with_payload=True
+                        )
+                        for vector, limit, filter in zip(vectors, limits, filters)
+                    ]
+                )
+        except Exception as e:
+            self.logger.error(f"Error while searching batch: {e}")
+            return None
+
+        return [
+            [self.to_retrieved_document(point) for point in points]
+            for points in results
+        ]
+
+    def normalize_score(self, score: float) -> float:
+        # maps scores of any collection onto [0, 1] so hits from different collections compare
+        if self.distance_method == models.Distance.COSINE:
+            return (score + 1.0) / 2.0
+
+        return 1.0 / (1.0 + math.exp(-score))
+
+    def delete_by_filter(self, collection_name: str, filter: dict):
+        if not self.is_collection_existed(collection_name=collection_name):
+            return None
+
+        with self.scheduler.bulk():
+            return self.client.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(
+                    filter=self.build_filter(filter)
+                )
+            )
+
+    def count(self, collection_name: str, filter: dict = None) -> int:
+        return self.client.count(
+            collection_name=collection_name,
+            count_filter=self.build_filter(filter),
+            exact=True
+        ).count
+
+    def scroll(
+        self, collection_name: str, batch_size: int = 256,
+        filter: dict = None, with_vectors: bool = True
+    ):
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=self.build_filter(filter),
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            if points:
+                yield points
+            if offset is None:
+                break
+
+    def upsert_points(
+        self, collection_name: str, record_ids: list,
+        vectors: list, payloads: list
+    ):
+        try:
+            with self.scheduler.bulk():
+                _ = self.client.upsert(
+                    collection_name=collection_name,
+                    points=[
+                        models.PointStruct(id=record_id, vector=vector, payload=payload)
+                        for record_id, vector, payload in zip(record_ids, vectors, payloads)
+                    ]
+                )
+        except Exception as e:
+            self.logger.error(f"Error while upserting points: {e}")
+            return False
+
+        return True
@@ -0,0 +1,217 @@
+# Standalone ingest worker: claims the assets queued through /api/v1/data/process/enqueue and
+# parses, chunks, embeds and indexes them. Any number of workers can run, on any number of nodes,
+# as long as they share MongoDB, the uploaded files (assets/files) and a Qdrant server
+# (VECTOR_DB_URL); an embedded Qdrant directory can only be opened by one process at a time.
+# Run from src/ with a configured .env:  python worker.py --concurrency 4
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from helpers.config import get_settings
+from controllers import NLPController, IngestController
+from controllers.IngestController import LeaseLostError
+from models.ProjectModel import ProjectModel
+from models.ChunkModel import ChunkModel
+from models.AssetModel import AssetModel
+from models.EmbeddingModel import EmbeddingModel
+from models.IngestJobModel import IngestJobModel
+from models.db_schemas import IngestJob
+from stores.llm.LLMProviderFactory import LLMProviderFactory
+from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
+
+logger = logging.getLogger("ingest_worker")
+
+
+class IngestWorker:
+
+    def __init__(self, settings, db_client, nlp_controller: NLPController, worker_id: str, concurrency: int):
+        self.settings = settings
+        self.db_client = db_client
+        self.nlp_controller = nlp_controller
+        self.worker_id = worker_id
+        self.concurrency = max(1, concurrency)
+        self.stop = asyncio.Event()
+
+    async def init_models(self):
+        self.project_model = await ProjectModel.create_instance(db_client=self.db_client)
+        self.asset_model = await AssetModel.create_instance(db_client=self.db_client)
+        self.chunk_model = await ChunkModel.create_instance(db_client=self.db_client)
+        self.embedding_model = await EmbeddingModel.create_instance(db_client=self.db_client)
+        self.ingest_job_model = await IngestJobModel.create_instance(db_client=self.db_client)
+
+    async def run(self):
+        await self.init_models()
+        logger.info(f"worker {self.worker_id} started with {self.concurrency} slots")
+        await asyncio.gather(*[
+            self.run_slot(f"{self.worker_id}/{slot}")
+            for slot in range(self.concurrency)
+        ])
+        logger.info(f"worker {self.worker_id} stopped")
+
+    async def run_slot(self, slot_id: str):
+        while not self.stop.is_set():
+            job = await self.ingest_job_model.claim_job(
+                worker_id=slot_id,
+                lease_seconds=self.settings.INGEST_JOB_LEASE_SECONDS,
+                max_attempts=self.settings.INGEST_JOB_MAX_ATTEMPTS
+            )
+
+            if job is None:
+                _ = await self.ingest_job_model.fail_expired_jobs(
+                    max_attempts=self.settings.INGEST_JOB_MAX_ATTEMPTS
+                )
+                try:
+                    await asyncio.wait_for(
+                        self.stop.wait(), timeout=self.settings.INGEST_WORKER_POLL_INTERVAL_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.run_job(job=job, slot_id=slot_id)
+
+    async def keep_lease(self, job: IngestJob, slot_id: str, work: asyncio.Task):
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.settings.INGEST_JOB_HEARTBEAT_SECONDS)
+            try:
+                is_renewed = await self.ingest_job_model.renew_lease(
+                    job_id=job.id, worker_id=slot_id, lease_seconds=self.settings.INGEST_JOB_LEASE_SECONDS
+                )
+            except Exception as e:
+                logger.warning(f"renewing the lease of job {job.id} failed: {e}")
+                # retried on the next beat, unless the lease runs out before it
+                if (time.monotonic() - renewed_at + self.settings.INGEST_JOB_HEARTBEAT_SECONDS
+                        < self.settings.INGEST_JOB_LEASE_SECONDS):
+                    continue
+                is_renewed = False
+
+            if not is_renewed:
+                # another worker may own the job now, finishing it here would race with that worker
+                logger.warning(f"lost the lease of job {job.id}, abandoning it")
+                work.cancel()
+                return
+
+            renewed_at = time.monotonic()
+
+    async def run_job(self, job: IngestJob, slot_id: str):
+        work = asyncio.create_task(self.ingest(job=job, slot_id=slot_id))
+        heartbeat = asyncio.create_task(self.keep_lease(job=job, slot_id=slot_id, work=work))
+
+        try:
+            is_ingested, chunks_count, error = await work
+        except asyncio.CancelledError:
+            if heartbeat.done():
+                return
+            raise
+        except LeaseLostError:
+            # a parse that outlived the lease: its results were dropped before any write
+            logger.warning(f"job {job.id} was taken over, its results are dropped")
+            return
+        except Exception as e:
+            is_ingested, chunks_count, error = False, 0, str(e)
+        finally:
+            heartbeat.cancel()
+
+        if is_ingested:
+            _ = await self.ingest_job_model.complete_job(
+                job_id=job.id, worker_id=slot_id, chunks_count=chunks_count
+            )
+            if job.job_do_index:
+                # running servers drop answers they cached for the project
+                _ = await self.project_model.bump_index_version(project_id=job.job_project_id)
+            logger.info(f"job {job.id}: {chunks_count} chunks")
+            return
+
+        do_retry = job.job_attempts < self.settings.INGEST_JOB_MAX_ATTEMPTS
+        _ = await self.ingest_job_model.fail_job(
+            job_id=job.id, worker_id=slot_id, error=error, do_retry=do_retry
+        )
+        logger.error(f"job {job.id} failed (attempt {job.job_attempts}, retry: {do_retry}): {error}")
+
+    async def ingest(self, job: IngestJob, slot_id: str):
+        project = await self.project_model.get_project_by_object_id(id=job.job_project_id)
+        asset = await self.asset_model.get_asset_by_id(asset_id=job.job_asset_id)
+        if project is None or asset is None:
+            return False, 0, "asset no longer exists"
+
+        ingest_controller = IngestController(
+            project=project,
+            asset_model=self.asset_model,
+            chunk_model=self.chunk_model,
+            embedding_model=self.embedding_model,
+            nlp_controller=self.nlp_controller,
+            lease_check=lambda: self.ingest_job_model.is_lease_held(job_id=job.id, worker_id=slot_id)
+        )
+
+        return await ingest_controller.ingest_asset(
+            asset=asset,
+            chunk_size=job.job_chunk_size,
+            overlap_size=job.job_overlap_size,
+            splitter=job.job_splitter,
+            length_unit=job.job_length_unit,
+            do_index=bool(job.job_do_index)
+        )
+
+
+async def run(args):
+    settings = get_settings()
+    mongo_conn = AsyncIOMotorClient(settings.MONGODB_URL)
+    db_client = mongo_conn[settings.MONGODB_DATABASE]
+
+    embedding_client = LLMProviderFactory(settings).create(provider=settings.EMBEDDING_BACKEND)
+    embedding_client.set_embedding_model(
+        model_id=settings.EMBEDDING_MODEL_ID,
+        embedding_size=settings.EMBEDDING_MODEL_SIZE
+    )
+
+    vectordb_client = VectorDBProviderFactory(settings).create(provider=settings.VECTOR_DB_BACKEND)
+    vectordb_client.connect()
+
+    nlp_controller = NLPController(
+        vectordb_client=vectordb_client,
+        generation_client=None,
+        embedding_client=embedding_client
+    )
+
+    worker = IngestWorker(
+        settings=settings,
+        db_client=db_client,
+        nlp_controller=nlp_controller,
+        worker_id=args.worker_id or f"{socket.gethostname()}:{os.getpid()}",
+        concurrency=args.concurrency or settings.INGEST_WORKER_CONCURRENCY
+    )
+
+    # on SIGTERM/SIGINT no new jobs are claimed, the running ones are finished
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, worker.stop.set)
+        except NotImplementedError:
+            pass
+
+    try:
+        await worker.run()
+    finally:
+        vectordb_client.disconnect()
+        mongo_conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="jobs processed at once, defaults to INGEST_WORKER_CONCURRENCY")
+    parser.add_argument("--worker-id", default=None,
+                        help="lease owner name, defaults to host:pid")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()